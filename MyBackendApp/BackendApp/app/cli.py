@@ -0,0 +1,90 @@
+"""
+One-shot maintenance commands, run once per deploy rather than in every worker.
+
+    python -m app.cli init            # apply migrations and seed default data
+    python -m app.cli init --no-seed  # migrations only
+    python -m app.cli audit-maintenance  # daily: archive cold audit log months, add partitions
+    python -m app.cli purge-idempotency-keys  # periodically: drop expired idempotent responses
+"""
+import argparse
+import os
+import sys
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from .models.database import engine
+from .utils.loguru_config import logger
+from .utils.populate import populate_packages
+from .utils.audit_retention import ensure_partitions, run_maintenance
+from .utils.idempotency import purge_expired_keys
+
+# The application directory holds alembic.ini and migrations/
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Revision matching the schema that create_all used to build on every boot
+BASELINE_REVISION = "0001"
+
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(APP_ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(APP_ROOT, "migrations"))
+    config.set_main_option("sqlalchemy.url", engine.url.render_as_string(hide_password=False).replace("%", "%%"))
+    return config
+
+
+def migrate():
+    """
+    Upgrade the schema to the latest revision. A database created by the old
+    create_all bootstrap (tables present, no alembic_version) is stamped at
+    the baseline first, so only the later revisions are applied to it.
+    """
+    config = alembic_config()
+    tables = set(inspect(engine).get_table_names())
+    if "alembic_version" not in tables and "users" in tables:
+        logger.info(f"Existing unversioned schema found, stamping baseline revision {BASELINE_REVISION}.")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+    logger.info("Database schema is up to date.")
+
+
+def init_database(seed: bool = True):
+    """
+    Apply migrations and, unless disabled, insert the default packages.
+    """
+    migrate()
+    ensure_partitions()
+    if seed:
+        inserted = populate_packages()
+        logger.info(f"Seeded {inserted} default package(s).")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Communication LTD maintenance commands.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    init_parser = subcommands.add_parser("init", help="Apply database migrations and seed default data.")
+    init_parser.add_argument("--no-seed", action="store_true", help="Skip inserting the default packages.")
+    maintenance_parser = subcommands.add_parser(
+        "audit-maintenance", help="Archive audit log months past retention and create upcoming partitions."
+    )
+    maintenance_parser.add_argument(
+        "--retention-months", type=int, default=None, help="Override AUDIT_RETENTION_MONTHS for this run."
+    )
+    subcommands.add_parser("purge-idempotency-keys", help="Delete expired idempotency keys.")
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        init_database(seed=not args.no_seed)
+    elif args.command == "audit-maintenance":
+        report = run_maintenance(args.retention_months)
+        archived = sum(month["rows"] for month in report["archived"])
+        logger.info(
+            f"Audit maintenance: {archived} row(s) archived from {len(report['archived'])} month(s), "
+            f"{report['partitions_added']} partition(s) added."
+        )
+    elif args.command == "purge-idempotency-keys":
+        purge_expired_keys()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
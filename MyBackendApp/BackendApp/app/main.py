@@ -1,13 +1,18 @@
 from fastapi import FastAPI
-from .models.database import engine, load_models
-from .models.tables import Base
-from .utils.populate import populate_packages
+from fastapi.responses import ORJSONResponse
+from .models.database import dispose_engines
 from .routes.users import router as users_router
 from .routes.packages import router as packages_router
 from .routes.customers import router as customers_router
 from .routes.audit_logs import router as audit_logs_router
 from .routes.landing_page import router as landing_page_router
+from .routes.metrics import router as metrics_router
 from .utils.loguru_config import logger
+from .utils.request_metrics import TimingMiddleware
+from .utils.idempotency import IdempotencyMiddleware
+from .utils.audit_log import audit_sink
+from .utils.subscriber_counts import subscriber_reconciler
+from .utils.login_throttle import failed_login_sink
 from loguru import logger as llog
 
 
@@ -16,7 +21,9 @@ def create_application() -> FastAPI:
     Function to create the FastAPI application and include all routes and modules.
     """
     logger.info("Initializing application...")
-    application = FastAPI(title="Communication LTD API", version="1.0.0")
+    # Responses are rendered with orjson; endpoints declare response models so
+    # FastAPI never has to walk ORM objects with jsonable_encoder
+    application = FastAPI(title="Communication LTD API", version="1.0.0", default_response_class=ORJSONResponse)
 
     # Include routers for all routes
     application.include_router(users_router, prefix="/users", tags=["Users"])
@@ -24,23 +31,31 @@ def create_application() -> FastAPI:
     application.include_router(customers_router, prefix="/customers", tags=["Customers"])
     application.include_router(audit_logs_router, prefix="/audit-logs", tags=["Audit Logs"])
     application.include_router(landing_page_router, tags=["Landing Pages"])
+    application.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
 
     logger.info("Routes registered successfully.")
-    llog.info("This is a test log for Loguru!")
-    return application
 
+    # Idempotency-Key replay for retried writes (inside the timing middleware, so replays are measured too)
+    application.add_middleware(IdempotencyMiddleware)
 
-def initialize_database():
-    """
-    Function to load models, create tables, and populate initial data.
-    """
-    logger.info("Starting table creation...")
-    load_models()
-    Base.metadata.create_all(bind=engine)
-    populate_packages()
-    logger.info("Table creation and data population completed.")
+    # Per-route latency and DB query metrics (served at /metrics, echoed in X-Server-Timing)
+    application.add_middleware(TimingMiddleware)
+
+    # Background audit and failed-login writers: drain the queues on graceful shutdown
+    application.add_event_handler("startup", audit_sink.start)
+    application.add_event_handler("shutdown", audit_sink.stop)
+    application.add_event_handler("startup", failed_login_sink.start)
+    application.add_event_handler("shutdown", failed_login_sink.stop)
+
+    # Periodic subscriber count drift check
+    application.add_event_handler("startup", subscriber_reconciler.start)
+    application.add_event_handler("shutdown", subscriber_reconciler.stop)
+    application.add_event_handler("shutdown", dispose_engines)
+
+    llog.info("This is a test log for Loguru!")
+    return application
 
 
-# Initialize database and application
-initialize_database()
+# Schema migrations and seed data are applied once per deploy with
+# `python -m app.cli init`, not on import, so workers boot without touching the database
 app = create_application()  # Ensure the 'app' variable is accessible
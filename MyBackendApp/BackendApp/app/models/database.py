@@ -1,33 +1,391 @@
-from sqlalchemy import create_engine, MetaData
-from sqlalchemy.orm import sessionmaker
-from ..utils.config import DATABASE_URL
+import inspect
+from contextlib import asynccontextmanager
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event, exc, MetaData
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from ..utils.config import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    DATABASE_REPLICA_URLS,
+    DB_ASYNC,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_REPLICA_SELECTION,
+    DB_REPLICA_STICKY_SECONDS,
+    DB_REPLICA_RETRY_INTERVAL,
+)
 from ..utils.loguru_config import logger
+from ..utils.metrics import PoolMetrics, engine_options
+from ..utils.replica_router import STICKY_COOKIE, ReplicaRouter, caller_key
+from ..utils.request_metrics import instrument_queries
+from ..utils.server_config import pool_limits
 
-# Database engine initialization
-engine = create_engine(DATABASE_URL)
+# Async drivers used when ASYNC_DATABASE_URL is not set explicitly
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Swap the driver of a sync database URL for its async counterpart,
+    e.g. mysql+pymysql:// -> mysql+aiomysql://.
+    :param url: Sync database URL.
+    :return: Async database URL.
+    """
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for database backend '{parsed.get_backend_name()}'")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def pool_options(url: str, metrics: PoolMetrics, limits: str = None) -> dict:
+    """
+    Pool settings from config, with checkout timing reported to the given metrics.
+    Sizes come from this worker's share of DB_MAX_CONNECTIONS when it is set.
+    :param limits: Engine whose pool limits apply ("sync" or "async"), by default metrics.name.
+    """
+    pool_size, max_overflow = worker_pool_limits[limits or metrics.name]
+    return engine_options(
+        url,
+        metrics,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+# Pool sizes for this worker process, resolved once before the engines are built
+worker_pool_limits = pool_limits()
+
+# Pool statistics per engine, reported by /metrics/db-pool
+pool_metrics = {"sync": PoolMetrics("sync")}
+
+# Database engine initialization (also used by background workers and table creation)
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL, pool_metrics["sync"]))
+pool_metrics["sync"].attach(engine)
+instrument_queries(engine)
 metadata = MetaData()
 
 # Session factory for database operations
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
+# Async engine and session factory, used by request handlers when DB_ASYNC is enabled
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    async_url = ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+    pool_metrics["async"] = PoolMetrics("async")
+    async_engine = create_async_engine(async_url, **pool_options(async_url, pool_metrics["async"]))
+    pool_metrics["async"].attach(async_engine.sync_engine)
+    instrument_queries(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Read replicas, in DATABASE_REPLICA_URLS order (see RoutingSession). Each one
+# gets the pool limits of the primary engine it stands in for.
+replica_engines = []
+async_replica_engines = []
+for index, replica_url in enumerate(DATABASE_REPLICA_URLS):
+    name = f"replica{index}"
+    pool_metrics[name] = PoolMetrics(name)
+    replica_engines.append(create_engine(replica_url, **pool_options(replica_url, pool_metrics[name], "sync")))
+    pool_metrics[name].attach(replica_engines[-1])
+    instrument_queries(replica_engines[-1])
+    if DB_ASYNC:
+        async_replica_url = to_async_url(replica_url)
+        pool_metrics[f"{name}_async"] = PoolMetrics(f"{name}_async")
+        async_replica_engines.append(
+            create_async_engine(async_replica_url, **pool_options(async_replica_url, pool_metrics[f"{name}_async"], "async"))
+        )
+        pool_metrics[f"{name}_async"].attach(async_replica_engines[-1].sync_engine)
+        instrument_queries(async_replica_engines[-1].sync_engine)
+
+replica_router = ReplicaRouter(
+    [make_url(url).render_as_string(hide_password=True) for url in DATABASE_REPLICA_URLS],
+    selection=DB_REPLICA_SELECTION,
+    sticky_seconds=DB_REPLICA_STICKY_SECONDS,
+    retry_interval=DB_REPLICA_RETRY_INTERVAL,
+)
+
+
+def _watch_replica(bind, index: int):
+    # A replica whose connections drop mid-request is skipped by later sessions
+    @event.listens_for(bind, "handle_error")
+    def _on_error(context):
+        if context.is_disconnect:
+            replica_router.mark_down(index, context.original_exception)
+
+
+for index, replica in enumerate(replica_engines):
+    _watch_replica(replica, index)
+for index, replica in enumerate(async_replica_engines):
+    _watch_replica(replica.sync_engine, index)
+
+
+def _is_plain_read(clause) -> bool:
+    return (
+        getattr(clause, "is_select", False)
+        and getattr(clause, "_for_update_arg", None) is None
+        and not clause.get_execution_options().get("use_primary", False)
+    )
+
+
+class RoutingSession(Session):
     """
-    Provide a database session and ensure proper closure.
+    Session of read-only requests. Plain SELECTs go to the replica chosen for
+    the session by replica_router; flushes, locking reads, other statements
+    and statements executed with execution_options(use_primary=True) go to
+    the primary, and so does everything after a write, so the session reads
+    its own writes. When the replica cannot be connected to, it is marked
+    down and the session falls back to the primary.
+    """
+
+    primary = engine
+    replicas = replica_engines
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or (clause is not None and not _is_plain_read(clause)):
+            self.info["on_primary"] = True
+        if self.info.get("on_primary") or clause is None:
+            return self.primary
+        if "replica" not in self.info:
+            self.info["replica"] = replica_router.choose(self.replicas)
+        index = self.info["replica"]
+        return self.primary if index is None else self.replicas[index]
+
+    def _connection_for_bind(self, engine, execution_options=None, **kw):
+        index = self.info.get("replica")
+        if index is None or engine is not self.replicas[index]:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        try:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        except (exc.OperationalError, exc.InterfaceError) as e:
+            # Nothing ran on the replica yet, so the session can continue on the primary
+            replica_router.mark_down(index, e.orig)
+            self.info["on_primary"] = True
+            return super()._connection_for_bind(self.primary, execution_options, **kw)
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, bind=engine, autocommit=False, autoflush=False)
+AsyncReadSessionLocal = None
+if DB_ASYNC:
+    class AsyncRoutingSession(RoutingSession):
+        primary = async_engine.sync_engine
+        replicas = [replica.sync_engine for replica in async_replica_engines]
+
+    AsyncReadSessionLocal = async_sessionmaker(
+        bind=async_engine, sync_session_class=AsyncRoutingSession, autoflush=False, expire_on_commit=False
+    )
+
+
+class ThreadedSession:
+    """
+    AsyncSession-compatible wrapper around a sync Session.
+    Each database call runs in Starlette's threadpool, so async handlers can use
+    the same code whether DB_ASYNC is enabled or not.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    @property
+    def bind(self):
+        return self.sync_session.get_bind()
+
+    @property
+    def info(self):
+        return self.sync_session.info
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self._execute_buffered, statement, params, **kwargs)
+
+    def _execute_buffered(self, statement, params=None, **kwargs):
+        result = self.sync_session.execute(statement, params, **kwargs)
+        # Buffer rows in the worker thread so iterating them never touches the database
+        # (statements that return no rows, e.g. bulk DML, cannot be frozen)
+        try:
+            return result.freeze()()
+        except (NotImplementedError, exc.ResourceClosedError):
+            return result
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return (await self.execute(statement, params, **kwargs)).scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        self.sync_session.delete(instance)
+
+    async def flush(self, objects=None):
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def stream(self, statement, params=None, **kwargs):
+        statement = statement.execution_options(stream_results=True)
+        result = await run_in_threadpool(self.sync_session.execute, statement, params, **kwargs)
+        return ThreadedResult(result)
+
+
+class ThreadedResult:
+    """
+    Minimal AsyncResult counterpart for ThreadedSession.stream(): rows are
+    fetched from the server-side cursor in the threadpool, one partition at a time.
+    """
+
+    def __init__(self, result):
+        self._result = result
+
+    async def partitions(self, size: int = None):
+        while True:
+            rows = await run_in_threadpool(self._result.fetchmany, size)
+            if not rows:
+                break
+            yield rows
+
+
+def open_session(read_only: bool = False):
+    """
+    Open a request session: an AsyncSession when DB_ASYNC is enabled,
+    otherwise a ThreadedSession over the sync engine.
+    :param read_only: Route reads to a read replica when any are configured (see RoutingSession).
+    """
+    if read_only and replica_router.enabled:
+        if DB_ASYNC:
+            return AsyncReadSessionLocal()
+        return ThreadedSession(ReadSessionLocal(expire_on_commit=False))
+    if DB_ASYNC:
+        return AsyncSessionLocal()
+    return ThreadedSession(SessionLocal(expire_on_commit=False))
+
+
+def after_commit(db, callback):
+    """
+    Run callback once the request's unit of work (see get_db) has committed,
+    e.g. cache updates that must not become visible if the transaction rolls
+    back. Coroutine functions are awaited. Only request sessions run them.
+    """
+    db.info.setdefault("after_commit", []).append(callback)
+
+
+# Requests after which the caller reads from the primary (see get_read_db)
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+async def get_db(request: Request, response: Response):
+    """
+    Request-scoped unit of work: provide a database session, commit it once
+    after the handler returns (before the response is sent) and roll it back
+    if the handler raises. Handlers flush when they need generated values
+    instead of committing themselves.
+    Yields:
+        db (AsyncSession | ThreadedSession): Active database session.
+    """
+    if request.method in WRITE_METHODS:
+        # Only sent along with a successful response, i.e. once the commit went through
+        replica_router.mark_client(response)
+    async with _unit_of_work(open_session()) as db:
+        yield db
+    if request.method in WRITE_METHODS:
+        replica_router.note_write(caller_key(request))
+
+
+def reads_from_replica(request: Request) -> bool:
+    """
+    Whether a read-only request may read from a replica: one is configured
+    and the caller did not write within DB_REPLICA_STICKY_SECONDS (its write
+    may not have replicated yet), on this worker or, going by the sticky
+    cookie, on any other.
+    """
+    return replica_router.enabled and not replica_router.is_sticky(
+        caller_key(request), request.cookies.get(STICKY_COOKIE)
+    )
+
+
+async def get_read_db(request: Request):
+    """
+    get_db for read-only endpoints: reads go to a read replica when
+    reads_from_replica allows it. Writes the request still makes, such as
+    audit rows, go to the primary.
     Yields:
-        db (Session): Active database session.
+        db (AsyncSession | ThreadedSession): Active database session.
     """
+    async with _unit_of_work(open_session(read_only=reads_from_replica(request))) as db:
+        yield db
+
+
+@asynccontextmanager
+async def _unit_of_work(db):
     logger.debug("Initializing database session.")
-    db = SessionLocal()
     try:
         yield db
-        logger.debug("Database session yielded successfully.")
+        await db.commit()
+        logger.debug("Database session committed.")
+    except HTTPException as e:
+        # An expected outcome of the request (401, 404, 429, ...), not a failure
+        logger.debug(f"Rolling back database session for HTTP {e.status_code}.")
+        await db.rollback()
+        raise
     except Exception as e:
         logger.error(f"Error occurred during database session: {e}")
+        await db.rollback()
         raise
     finally:
-        db.close()
+        callbacks = db.info.pop("after_commit", [])
+        await db.close()
         logger.debug("Database session closed.")
 
+    for callback in callbacks:
+        try:
+            result = callback()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"After-commit callback failed: {e}")
+
+async def dispose_engines():
+    """
+    Close pooled connections of the async engines on shutdown.
+    """
+    if async_engine is not None:
+        await async_engine.dispose()
+        for replica in async_replica_engines:
+            await replica.dispose()
+        logger.info("Async database engine disposed.")
+
 def load_models():
     """
     Dynamically loads all database models.
@@ -41,7 +399,9 @@ def load_models():
             AuditLog,
             FailedLoginAttempt,
             PasswordReset,
-            ContactSubmission
+            ContactSubmission,
+            UserSession,
+            IdempotencyKey
         )
         logger.info("Models loaded successfully.")
     except Exception as e:
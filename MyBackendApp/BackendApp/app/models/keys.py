@@ -0,0 +1,98 @@
+"""
+Primary keys: time-ordered UUIDv7 values stored as BINARY(16).
+
+Random uuid4 keys spread inserts over the whole primary key B-tree (page
+splits, a buffer pool that never stays warm), and InnoDB repeats the
+primary key in every secondary index, 36 bytes at a time as text. A UUIDv7
+starts with its millisecond timestamp, so new rows are appended at the
+right edge of the index, and 16 bytes are less than half the size.
+The application and the API keep using the canonical string form; UUIDKey
+converts at the database boundary.
+"""
+import secrets
+import threading
+import time
+from uuid import UUID
+from sqlalchemy.types import BINARY, TypeDecorator
+
+_RANDOM_BITS = (1 << 62) - 1
+_lock = threading.Lock()
+_last_stamp = 0
+
+
+def uuid7_at(milliseconds: int, sub_milliseconds: int = 0, random_bits: int = None) -> UUID:
+    """
+    UUIDv7 (RFC 9562) for a Unix time in milliseconds.
+    :param sub_milliseconds: 12 bits of extra clock precision (rand_a).
+    :param random_bits: 62 random bits (rand_b), drawn when not given.
+    """
+    if random_bits is None:
+        random_bits = secrets.randbits(62)
+    return UUID(int=(
+        (milliseconds & 0xFFFFFFFFFFFF) << 80
+        | 0x7 << 76
+        | (sub_milliseconds & 0xFFF) << 64
+        | 0b10 << 62
+        | random_bits & _RANDOM_BITS
+    ))
+
+
+def uuid7() -> UUID:
+    """
+    New UUIDv7. The 12 bits after the millisecond timestamp hold the
+    sub-millisecond time, bumped when needed so keys generated by this
+    process are strictly increasing.
+    """
+    global _last_stamp
+    now = time.time_ns()
+    stamp = (now // 1_000_000) << 12 | (now % 1_000_000) * 4096 // 1_000_000
+    with _lock:
+        stamp = max(stamp, _last_stamp + 1)
+        _last_stamp = stamp
+    return uuid7_at(stamp >> 12, stamp & 0xFFF)
+
+
+def new_id() -> str:
+    """
+    Canonical string of a new UUIDv7, the default of every UUIDKey primary key.
+    """
+    return str(uuid7())
+
+
+def canonical_id(value: str) -> str:
+    """
+    Canonical string of a key given in any form UUID() accepts (upper case,
+    without dashes, in braces), which UUIDKey binds to the same row. Values
+    that are no UUID are returned unchanged and match nothing.
+    """
+    try:
+        return str(UUID(value))
+    except (TypeError, ValueError):
+        return value
+
+
+class UUIDKey(TypeDecorator):
+    """
+    UUID stored as BINARY(16) and handled as its canonical string in Python.
+    Strings that are not UUIDs (e.g. a malformed ID in a URL) are bound as
+    their raw bytes, which match no key, so lookups find nothing instead of
+    failing.
+    """
+
+    impl = BINARY(16)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        if isinstance(value, UUID):
+            return value.bytes
+        try:
+            return UUID(value).bytes
+        except ValueError:
+            return str(value).encode("utf-8")
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, (bytes, bytearray)):
+            return str(UUID(bytes=bytes(value)))
+        return value
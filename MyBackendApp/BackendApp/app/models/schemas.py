@@ -0,0 +1,104 @@
+from datetime import date, datetime
+from pydantic import BaseModel, ConfigDict
+
+# Response models. Endpoints declare these as response_model so FastAPI
+# serializes through pydantic-core instead of walking ORM objects with
+# jsonable_encoder. from_attributes lets them read ORM instances and
+# SQLAlchemy Rows as well as dicts.
+
+
+class PackageResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    package_name: str
+    description: str | None = None
+    monthly_price: int
+    subscriber_count: int | None = 0
+
+
+class CustomerResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    first_name: str
+    last_name: str
+    phone_number: str | None = None
+    email_address: str
+    address: str | None = None
+    package_id: str | None = None
+
+
+class CustomerSearchPage(BaseModel):
+    items: list[CustomerResponse]
+    page: int
+    limit: int
+    has_more: bool
+
+
+class AuditLogResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    user_id: str
+    action: str
+    timestamp: datetime | None = None
+
+
+class AuditLogPage(BaseModel):
+    items: list[AuditLogResponse]
+    next_cursor: str | None = None
+
+
+class AuditLogArchive(BaseModel):
+    month: str
+    file: str
+    format: str
+    bytes: int
+
+
+class PackageStatsItem(BaseModel):
+    package_id: str
+    package_name: str
+    monthly_price: int
+    subscribers: int
+    mrr: int
+    churned: int
+    switched_in: int
+    switched_out: int
+    net_change: int
+
+
+class PackageStats(BaseModel):
+    generated_at: datetime
+    window_days: int
+    total_subscribers: int
+    total_mrr: int
+    packages: list[PackageStatsItem]
+
+
+class PackageCustomers(BaseModel):
+    package_id: str
+    package_name: str
+    customers: int
+
+
+class SignupBucket(BaseModel):
+    period: date
+    signups: int
+
+
+class CustomerStats(BaseModel):
+    generated_at: datetime
+    window_days: int
+    bucket: str
+    total_customers: int
+    customers_by_package: list[PackageCustomers]
+    signups_total: int
+    signups: list[SignupBucket]
+    churned: int
+    package_switches: int
+
+
+class DetailResponse(BaseModel):
+    detail: str
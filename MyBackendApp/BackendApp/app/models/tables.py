@@ -1,8 +1,8 @@
-from sqlalchemy import Column, String, Integer, Text, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, String, Integer, Text, Boolean, ForeignKey, DateTime, Index, LargeBinary
 from sqlalchemy.orm import relationship
-from uuid import uuid4
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
+from .keys import UUIDKey, new_id
 from ..utils.loguru_config import logger
 
 # Base for tables
@@ -12,7 +12,7 @@ Base = declarative_base()
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     full_name = Column(String(255), nullable=False)
     username = Column(String(255), unique=True, nullable=False)
     email = Column(String(255), unique=True, nullable=False)
@@ -25,31 +25,41 @@ class User(Base):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        logger.debug(f"User model initialized: {self.username}, Email: {self.email}")
+        logger.debug("User model initialized: {}, Email: {}", self.username, self.email)
 
 # Customer Table
 class Customer(Base):
     __tablename__ = "customers"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     first_name = Column(String(255), nullable=False)
     last_name = Column(String(255), nullable=False)
     phone_number = Column(String(20), nullable=True)
     email_address = Column(String(255), nullable=False)
     address = Column(String(255), nullable=True)
 
-    package_id = Column(String(36), ForeignKey("packages.id"), nullable=True)
+    package_id = Column(UUIDKey, ForeignKey("packages.id"), nullable=True)
     package = relationship("Package", back_populates="customers")
 
+    # Normalized copies for indexed prefix search (see utils/customer_search.py)
+    search_name = Column(String(255), nullable=True, index=True)
+    search_name_reversed = Column(String(255), nullable=True, index=True)
+    search_email = Column(String(255), nullable=True, index=True)
+    search_phone = Column(String(20), nullable=True, index=True)
+
+    # Signup time, for the signup series in /customers/stats (null for rows
+    # created before it was tracked and not found in the audit log)
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow, index=True)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        logger.debug(f"Customer model initialized: {self.first_name} {self.last_name}, Email: {self.email_address}")
+        logger.debug("Customer model initialized: {} {}, Email: {}", self.first_name, self.last_name, self.email_address)
 
 # Package Table
 class Package(Base):
     __tablename__ = "packages"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     package_name = Column(String(50), nullable=False, unique=True)
     description = Column(Text, nullable=True)
     monthly_price = Column(Integer, nullable=False)
@@ -59,41 +69,53 @@ class Package(Base):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        logger.debug(f"Package model initialized: {self.package_name}, Price: {self.monthly_price}")
+        logger.debug("Package model initialized: {}, Price: {}", self.package_name, self.monthly_price)
 
 # Audit Logs Table
 class AuditLog(Base):
     __tablename__ = "audit_logs"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
-    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    user_id = Column(UUIDKey, ForeignKey("users.id"), nullable=False)
     action = Column(Text, nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     user = relationship("User", back_populates="audit_logs")
 
+    # On MySQL the table is partitioned by month on timestamp (migration 0005),
+    # so its primary key there is (id, timestamp) and it has no foreign key
+    __table_args__ = (
+        # Serves newest-first listings and time-window scans
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        # Serves per-user listings ordered by time (keyset pagination)
+        Index("ix_audit_logs_user_id_timestamp", "user_id", "timestamp"),
+        # Serves exact-action filters and action-prefix scans (customer churn
+        # and package switches in the stats endpoints); MySQL indexes a TEXT prefix
+        Index("ix_audit_logs_action_timestamp", "action", "timestamp", mysql_length={"action": 64}),
+    )
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        logger.debug(f"AuditLog initialized for User ID: {self.user_id}, Action: {self.action}")
+        logger.debug("AuditLog initialized for User ID: {}, Action: {}", self.user_id, self.action)
 
 # Failed Login Attempts Table
 class FailedLoginAttempt(Base):
     __tablename__ = "failed_login_attempts"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     username = Column(String(255), nullable=False)
     ip_address = Column(String(50), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        logger.debug(f"FailedLoginAttempt initialized: Username: {self.username}, IP: {self.ip_address}")
+        logger.debug("FailedLoginAttempt initialized: Username: {}, IP: {}", self.username, self.ip_address)
 
 # Contact Form Submissions Table
 class ContactSubmission(Base):
     __tablename__ = "contact_submissions"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     name = Column(String(255), nullable=False)
     email = Column(String(255), nullable=False)
     message = Column(Text, nullable=False)
@@ -101,19 +123,41 @@ class ContactSubmission(Base):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        logger.debug(f"ContactSubmission initialized: Name: {self.name}, Email: {self.email}")
+        logger.debug("ContactSubmission initialized: Name: {}, Email: {}", self.name, self.email)
 
 
 # Relationships for User Table
 User.audit_logs = relationship("AuditLog", back_populates="user", cascade="all, delete-orphan")
 
 
+# User Sessions Table (one row per issued login token; only the token hash is stored)
+class UserSession(Base):
+    __tablename__ = "user_sessions"
+
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    user_id = Column(UUIDKey, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True)
+    remember_me = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    revoked = Column(Boolean, default=False)
+
+    user = relationship("User", back_populates="sessions")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        logger.debug("UserSession initialized for User ID: {}", self.user_id)
+
+
+User.sessions = relationship("UserSession", back_populates="user", cascade="all, delete-orphan")
+
+
 # Password Reset Table
 class PasswordReset(Base):
     __tablename__ = "password_resets"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
-    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    user_id = Column(UUIDKey, ForeignKey("users.id"), nullable=False)
     reset_token = Column(String(255), nullable=False, unique=True)
     token_expiry = Column(DateTime, nullable=False)
     used = Column(Boolean, default=False)
@@ -122,7 +166,7 @@ class PasswordReset(Base):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        logger.debug(f"PasswordReset model initialized for User ID: {self.user_id}")
+        logger.debug("PasswordReset model initialized for User ID: {}", self.user_id)
 
 
 # Relationship on the User Table
@@ -132,3 +176,22 @@ User.password_resets = relationship(
     back_populates="user",
     cascade="all, delete-orphan"
 )
+
+
+# Idempotency Keys Table (responses of mutating requests, replayed on retry; see utils/idempotency.py)
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # SHA-256 of the method, path, caller and Idempotency-Key header
+    key_hash = Column(String(64), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    # Null while the first request is still running (the row is its claim)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(255), nullable=True)
+    response_body = Column(LargeBinary(length=2 ** 24), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        logger.debug("IdempotencyKey initialized: {}", self.key_hash)
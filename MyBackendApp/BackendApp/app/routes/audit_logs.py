@@ -1,9 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from ..models.tables import AuditLog, User
-from ..models.database import get_db
+from ..models.database import get_db, get_read_db, reads_from_replica
+from ..models.schemas import AuditLogArchive, AuditLogPage, AuditLogResponse
 from ..utils.loguru_config import logger
+from ..utils.audit_log import fetch_audit_log_page, filter_audit_logs, audit_sink
+from ..utils.audit_retention import list_archives
+from ..utils.export import export_response
+from ..utils.session_store import (
+    ActiveSession,
+    get_current_session,
+    ensure_same_user,
+    audit_log_scope,
+    ensure_audit_log_admin,
+)
 
 router = APIRouter()
 
@@ -12,57 +26,150 @@ class AuditLogCreate(BaseModel):
     user_id: str
     action: str
 
-@router.get("/")
-def get_audit_logs(db: Session = Depends(get_db)):
+@router.get("/", response_model=AuditLogPage)
+async def get_audit_logs(
+    user_id: str = None,
+    action: str = None,
+    start: datetime = None,
+    end: datetime = None,
+    cursor: str = None,
+    limit: int = None,
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
-    Fetch all audit logs from the database.
+    Fetch a page of audit logs, newest first, with optional filters.
+    Only administrators see other users' logs.
+    :param user_id: Optional user ID filter.
+    :param action: Optional exact action filter.
+    :param start: Optional inclusive lower bound on timestamp.
+    :param end: Optional exclusive upper bound on timestamp.
+    :param cursor: Cursor from the previous page's next_cursor.
+    :param limit: Page size (bounded by AUDIT_LOG_MAX_PAGE_SIZE).
     :param db: Database session.
-    :return: List of all audit logs.
+    :param active: Authenticated session of the caller.
+    :return: Page of audit logs and the cursor for the next page.
     """
-    logger.info("Fetching all audit logs from the database.")
-    audit_logs = db.query(AuditLog).all()
-    logger.debug(f"Fetched {len(audit_logs)} audit logs.")
-    return audit_logs
+    user_id = audit_log_scope(active, user_id)
+    logger.info(f"Fetching a page of audit logs by user {active.user_id}.")
+    return await fetch_audit_log_page(
+        db, user_id=user_id, action=action, start=start, end=end, cursor=cursor, limit=limit
+    )
+
+@router.get("/export")
+async def export_audit_logs(
+    request: Request,
+    user_id: str = None,
+    action: str = None,
+    start: datetime = None,
+    end: datetime = None,
+    file_format: str = Query("ndjson", alias="format"),
+    gzip: bool = False,
+    active: ActiveSession = Depends(get_current_session),
+):
+    """
+    Stream audit logs, newest first, as NDJSON or CSV without materializing the table.
+    Only administrators export other users' logs.
+    :param request: Incoming request (decides between replica and primary).
+    :param user_id: Optional user ID filter.
+    :param action: Optional exact action filter.
+    :param start: Optional inclusive lower bound on timestamp.
+    :param end: Optional exclusive upper bound on timestamp.
+    :param file_format: "ndjson" (default) or "csv".
+    :param gzip: Gzip-compress the download.
+    :param active: Authenticated session of the caller.
+    :return: Streaming file download.
+    """
+    user_id = audit_log_scope(active, user_id)
+    logger.info(f"Exporting audit logs as {file_format} by user {active.user_id}.")
+    statement = filter_audit_logs(
+        select(AuditLog.id, AuditLog.user_id, AuditLog.action, AuditLog.timestamp),
+        user_id=user_id, action=action, start=start, end=end,
+    ).order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
+    return export_response(statement, "audit_logs", file_format, gzip, read_only=reads_from_replica(request))
+
+@router.get("/sink/metrics")
+async def get_audit_sink_metrics():
+    """
+    Report queue depth, batch sizes and backpressure counters of the background audit writer.
+    :return: Audit writer metrics.
+    """
+    return audit_sink.metrics()
+
+@router.get("/archives", response_model=list[AuditLogArchive])
+async def get_audit_log_archives(active: ActiveSession = Depends(get_current_session)):
+    """
+    List the monthly archive files of audit logs moved out of the database by
+    the retention job, oldest first. Administrators only.
+    :param active: Authenticated session of the caller.
+    :return: Archived months with their file name, format and size.
+    """
+    ensure_audit_log_admin(active)
+    logger.info(f"Listing audit log archives by user {active.user_id}.")
+    return await run_in_threadpool(list_archives)
 
-@router.get("/{log_id}")
-def get_audit_log(log_id: str, db: Session = Depends(get_db)):
+@router.get("/{log_id}", response_model=AuditLogResponse)
+async def get_audit_log(
+    log_id: str,
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
-    Fetch a specific audit log by its ID.
+    Fetch a specific audit log by its ID. Only administrators fetch other users' logs.
     :param log_id: The ID of the audit log to fetch.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: Audit log details.
     """
     logger.info(f"Fetching audit log with ID: {log_id}")
-    audit_log = db.query(AuditLog).filter(AuditLog.id == log_id).first()
+    audit_log = (await db.execute(
+        select(AuditLog.id, AuditLog.user_id, AuditLog.action, AuditLog.timestamp).where(AuditLog.id == log_id)
+    )).first()
     if not audit_log:
         logger.warning(f"Audit log with ID {log_id} not found.")
         raise HTTPException(status_code=404, detail="Audit log not found")
-    logger.debug(f"Fetched audit log details: {audit_log}")
+    audit_log_scope(active, audit_log.user_id)
+    logger.debug("Fetched audit log details: {}", audit_log)
     return audit_log
 
-@router.get("/user/{user_id}")
-def get_audit_logs_by_user(user_id: str, db: Session = Depends(get_db)):
+@router.get("/user/{user_id}", response_model=AuditLogPage)
+async def get_audit_logs_by_user(
+    user_id: str,
+    cursor: str = None,
+    limit: int = None,
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
-    Fetch all audit logs for a specific user.
+    Fetch a page of audit logs for a specific user, newest first.
+    Only administrators fetch other users' logs.
     :param user_id: The ID of the user.
+    :param cursor: Cursor from the previous page's next_cursor.
+    :param limit: Page size (bounded by AUDIT_LOG_MAX_PAGE_SIZE).
     :param db: Database session.
-    :return: List of audit logs for the user.
+    :param active: Authenticated session of the caller.
+    :return: Page of audit logs for the user and the cursor for the next page.
     """
+    user_id = audit_log_scope(active, user_id)
     logger.info(f"Fetching audit logs for user ID: {user_id}")
-    audit_logs = db.query(AuditLog).filter(AuditLog.user_id == user_id).all()
-    logger.debug(f"Fetched {len(audit_logs)} audit logs for user ID {user_id}.")
-    return audit_logs
+    return await fetch_audit_log_page(db, user_id=user_id, cursor=cursor, limit=limit)
 
-@router.post("/")
-def create_audit_log(audit_log: AuditLogCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=AuditLogResponse)
+async def create_audit_log(
+    audit_log: AuditLogCreate,
+    db: AsyncSession = Depends(get_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
     Create a new audit log entry in the database.
     :param audit_log: Details of the audit log to create.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: Details of the created audit log.
     """
+    ensure_same_user(active, audit_log.user_id)
     logger.info(f"Creating a new audit log for user ID: {audit_log.user_id}")
-    user = db.query(User).filter(User.id == audit_log.user_id).first()
+    user = await db.scalar(select(User).where(User.id == audit_log.user_id))
     if not user:
         logger.warning(f"User with ID {audit_log.user_id} not found.")
         raise HTTPException(status_code=404, detail="User not found")
@@ -72,13 +179,12 @@ def create_audit_log(audit_log: AuditLogCreate, db: Session = Depends(get_db)):
         action=audit_log.action
     )
     db.add(new_audit_log)
-    db.commit()
-    db.refresh(new_audit_log)
+    await db.flush()
     logger.info(f"Audit log created successfully with ID: {new_audit_log.id}")
     return new_audit_log
 
 @router.get("/actions")
-def get_possible_actions():
+async def get_possible_actions():
     """
     Fetch all possible actions for audit logging.
     :return: List of predefined actions.
@@ -1,10 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, File, Query, Request, UploadFile
+from sqlalchemy import delete, inspect, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
-from ..models.tables import Customer, Package
-from ..models.database import get_db
+from ..models.keys import canonical_id
+from ..models.tables import Customer
+from ..models.database import after_commit, get_db, get_read_db, reads_from_replica
+from ..models.schemas import CustomerResponse, CustomerSearchPage, CustomerStats, DetailResponse
 from ..utils.loguru_config import logger
 from ..utils.audit_log import create_audit_log_entry
+from ..utils.package_cache import package_cache
+from ..utils.session_store import ActiveSession, get_current_session, ensure_same_user
+from ..utils.bulk_import import detect_format, import_customers
+from ..utils.export import export_response
+from ..utils.subscriber_counts import adjust_subscriber_counts, apply_cached_deltas
+from ..utils.customer_search import apply_search_columns, search_customers
+from ..utils.pagination import clamp_page_size
+from ..utils.responses import rows_response
+from ..utils.customer_stats import BUCKETS, churn_action, customer_stats, switch_action
+from ..utils.config import CUSTOMER_SEARCH_PAGE_SIZE, CUSTOMER_SEARCH_MAX_PAGE_SIZE, STATS_DEFAULT_DAYS, STATS_MAX_DAYS
 
 router = APIRouter()
 
@@ -30,48 +44,148 @@ class CustomerUpdate(BaseModel):
 class UserRequest(BaseModel):
     user_id: str
 
-@router.get("/")
-def get_customers(request: UserRequest, db: Session = Depends(get_db)):
+# Columns returned by the customer endpoints (internal search columns are left out)
+CUSTOMER_COLUMNS = (
+    Customer.id,
+    Customer.first_name,
+    Customer.last_name,
+    Customer.phone_number,
+    Customer.email_address,
+    Customer.address,
+    Customer.package_id,
+)
+
+@router.get("/", response_model=list[CustomerResponse])
+async def get_customers(
+    request: UserRequest,
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
     Fetch all customers from the database.
     :param request: UserRequest containing the user ID.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: List of all customers.
     """
+    ensure_same_user(active, request.user_id)
     logger.info(f"Fetching all customers by user {request.user_id}.")
-    customers = db.query(Customer).all()
-    create_audit_log_entry(user_id=request.user_id, action="Fetched all customers", db=db)
-    logger.debug(f"Fetched {len(customers)} customers.")
-    return customers
+    customers = (await db.execute(select(*CUSTOMER_COLUMNS))).all()
+    await create_audit_log_entry(user_id=active.user_id, action="Fetched all customers", db=db)
+    logger.debug("Fetched {} customers.", len(customers))
+    return rows_response(customers)
+
+@router.get("/export")
+async def export_customers(
+    request: Request,
+    file_format: str = Query("ndjson", alias="format"),
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
+    """
+    Stream every customer as NDJSON or CSV without materializing the table.
+    :param request: Incoming request (decides between replica and primary).
+    :param file_format: "ndjson" (default) or "csv".
+    :param gzip: Gzip-compress the download.
+    :param db: Database session.
+    :param active: Authenticated session of the caller.
+    :return: Streaming file download.
+    """
+    logger.info(f"Exporting customers as {file_format} by user {active.user_id}.")
+    statement = select(*CUSTOMER_COLUMNS).order_by(Customer.id)
+    response = export_response(statement, "customers", file_format, gzip, read_only=reads_from_replica(request))
+    await create_audit_log_entry(user_id=active.user_id, action="Exported customers", db=db)
+    return response
+
+@router.get("/search", response_model=CustomerSearchPage)
+async def find_customers(
+    q: str = Query(..., min_length=1, max_length=255),
+    page: int = Query(1, ge=1),
+    limit: int = None,
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
+    """
+    Type-ahead search over customer name, email, phone and address.
+    Exact matches come first, then prefix matches, then full-text matches by relevance.
+    :param q: Search text.
+    :param page: 1-based page number.
+    :param limit: Results per page (capped by CUSTOMER_SEARCH_MAX_PAGE_SIZE).
+    :param db: Database session.
+    :param active: Authenticated session of the caller.
+    :return: Page of matching customers and whether more results exist.
+    """
+    limit = clamp_page_size(limit, CUSTOMER_SEARCH_PAGE_SIZE, CUSTOMER_SEARCH_MAX_PAGE_SIZE)
+    logger.info(f"Searching customers by user {active.user_id}.")
+    results = await search_customers(db, q, page, limit)
+    await create_audit_log_entry(user_id=active.user_id, action="Searched customers", db=db)
+    logger.debug("Customer search returned {} results (page {}).", len(results["items"]), page)
+    return results
 
-@router.get("/{customer_id}")
-def get_customer(customer_id: str, request: UserRequest, db: Session = Depends(get_db)):
+@router.get("/stats", response_model=CustomerStats)
+async def get_customer_stats(
+    days: int = Query(STATS_DEFAULT_DAYS, ge=1, le=STATS_MAX_DAYS),
+    bucket: str = Query("day", pattern=f"^({'|'.join(BUCKETS)})$"),
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
+    """
+    Customer totals per package, churn and package switches, and the signup
+    series over the last `days` days. Results are cached briefly.
+    :param days: Look-back window in days.
+    :param bucket: Signup series granularity: "day", "week" or "month".
+    :param db: Database session.
+    :param active: Authenticated session of the caller.
+    :return: Customer statistics.
+    """
+    logger.info(f"Fetching customer stats ({days} days by {bucket}) by user {active.user_id}.")
+    stats = await customer_stats(db, days, bucket)
+    await create_audit_log_entry(user_id=active.user_id, action="Fetched customer stats", db=db)
+    return stats
+
+@router.get("/{customer_id}", response_model=CustomerResponse)
+async def get_customer(
+    customer_id: str,
+    request: UserRequest,
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
     Fetch a specific customer by their ID.
     :param customer_id: The ID of the customer to fetch.
     :param request: UserRequest containing the user ID.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: Customer details.
     """
+    ensure_same_user(active, request.user_id)
     logger.info(f"Fetching customer with ID: {customer_id} by user {request.user_id}.")
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    customer = (await db.execute(select(*CUSTOMER_COLUMNS).where(Customer.id == customer_id))).first()
     if not customer:
         logger.warning(f"Customer with ID {customer_id} not found.")
         raise HTTPException(status_code=404, detail="Customer not found")
-    create_audit_log_entry(user_id=request.user_id, action=f"Fetched customer {customer_id}", db=db)
-    logger.debug(f"Fetched customer details: {customer}")
+    await create_audit_log_entry(user_id=active.user_id, action=f"Fetched customer {customer_id}", db=db)
+    logger.debug("Fetched customer details: {}", customer)
     return customer
 
-@router.post("/")
-def create_customer(customer: CustomerCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=CustomerResponse)
+async def create_customer(
+    customer: CustomerCreate,
+    db: AsyncSession = Depends(get_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
     Create a new customer in the database.
     :param customer: Details of the customer to create, including user ID.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: Details of the created customer.
     """
+    ensure_same_user(active, customer.user_id)
     logger.info(f"Creating a new customer: {customer.first_name} {customer.last_name} by user {customer.user_id}.")
-    package = db.query(Package).filter(Package.id == customer.package_id).first()
+    package_id = canonical_id(customer.package_id)
+    package = await package_cache.get(db, package_id)
     if not package:
         logger.warning(f"Package with ID {customer.package_id} not found.")
         raise HTTPException(status_code=404, detail="Package not found")
@@ -82,48 +196,85 @@ def create_customer(customer: CustomerCreate, db: Session = Depends(get_db)):
         phone_number=customer.phone_number,
         email_address=customer.email_address,
         address=customer.address,
-        package_id=customer.package_id
+        package_id=package_id
     )
+    apply_search_columns(new_customer)
     db.add(new_customer)
 
     # Increment subscriber count for the package
-    package.subscriber_count += 1
+    deltas = {package_id: 1}
+    await adjust_subscriber_counts(db, deltas)
 
-    db.commit()
-    db.refresh(new_customer)
-    create_audit_log_entry(user_id=customer.user_id, action=f"Created customer {new_customer.id}", db=db)
+    # Flush for the generated ID; get_db commits the customer, the count and the audit row together
+    await db.flush()
+    after_commit(db, lambda: apply_cached_deltas(deltas))
+    await create_audit_log_entry(user_id=active.user_id, action=f"Created customer {new_customer.id}", db=db)
     logger.info(f"Customer created successfully with ID: {new_customer.id}")
     return new_customer
 
-@router.put("/{customer_id}")
-def update_customer(customer_id: str, customer: CustomerUpdate, db: Session = Depends(get_db)):
+@router.post("/bulk")
+async def bulk_import_customers(
+    file: UploadFile = File(...),
+    file_format: str = Query(None, alias="format"),
+    db: AsyncSession = Depends(get_db),
+    active: ActiveSession = Depends(get_current_session),
+):
+    """
+    Import customers from an uploaded CSV or NDJSON file.
+    Each row carries the CustomerCreate fields (without user_id); rows are
+    validated and inserted in chunks, and invalid rows are reported without
+    aborting the import.
+    :param file: CSV (with header row) or NDJSON upload.
+    :param file_format: "csv" or "ndjson"; detected from the file extension when omitted.
+    :param db: Database session.
+    :param active: Authenticated session of the caller.
+    :return: Inserted/failed counts and per-row errors.
+    """
+    fmt = detect_format(file, file_format)
+    logger.info(f"Bulk importing customers from {file.filename} ({fmt}) by user {active.user_id}.")
+    report = await import_customers(db, file, fmt, active.user_id, CustomerCreate)
+    await create_audit_log_entry(
+        user_id=active.user_id,
+        action=f"Bulk imported {report['inserted']} customers ({report['failed']} rows rejected)",
+        db=db,
+    )
+    logger.info(f"Bulk import finished: {report['inserted']} inserted, {report['failed']} failed.")
+    return report
+
+@router.put("/{customer_id}", response_model=CustomerResponse)
+async def update_customer(
+    customer_id: str,
+    customer: CustomerUpdate,
+    db: AsyncSession = Depends(get_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
     Update an existing customer's details in the database.
     :param customer_id: The ID of the customer to update.
     :param customer: Updated details for the customer, including user ID.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: Updated customer details.
     """
+    ensure_same_user(active, customer.user_id)
     logger.info(f"Updating customer with ID: {customer_id} by user {customer.user_id}.")
-    db_customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    # Lock the customer row so concurrent package switches count it once
+    db_customer = await db.scalar(select(Customer).where(Customer.id == customer_id).with_for_update())
     if not db_customer:
         logger.warning(f"Customer with ID {customer_id} not found.")
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    if customer.package_id and customer.package_id != db_customer.package_id:
-        # Handle package subscriber count updates
-        old_package = db.query(Package).filter(Package.id == db_customer.package_id).first()
-        new_package = db.query(Package).filter(Package.id == customer.package_id).first()
-
-        if not new_package:
+    # Audit actions and count deltas use canonical IDs (stats parse them at fixed offsets)
+    deltas, switched, previous_package_id = {}, None, db_customer.package_id
+    package_id = customer.package_id and canonical_id(customer.package_id)
+    if package_id and package_id != previous_package_id:
+        if not await package_cache.get(db, package_id):
             logger.warning(f"New package with ID {customer.package_id} not found.")
             raise HTTPException(status_code=404, detail="New package not found")
 
-        if old_package:
-            old_package.subscriber_count -= 1
-
-        new_package.subscriber_count += 1
-        db_customer.package_id = customer.package_id
+        deltas = {previous_package_id: -1, package_id: 1}
+        switched = switch_action(db_customer.id, previous_package_id, package_id)
+        db_customer.package_id = package_id
 
     if customer.first_name:
         db_customer.first_name = customer.first_name
@@ -135,36 +286,64 @@ def update_customer(customer_id: str, customer: CustomerUpdate, db: Session = De
         db_customer.email_address = customer.email_address
     if customer.address:
         db_customer.address = customer.address
+    apply_search_columns(db_customer)
+
+    if deltas:
+        # Write the changes only if the customer is still on the package read
+        # above; just the request that moved it adjusts the subscriber counts,
+        # so concurrent switches count it once even where FOR UPDATE locks
+        # nothing (SQLite)
+        changes = {attr.key: attr.value for attr in inspect(db_customer).attrs if attr.history.has_changes()}
+        moved = await db.execute(
+            update(Customer)
+            .where(Customer.id == db_customer.id, Customer.package_id == previous_package_id)
+            .values(**changes)
+            .execution_options(synchronize_session=False)
+        )
+        if not moved.rowcount:
+            logger.warning(f"Customer with ID {customer_id} was changed by a concurrent request.")
+            raise HTTPException(status_code=409, detail="Customer was changed by another request, retry")
+        for name, value in changes.items():
+            set_committed_value(db_customer, name, value)
+        await adjust_subscriber_counts(db, deltas)
 
-    db.commit()
-    db.refresh(db_customer)
-    create_audit_log_entry(user_id=customer.user_id, action=f"Updated customer {customer_id}", db=db)
+    after_commit(db, lambda: apply_cached_deltas(deltas))
+    await create_audit_log_entry(user_id=active.user_id, action=f"Updated customer {db_customer.id}", db=db)
+    if switched:
+        await create_audit_log_entry(user_id=active.user_id, action=switched, db=db)
     logger.info(f"Customer with ID {customer_id} updated successfully.")
     return db_customer
 
-@router.delete("/{customer_id}")
-def delete_customer(customer_id: str, request: UserRequest, db: Session = Depends(get_db)):
+@router.delete("/{customer_id}", response_model=DetailResponse)
+async def delete_customer(
+    customer_id: str,
+    request: UserRequest,
+    db: AsyncSession = Depends(get_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
     Delete a customer from the database.
     :param customer_id: The ID of the customer to delete.
     :param request: UserRequest containing the user ID.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: Confirmation of deletion.
     """
+    ensure_same_user(active, request.user_id)
     logger.info(f"Deleting customer with ID: {customer_id} by user {request.user_id}.")
-    db_customer = db.query(Customer).filter(Customer.id == customer_id).first()
-    if not db_customer:
+    db_customer = await db.scalar(select(Customer).where(Customer.id == customer_id).with_for_update())
+    # Only the request whose DELETE removed the row decrements the count, so
+    # concurrent deletes count it once even where FOR UPDATE locks nothing (SQLite)
+    deleted = db_customer and await db.execute(delete(Customer).where(Customer.id == customer_id))
+    if not deleted or not deleted.rowcount:
         logger.warning(f"Customer with ID {customer_id} not found.")
         raise HTTPException(status_code=404, detail="Customer not found")
 
     # Handle package subscriber count updates
-    if db_customer.package_id:
-        package = db.query(Package).filter(Package.id == db_customer.package_id).first()
-        if package:
-            package.subscriber_count -= 1
-
-    db.delete(db_customer)
-    db.commit()
-    create_audit_log_entry(user_id=request.user_id, action=f"Deleted customer {customer_id}", db=db)
+    deltas = {db_customer.package_id: -1}
+    await adjust_subscriber_counts(db, deltas)
+
+    after_commit(db, lambda: apply_cached_deltas(deltas))
+    await create_audit_log_entry(user_id=active.user_id, action=churn_action(db_customer.id, db_customer.package_id), db=db)
     logger.info(f"Customer with ID {customer_id} deleted successfully.")
     return {"detail": "Customer deleted successfully"}
@@ -1,15 +1,18 @@
 import os
+from datetime import datetime
 from fastapi import APIRouter, Depends
 from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
-from ..models.database import get_db
-from ..models.tables import AuditLog
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.database import get_read_db
+from ..models.schemas import AuditLogPage
 from ..utils.loguru_config import logger
+from ..utils.audit_log import fetch_audit_log_page
+from ..utils.session_store import ActiveSession, get_current_session, audit_log_scope
 
 router = APIRouter()
 
 @router.get("/", response_class=HTMLResponse)
-def landing_page():
+async def landing_page():
     """
     Render the landing page with Bootstrap (Dark Theme).
     """
@@ -36,7 +39,7 @@ def landing_page():
 
 
 @router.get("/audit-logs-view", response_class=HTMLResponse)
-def audit_logs_view():
+async def audit_logs_view():
     """
     Render a page to view and filter Audit Logs.
     """
@@ -51,9 +54,27 @@ def audit_logs_view():
     <body class="bg-dark text-light">
         <div class="container mt-5">
             <h1 class="text-center mb-4">Audit Logs</h1>
-            <div class="mb-3">
-                <label for="userIdInput" class="form-label">Filter by User ID</label>
-                <input type="text" id="userIdInput" class="form-control" placeholder="Enter User ID">
+            <div class="row g-3 mb-3">
+                <div class="col-md-12">
+                    <label for="tokenInput" class="form-label">Session Token</label>
+                    <input type="password" id="tokenInput" class="form-control" placeholder="Token returned by /users/login">
+                </div>
+                <div class="col-md-3">
+                    <label for="userIdInput" class="form-label">Filter by User ID</label>
+                    <input type="text" id="userIdInput" class="form-control" placeholder="Enter User ID">
+                </div>
+                <div class="col-md-3">
+                    <label for="actionInput" class="form-label">Filter by Action</label>
+                    <input type="text" id="actionInput" class="form-control" placeholder="e.g. User login">
+                </div>
+                <div class="col-md-3">
+                    <label for="startInput" class="form-label">From</label>
+                    <input type="datetime-local" id="startInput" class="form-control">
+                </div>
+                <div class="col-md-3">
+                    <label for="endInput" class="form-label">To</label>
+                    <input type="datetime-local" id="endInput" class="form-control">
+                </div>
             </div>
             <button class="btn btn-primary mb-4" onclick="filterLogs()">Filter Logs</button>
             <table class="table table-dark table-striped">
@@ -68,33 +89,71 @@ def audit_logs_view():
                 <tbody id="auditLogsTable">
                 </tbody>
             </table>
+            <div class="text-center mb-5">
+                <button id="loadMoreButton" class="btn btn-secondary d-none" onclick="loadMore()">Load more</button>
+            </div>
         </div>
 
         <script>
-            async function fetchLogs(userId = null) {
-                const endpoint = userId ? `/audit-logs?user_id=${userId}` : '/audit-logs';
-                const response = await fetch(endpoint);
-                const logs = await response.json();
+            let currentFilters = {};
+            let nextCursor = null;
+
+            function escapeHtml(value) {
+                const div = document.createElement("div");
+                div.textContent = value ?? "";
+                return div.innerHTML;
+            }
+
+            async function fetchLogs(append = false) {
+                const params = new URLSearchParams(currentFilters);
+                if (append && nextCursor) {
+                    params.set("cursor", nextCursor);
+                }
+                const token = document.getElementById("tokenInput").value.trim();
+                const response = await fetch(`/audit-logs-view-filter?${params.toString()}`, {
+                    headers: token ? {"Authorization": `Bearer ${token}`} : {},
+                });
+                const page = await response.json();
                 const tableBody = document.getElementById("auditLogsTable");
-                tableBody.innerHTML = "";
-                logs.forEach(log => {
-                    const row = `<tr>
-                        <td>${log.id}</td>
-                        <td>${log.user_id}</td>
-                        <td>${log.action}</td>
+                if (!append) {
+                    tableBody.innerHTML = "";
+                }
+                if (!response.ok) {
+                    tableBody.innerHTML = `<tr><td colspan="4">${escapeHtml(typeof page.detail === "string" ? page.detail : response.statusText)}</td></tr>`;
+                    nextCursor = null;
+                    document.getElementById("loadMoreButton").classList.add("d-none");
+                    return;
+                }
+                const rows = page.items.map(log => `<tr>
+                        <td>${escapeHtml(log.id)}</td>
+                        <td>${escapeHtml(log.user_id)}</td>
+                        <td>${escapeHtml(log.action)}</td>
                         <td>${new Date(log.timestamp).toLocaleString()}</td>
-                    </tr>`;
-                    tableBody.innerHTML += row;
-                });
+                    </tr>`);
+                tableBody.insertAdjacentHTML("beforeend", rows.join(""));
+                nextCursor = page.next_cursor;
+                document.getElementById("loadMoreButton").classList.toggle("d-none", !nextCursor);
             }
 
             function filterLogs() {
+                currentFilters = {};
                 const userId = document.getElementById("userIdInput").value.trim();
-                fetchLogs(userId || null);
+                const action = document.getElementById("actionInput").value.trim();
+                const start = document.getElementById("startInput").value;
+                const end = document.getElementById("endInput").value;
+                if (userId) currentFilters.user_id = userId;
+                if (action) currentFilters.action = action;
+                if (start) currentFilters.start = start;
+                if (end) currentFilters.end = end;
+                nextCursor = null;
+                fetchLogs();
+            }
+
+            function loadMore() {
+                fetchLogs(true);
             }
 
-            // Load logs on page load
-            document.addEventListener("DOMContentLoaded", () => fetchLogs());
+            // Logs are only fetched once a session token has been entered
         </script>
     </body>
     </html>
@@ -102,19 +161,32 @@ def audit_logs_view():
     return HTMLResponse(content=html_content)
 
 
-@router.get("/audit-logs-view-filter")
-def get_audit_logs(user_id: str = None, db: Session = Depends(get_db)):
+@router.get("/audit-logs-view-filter", response_model=AuditLogPage)
+async def get_audit_logs(
+    user_id: str = None,
+    action: str = None,
+    start: datetime = None,
+    end: datetime = None,
+    cursor: str = None,
+    limit: int = None,
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
-    Fetch Audit Logs, optionally filtered by User ID.
+    Fetch a page of Audit Logs, optionally filtered by User ID, action and time range.
+    Only administrators see other users' logs.
     :param user_id: Optional User ID to filter logs.
+    :param action: Optional exact action to filter logs.
+    :param start: Optional inclusive lower bound on timestamp.
+    :param end: Optional exclusive upper bound on timestamp.
+    :param cursor: Cursor from the previous page's next_cursor.
+    :param limit: Page size (bounded by AUDIT_LOG_MAX_PAGE_SIZE).
     :param db: Database session.
-    :return: List of audit logs.
+    :param active: Authenticated session of the caller.
+    :return: Page of audit logs and the cursor for the next page.
     """
+    user_id = audit_log_scope(active, user_id)
     logger.info("Fetching audit logs from the database.")
-    if user_id:
-        logs = db.query(AuditLog).filter(AuditLog.user_id == user_id).all()
-        logger.debug(f"Fetched {len(logs)} logs for User ID: {user_id}.")
-    else:
-        logs = db.query(AuditLog).all()
-        logger.debug(f"Fetched {len(logs)} logs.")
-    return [{"id": log.id, "user_id": log.user_id, "action": log.action, "timestamp": log.timestamp} for log in logs]
+    return await fetch_audit_log_page(
+        db, user_id=user_id, action=action, start=start, end=end, cursor=cursor, limit=limit
+    )
@@ -0,0 +1,63 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..models.database import pool_metrics, replica_router
+from ..utils.session_store import session_store
+from ..utils.login_throttle import login_throttle
+from ..utils.idempotency import idempotency_store
+from ..utils.request_metrics import route_metrics
+
+router = APIRouter()
+
+@router.get("", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """
+    Per-route request counts, latency, DB time and query count histograms
+    in the Prometheus text format.
+    :return: Prometheus exposition text.
+    """
+    return PlainTextResponse(route_metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@router.get("/db-pool")
+async def get_db_pool_metrics():
+    """
+    Report connection pool state, checkout wait-time and hold-time histograms,
+    and connection lifetime statistics for each database engine.
+    :return: Pool metrics keyed by engine ("sync", "async").
+    """
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+
+@router.get("/replicas")
+async def get_replica_metrics():
+    """
+    Report the read replicas with their state and number of sessions served,
+    plus sessions sent to the primary because the caller had just written
+    (sticky) or every replica was down.
+    :return: Replica routing statistics.
+    """
+    return replica_router.stats()
+
+@router.get("/sessions")
+async def get_session_cache_metrics():
+    """
+    Report hit/miss counters of the in-memory session cache.
+    :return: Session cache statistics.
+    """
+    return session_store.stats()
+
+@router.get("/login-throttle")
+async def get_login_throttle_metrics():
+    """
+    Report allowed/throttled login counters, tracked limiter keys and the
+    state of the failed-login writer.
+    :return: Login throttle statistics.
+    """
+    return login_throttle.stats()
+
+@router.get("/idempotency")
+async def get_idempotency_metrics():
+    """
+    Report executed, replayed, coalesced and conflicting idempotent requests
+    and the size of the in-memory response cache.
+    :return: Idempotency store statistics.
+    """
+    return idempotency_store.stats()
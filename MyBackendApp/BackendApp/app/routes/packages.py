@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..models.tables import Package
-from ..models.database import get_db
+from ..models.database import after_commit, get_db, get_read_db
+from ..models.schemas import DetailResponse, PackageResponse, PackageStats
 from pydantic import BaseModel
 from ..utils.loguru_config import logger
 from ..utils.audit_log import create_audit_log_entry
+from ..utils.package_cache import package_cache
+from ..utils.session_store import ActiveSession, get_current_session, ensure_same_user
+from ..utils.subscriber_counts import subscriber_reconciler
+from ..utils.customer_stats import package_stats
+from ..utils.config import STATS_DEFAULT_DAYS, STATS_MAX_DAYS
 
 router = APIRouter()
 
@@ -35,48 +42,128 @@ class UserRequest(BaseModel):
     user_id: str
 
 
-@router.get("/")
-def get_packages(request: UserRequest, db: Session = Depends(get_db)):
+@router.get("/", response_model=list[PackageResponse])
+async def get_packages(
+    request: UserRequest,
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
     Fetch all packages from the database.
     :param request: UserRequest containing the user ID.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: List of all packages.
     """
+    ensure_same_user(active, request.user_id)
     logger.info(f"Fetching all packages by user {request.user_id}.")
-    packages = db.query(Package).all()
-    create_audit_log_entry(user_id=request.user_id, action="Fetched all packages", db=db)
-    logger.debug(f"Fetched {len(packages)} packages.")
+    packages = await package_cache.all(db)
+    await create_audit_log_entry(user_id=active.user_id, action="Fetched all packages", db=db)
+    logger.debug("Fetched {} packages.", len(packages))
     return packages
 
 
-@router.get("/{package_id}")
-def get_package(request: UserRequest, package_id: str, db: Session = Depends(get_db)):
+@router.get("/cache/stats")
+async def get_package_cache_stats():
+    """
+    Report hit/miss counters of the in-process package cache.
+    :return: Package cache statistics.
+    """
+    return package_cache.stats()
+
+
+@router.get("/subscribers/reconcile")
+async def get_subscriber_reconcile_report():
+    """
+    Return the report of the most recent subscriber count reconciliation.
+    :return: Last drift report, or null if reconciliation has not run yet.
+    """
+    return subscriber_reconciler.last_report
+
+
+@router.post("/subscribers/reconcile")
+async def reconcile_subscribers(
+    fix: bool = True,
+    db: AsyncSession = Depends(get_db),
+    active: ActiveSession = Depends(get_current_session),
+):
+    """
+    Recompute every package's subscriber count from the customers table.
+    :param fix: Correct drifted counters (default) or only report them.
+    :param db: Database session.
+    :param active: Authenticated session of the caller.
+    :return: Drift report.
+    """
+    logger.info(f"Reconciling subscriber counts (fix={fix}) by user {active.user_id}.")
+    report = await subscriber_reconciler.run_once(fix=fix)
+    await create_audit_log_entry(
+        user_id=active.user_id,
+        action=f"Reconciled subscriber counts ({report['drifted']} drifted)",
+        db=db,
+    )
+    return report
+
+
+@router.get("/stats", response_model=PackageStats)
+async def get_package_stats(
+    days: int = Query(STATS_DEFAULT_DAYS, ge=1, le=STATS_MAX_DAYS),
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
+    """
+    Subscribers, monthly recurring revenue, churn and package switches per
+    package over the last `days` days. Results are cached briefly.
+    :param days: Look-back window in days for churn and switches.
+    :param db: Database session.
+    :param active: Authenticated session of the caller.
+    :return: Package statistics.
+    """
+    logger.info(f"Fetching package stats ({days} days) by user {active.user_id}.")
+    stats = await package_stats(db, days)
+    await create_audit_log_entry(user_id=active.user_id, action="Fetched package stats", db=db)
+    return stats
+
+
+@router.get("/{package_id}", response_model=PackageResponse)
+async def get_package(
+    request: UserRequest,
+    package_id: str,
+    db: AsyncSession = Depends(get_read_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
     Fetch a specific package by its ID.
     :param request: UserRequest containing the user ID.
     :param package_id: The ID of the package to fetch.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: Package details.
     """
+    ensure_same_user(active, request.user_id)
     logger.info(f"Fetching package with ID {package_id} by user {request.user_id}.")
-    package = db.query(Package).filter(Package.id == package_id).first()
+    package = await package_cache.get(db, package_id)
     if not package:
         logger.warning(f"Package with ID {package_id} not found.")
         raise HTTPException(status_code=404, detail="Package not found")
-    create_audit_log_entry(user_id=request.user_id, action=f"Fetched package {package_id}", db=db)
-    logger.debug(f"Fetched package details: {package}")
+    await create_audit_log_entry(user_id=active.user_id, action=f"Fetched package {package_id}", db=db)
+    logger.debug("Fetched package details: {}", package)
     return package
 
 
-@router.post("/")
-def create_package(package: PackageCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=PackageResponse)
+async def create_package(
+    package: PackageCreate,
+    db: AsyncSession = Depends(get_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
     Create a new package in the database.
     :param package: Details of the package to create, including user ID.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: Details of the created package.
     """
+    ensure_same_user(active, package.user_id)
     logger.info(f"Creating a new package with name {package.package_name} by user {package.user_id}.")
     new_package = Package(
         package_name=package.package_name,
@@ -84,52 +171,65 @@ def create_package(package: PackageCreate, db: Session = Depends(get_db)):
         monthly_price=package.monthly_price,
     )
     db.add(new_package)
-    db.commit()
-    db.refresh(new_package)
-    create_audit_log_entry(user_id=package.user_id, action=f"Created package {new_package.package_name}", db=db)
+    await db.flush()
+    after_commit(db, package_cache.invalidate)
+    await create_audit_log_entry(user_id=active.user_id, action=f"Created package {new_package.package_name}", db=db)
     logger.info(f"Package created successfully with ID: {new_package.id}")
     return new_package
 
 
-@router.put("/{package_id}")
-def update_package(package_id: str, package: PackageUpdate, db: Session = Depends(get_db)):
+@router.put("/{package_id}", response_model=PackageResponse)
+async def update_package(
+    package_id: str,
+    package: PackageUpdate,
+    db: AsyncSession = Depends(get_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
     Update an existing package in the database.
     :param package_id: The ID of the package to update.
     :param package: Updated details for the package, including user ID.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: Updated package details.
     """
+    ensure_same_user(active, package.user_id)
     logger.info(f"Updating package with ID {package_id} by user {package.user_id}.")
-    db_package = db.query(Package).filter(Package.id == package_id).first()
+    db_package = await db.scalar(select(Package).where(Package.id == package_id))
     if not db_package:
         logger.warning(f"Package with ID {package_id} not found.")
         raise HTTPException(status_code=404, detail="Package not found")
     db_package.description = package.description
     db_package.monthly_price = package.monthly_price
-    db.commit()
-    db.refresh(db_package)
-    create_audit_log_entry(user_id=package.user_id, action=f"Updated package {package_id}", db=db)
+    after_commit(db, package_cache.invalidate)
+    await create_audit_log_entry(user_id=active.user_id, action=f"Updated package {package_id}", db=db)
     logger.info(f"Package with ID {package_id} updated successfully.")
     return db_package
 
 
-@router.delete("/{package_id}")
-def delete_package(package_id: str, request: UserRequest, db: Session = Depends(get_db)):
+@router.delete("/{package_id}", response_model=DetailResponse)
+async def delete_package(
+    package_id: str,
+    request: UserRequest,
+    db: AsyncSession = Depends(get_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
     Delete a package from the database.
     :param package_id: The ID of the package to delete.
     :param request: UserRequest containing the user ID.
     :param db: Database session.
+    :param active: Authenticated session of the caller.
     :return: Confirmation of deletion.
     """
+    ensure_same_user(active, request.user_id)
     logger.info(f"Deleting package with ID {package_id} by user {request.user_id}.")
-    db_package = db.query(Package).filter(Package.id == package_id).first()
+    db_package = await db.scalar(select(Package).where(Package.id == package_id))
     if not db_package:
         logger.warning(f"Package with ID {package_id} not found.")
         raise HTTPException(status_code=404, detail="Package not found")
-    db.delete(db_package)
-    db.commit()
-    create_audit_log_entry(user_id=request.user_id, action=f"Deleted package {package_id}", db=db)
+    await db.delete(db_package)
+    after_commit(db, package_cache.invalidate)
+    await create_audit_log_entry(user_id=active.user_id, action=f"Deleted package {package_id}", db=db)
     logger.info(f"Package with ID {package_id} deleted successfully.")
     return {"detail": "Package deleted successfully"}
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from uuid import uuid4
 from pydantic import BaseModel, EmailStr
 from ..models.tables import User, PasswordReset, AuditLog
 from ..models.database import get_db
+from ..models.keys import canonical_id
 from ..utils.loguru_config import logger
 from ..utils.audit_log import create_audit_log_entry
+from ..utils.session_store import ActiveSession, get_current_session, ensure_same_user, session_store
+from ..utils.passwords import password_hasher
+from ..utils.login_throttle import login_throttle
 
 router = APIRouter()
 
@@ -45,44 +50,81 @@ class ResetPasswordRequest(BaseModel):
 
 # Endpoints
 @router.post("/login", response_model=LoginResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, http_request: Request, db: AsyncSession = Depends(get_db)):
     """
         Handles user login by validating credentials.
         Generates and returns a session token upon successful authentication.
+        Throttled clients are rejected with 429 before any database query.
     """
     logger.info(f"Login request received for: {request.username_or_email}")
+    ip_address = http_request.client.host if http_request.client else "unknown"
+    attempt = login_throttle.reserve(request.username_or_email, ip_address)
+    if attempt.retry_after:
+        logger.warning(f"Login throttled for {request.username_or_email} from {ip_address}")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts, try again later",
+            headers={"Retry-After": str(int(attempt.retry_after) + 1)},
+        )
+
     try:
-        user = db.query(User).filter(
+        user = await db.scalar(select(User).where(
             (User.email == request.username_or_email) | (User.username == request.username_or_email)
-        ).first()
+        ))
+
+        # Unknown users are checked against a dummy hash so both failures take as long
+        matches, needs_rehash = await password_hasher.verify(request.password, user.hashed_password if user else None)
 
         if not user:
             logger.warning(f"Login failed - user not found: {request.username_or_email}")
+            login_throttle.record_failure(attempt)
             raise HTTPException(status_code=401, detail="Invalid username or password")
 
-        if user.hashed_password != request.password:  # Update with hashed password comparison
+        if not matches:
             logger.warning(f"Login failed - incorrect password for user: {request.username_or_email}")
+            login_throttle.record_failure(attempt)
             raise HTTPException(status_code=401, detail="Invalid username or password")
 
-        # Token generation
-        token = str(uuid4())
-        user.current_token = token
+        if needs_rehash:
+            # Upgrade legacy or outdated hashes to the current parameters
+            user.hashed_password = await password_hasher.hash(request.password)
+            logger.info(f"Password hash upgraded for user: {user.username}")
+
+        # Session token generation (only its hash is stored, in user_sessions)
+        token = await session_store.create(db, user.id, request.remember_me)
         user.is_logged_in = True
         user.last_login = datetime.utcnow()
-        db.commit()
+        login_throttle.record_success(attempt)
 
-        create_audit_log_entry(user_id=user.id, action="User login", db=db)
+        await create_audit_log_entry(user_id=user.id, action="User login", db=db)
 
         logger.info(f"Login successful for user: {user.username}")
         return {"id": user.id, "token": token, "status": "success"}
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
+        login_throttle.release(attempt)
         logger.exception(f"Error during login for {request.username_or_email}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/logout")
+async def logout(db: AsyncSession = Depends(get_db), active: ActiveSession = Depends(get_current_session)):
+    """
+        Ends the caller's session.
+        Revokes the presented token; other sessions of the same user stay active.
+    """
+    logger.info(f"Logout request received for user: {active.user_id}")
+    await session_store.revoke(db, active.token_hash)
+    await create_audit_log_entry(user_id=active.user_id, action="User logout", db=db)
+
+    logger.info(f"Logout successful for user: {active.user_id}")
+    return {"status": "success", "message": "Logged out successfully"}
+
 @router.post("/register")
-def register(request: RegistrationRequest, db: Session = Depends(get_db)):
+async def register(request: RegistrationRequest, db: AsyncSession = Depends(get_db)):
     """
         Handles user registration.
         Creates a new user record in the database with validated data.
@@ -93,9 +135,9 @@ def register(request: RegistrationRequest, db: Session = Depends(get_db)):
             logger.warning(f"Registration failed - passwords do not match for user: {request.username}")
             raise HTTPException(status_code=400, detail="Passwords do not match")
 
-        existing_user = db.query(User).filter(
+        existing_user = await db.scalar(select(User).where(
             (User.email == request.email) | (User.username == request.username)
-        ).first()
+        ))
         if existing_user:
             logger.warning(f"Registration failed - user already exists: {request.username}")
             raise HTTPException(status_code=400, detail="User with this email or username already exists")
@@ -105,35 +147,43 @@ def register(request: RegistrationRequest, db: Session = Depends(get_db)):
             username=request.username,
             email=request.email,
             phone_number=request.phone_number,
-            hashed_password=request.password,
+            hashed_password=await password_hasher.hash(request.password),
             is_active=True,
             is_logged_in=False,
             current_token=None,
             last_login=None,
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-
-        create_audit_log_entry(user_id=new_user.id, action="User registration", db=db)
+        await db.flush()
+        await create_audit_log_entry(user_id=new_user.id, action="User registration", db=db)
 
         logger.info(f"User {new_user.username} registered successfully")
         return {"status": "success", "message": "User registered successfully"}
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.exception(f"Error during registration for {request.username}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.put("/users/{user_id}")
-def update_user(user_id: str, request: UpdateUserRequest, db: Session = Depends(get_db)):
+async def update_user(
+    user_id: str,
+    request: UpdateUserRequest,
+    db: AsyncSession = Depends(get_db),
+    active: ActiveSession = Depends(get_current_session),
+):
     """
         Updates user details such as full name, phone number, or email.
         Validates and prevents duplicate email usage.
+        Users can only update their own details.
     """
     logger.info(f"Update request received for user: {user_id}")
+    ensure_same_user(active, canonical_id(user_id))
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.scalar(select(User).where(User.id == user_id))
         if not user:
             logger.warning(f"User not found: {user_id}")
             raise HTTPException(status_code=404, detail="User not found")
@@ -143,34 +193,34 @@ def update_user(user_id: str, request: UpdateUserRequest, db: Session = Depends(
         if request.phone_number:
             user.phone_number = request.phone_number
         if request.email:
-            existing_user = db.query(User).filter(User.email == request.email, User.id != user_id).first()
+            existing_user = await db.scalar(select(User).where(User.email == request.email, User.id != user_id))
             if existing_user:
                 logger.warning(f"Email already in use: {request.email}")
                 raise HTTPException(status_code=400, detail="Email already in use")
             user.email = request.email
 
-        db.commit()
-        db.refresh(user)
-
-        create_audit_log_entry(user_id=user.id, action="User details updated", db=db)
+        await create_audit_log_entry(user_id=user.id, action="User details updated", db=db)
 
         logger.info(f"User {user.username} updated successfully")
         return {"status": "success", "message": "User updated successfully"}
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.exception(f"Error updating user {user_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/password-reset")
-def request_password_reset(request: PasswordResetRequest, db: Session = Depends(get_db)):
+async def request_password_reset(request: PasswordResetRequest, db: AsyncSession = Depends(get_db)):
     """
         Initiates a password reset process.
         Generates a reset token for the user and stores it in the database.
     """
     logger.info(f"Password reset request received for: {request.email}")
     try:
-        user = db.query(User).filter(User.email == request.email).first()
+        user = await db.scalar(select(User).where(User.email == request.email))
         if not user:
             logger.warning(f"Password reset failed - user not found: {request.email}")
             raise HTTPException(status_code=404, detail="User not found")
@@ -185,27 +235,28 @@ def request_password_reset(request: PasswordResetRequest, db: Session = Depends(
             used=False,
         )
         db.add(password_reset)
-        db.commit()
-
-        create_audit_log_entry(user_id=user.id, action="Password reset requested", db=db)
+        await create_audit_log_entry(user_id=user.id, action="Password reset requested", db=db)
 
         logger.info(f"Password reset token generated for user: {user.username}")
         return {"status": "success", "reset_token": reset_token, "message": "Password reset token generated"}
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.exception(f"Error during password reset request for {request.email}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/reset-password")
-def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
+async def reset_password(request: ResetPasswordRequest, db: AsyncSession = Depends(get_db)):
     """
        Completes the password reset process.
        Validates the reset token and updates the user's password.
     """
     logger.info(f"Password reset attempt with token: {request.reset_token}")
     try:
-        password_reset = db.query(PasswordReset).filter(PasswordReset.reset_token == request.reset_token).first()
+        password_reset = await db.scalar(select(PasswordReset).where(PasswordReset.reset_token == request.reset_token))
 
         if not password_reset or password_reset.used:
             logger.warning("Invalid or used password reset token")
@@ -219,22 +270,23 @@ def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db))
             logger.warning("Passwords do not match")
             raise HTTPException(status_code=400, detail="Passwords do not match")
 
-        user = db.query(User).filter(User.id == password_reset.user_id).first()
+        user = await db.scalar(select(User).where(User.id == password_reset.user_id))
         if not user:
             logger.error("Associated user not found")
             raise HTTPException(status_code=404, detail="User not found")
 
-        user.hashed_password = request.new_password  # Update with hashed password
+        user.hashed_password = await password_hasher.hash(request.new_password)
         password_reset.used = True
-
-        db.commit()
-
-        create_audit_log_entry(user_id=user.id, action="Password reset successful", db=db)
+        await session_store.revoke_user(db, user.id)
+        await create_audit_log_entry(user_id=user.id, action="Password reset successful", db=db)
 
         logger.info(f"Password reset successful for user: {user.username}")
         return {"status": "success", "message": "Password reset successful"}
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.exception(f"Error during password reset: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,185 @@
+"""
+Production launcher: a supervisor process running N uvicorn workers.
+
+    python -m app.server                       # settings from WEB_* / DB_* config
+    python -m app.server --workers 4 --max-requests 5000
+    python -m app.server --print-config        # show the resolved settings and exit
+    python -m app.server --reload              # development: one worker, restart on code changes
+
+Signals sent to the supervisor:
+    SIGHUP          rolling restart; each worker finishes its in-flight requests first
+    SIGTERM/SIGINT  graceful shutdown
+
+The worker count is fixed for the life of the supervisor, since each worker
+sizes its database pools from it; restart the server to change it.
+
+Workers that exit (e.g. after reaching their max-requests limit) are replaced
+automatically. Run `python -m app.cli init` once before starting the server.
+"""
+import argparse
+import os
+import random
+import sys
+import uvicorn
+from uvicorn.supervisors import ChangeReload, Multiprocess
+from .utils.config import (
+    DB_ASYNC,
+    DB_MAX_CONNECTIONS,
+    LOG_LEVEL,
+    WEB_BACKLOG,
+    WEB_FORWARDED_ALLOW_IPS,
+    WEB_GRACEFUL_TIMEOUT,
+    WEB_HOST,
+    WEB_KEEPALIVE,
+    WEB_MAX_REQUESTS,
+    WEB_MAX_REQUESTS_JITTER,
+    WEB_PORT,
+    WEB_WORKERS,
+)
+from .utils.loguru_config import logger
+from .utils.server_config import event_loop, http_protocol, pool_limits, worker_count
+
+APP_IMPORT_STRING = "app.main:app"
+
+
+class WorkerConfig(uvicorn.Config):
+    """
+    uvicorn Config whose request limit is jittered per worker. Each worker
+    process receives its own copy of the config and loads it once, so the
+    workers started together do not all recycle at the same moment.
+    """
+
+    def __init__(self, *args, max_requests_jitter: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_requests_jitter = max_requests_jitter
+
+    def load(self):
+        if self.limit_max_requests and self.max_requests_jitter:
+            self.limit_max_requests += random.randint(0, self.max_requests_jitter)
+        super().load()
+
+
+class Supervisor(Multiprocess):
+    """
+    uvicorn's multiprocess supervisor without SIGTTIN/SIGTTOU scaling. Pool
+    sizes are split from DB_MAX_CONNECTIONS when workers start, so an added
+    worker would go over the connection budget and a removed one would leave
+    connections unused.
+    """
+
+    def handle_ttin(self):
+        logger.warning("Ignoring SIGTTIN: the worker count is fixed, restart the server to change it.")
+
+    def handle_ttou(self):
+        logger.warning("Ignoring SIGTTOU: the worker count is fixed, restart the server to change it.")
+
+
+def build_config(workers: int, host: str = WEB_HOST, port: int = WEB_PORT, max_requests: int = WEB_MAX_REQUESTS,
+                 max_requests_jitter: int = WEB_MAX_REQUESTS_JITTER, reload: bool = False) -> WorkerConfig:
+    """
+    uvicorn settings shared by every worker.
+    :param workers: Worker processes to run.
+    :param max_requests: Requests after which a worker is recycled (0 disables).
+    :param max_requests_jitter: Upper bound of the random amount added to max_requests per worker.
+    :param reload: Development mode: single worker restarted on code changes.
+    """
+    return WorkerConfig(
+        APP_IMPORT_STRING,
+        host=host,
+        port=port,
+        workers=workers,
+        reload=reload,
+        loop=event_loop(),
+        http=http_protocol(),
+        lifespan="on",
+        log_level=LOG_LEVEL.lower(),
+        backlog=WEB_BACKLOG,
+        timeout_keep_alive=WEB_KEEPALIVE,
+        timeout_graceful_shutdown=WEB_GRACEFUL_TIMEOUT,
+        limit_max_requests=max_requests or None,
+        max_requests_jitter=max_requests_jitter,
+        proxy_headers=True,
+        forwarded_allow_ips=WEB_FORWARDED_ALLOW_IPS,
+    )
+
+
+def check_connection_budget(workers: int):
+    """
+    Refuse to start when DB_MAX_CONNECTIONS cannot give every worker the
+    minimum connections its engines need.
+    """
+    if DB_MAX_CONNECTIONS <= 0:
+        return
+    needed = workers * (2 if DB_ASYNC else 1)
+    if DB_MAX_CONNECTIONS < needed:
+        raise SystemExit(
+            f"DB_MAX_CONNECTIONS={DB_MAX_CONNECTIONS} is too small for {workers} worker(s); "
+            f"at least {needed} connections are needed. Lower WEB_WORKERS or raise the budget."
+        )
+
+
+def describe(config: WorkerConfig) -> dict:
+    limits = pool_limits(config.workers)
+    return {
+        "bind": f"{config.host}:{config.port}",
+        "workers": config.workers,
+        "loop": config.loop,
+        "http": config.http,
+        "max_requests": config.limit_max_requests or 0,
+        "max_requests_jitter": config.max_requests_jitter,
+        "graceful_timeout": config.timeout_graceful_shutdown,
+        "db_max_connections": DB_MAX_CONNECTIONS or "unbounded",
+        "pool_per_worker": {name: {"pool_size": size, "max_overflow": overflow} for name, (size, overflow) in limits.items()},
+    }
+
+
+def serve(config: WorkerConfig):
+    # Workers build their engines at import time and size their pools from
+    # WEB_WORKERS, so they must see the resolved count, not 0 ("automatic")
+    os.environ["WEB_WORKERS"] = str(config.workers)
+    server = uvicorn.Server(config)
+    sock = config.bind_socket()
+    if config.should_reload:
+        ChangeReload(config, target=server.run, sockets=[sock]).run()
+    else:
+        # The supervisor is used even for one worker so recycled workers are replaced
+        Supervisor(config, target=server.run, sockets=[sock]).run()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.server", description="Run the API with multiple uvicorn workers.")
+    parser.add_argument("--host", default=WEB_HOST)
+    parser.add_argument("--port", type=int, default=WEB_PORT)
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS, help="Worker processes (0: one per available CPU).")
+    parser.add_argument("--max-requests", type=int, default=WEB_MAX_REQUESTS, help="Recycle a worker after this many requests (0 disables).")
+    parser.add_argument("--max-requests-jitter", type=int, default=WEB_MAX_REQUESTS_JITTER)
+    parser.add_argument("--reload", action="store_true", help="Development mode: one worker, restarted on code changes.")
+    parser.add_argument("--print-config", action="store_true", help="Print the resolved settings and exit.")
+    args = parser.parse_args(argv)
+
+    workers = 1 if args.reload else worker_count(args.workers)
+    check_connection_budget(workers)
+    config = build_config(
+        workers,
+        host=args.host,
+        port=args.port,
+        max_requests=args.max_requests,
+        max_requests_jitter=args.max_requests_jitter,
+        reload=args.reload,
+    )
+    settings = describe(config)
+    if args.print_config:
+        for key, value in settings.items():
+            print(f"{key:>20}: {value}")
+        return 0
+
+    logger.info("Starting server: {}", settings)
+    try:
+        serve(config)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
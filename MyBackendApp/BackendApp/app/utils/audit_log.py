@@ -1,23 +1,147 @@
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from ..models.database import after_commit
+from ..models.keys import new_id
 from ..models.tables import AuditLog
+from ..utils.config import (
+    AUDIT_LOG_PAGE_SIZE,
+    AUDIT_LOG_MAX_PAGE_SIZE,
+    AUDIT_LOG_SCAN_WINDOW_DAYS,
+    AUDIT_LOG_MODE,
+    AUDIT_QUEUE_MAX_SIZE,
+    AUDIT_BATCH_SIZE,
+    AUDIT_FLUSH_INTERVAL,
+    AUDIT_FLUSH_TIMEOUT,
+)
+from ..utils.batch_writer import BatchWriter
 from ..utils.loguru_config import logger
+from ..utils.pagination import encode_cursor, decode_cursor, clamp_page_size
 
-def create_audit_log_entry(user_id: str, action: str, db: Session):
+# Background writer shared by every request in this process
+audit_sink = BatchWriter(
+    AuditLog,
+    name="audit_logs",
+    max_queue_size=AUDIT_QUEUE_MAX_SIZE,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval=AUDIT_FLUSH_INTERVAL,
+)
+
+async def create_audit_log_entry(user_id: str, action: str, db: AsyncSession):
     """
-    Create a new audit log entry.
+    Record an audit log entry as part of the request's unit of work.
+    In "transaction" mode the row is added to db and committed with the rest
+    of the request. In "async" and "flush" mode it is handed to the
+    background writer once the request has committed, so rolled-back work is
+    never audited; "flush" then waits for the writer to commit the row's
+    batch before the response is sent, for at most AUDIT_FLUSH_TIMEOUT
+    seconds. Both join the transaction instead when
+    the writer is not running or its queue is full.
     :param user_id: ID of the user performing the action.
     :param action: Description of the action.
-    :param db: Database session.
+    :param db: Request database session (see get_db).
     """
-    try:
-        new_audit_log = AuditLog(
-            user_id=user_id,
-            action=action
+    if AUDIT_LOG_MODE in ("async", "flush") and audit_sink.running and not audit_sink.full:
+        row = {"id": new_id(), "user_id": user_id, "action": action, "timestamp": datetime.utcnow()}
+        after_commit(db, lambda: _submit(row, wait=AUDIT_LOG_MODE == "flush"))
+        logger.info(f"Audit log queued for user {user_id}: {action}")
+        return
+
+    db.add(AuditLog(user_id=user_id, action=action))
+    logger.info(f"Audit log added for user {user_id}: {action}")
+
+async def _submit(row: dict, wait: bool = False):
+    done = audit_sink.submit(row, wait=wait)
+    if done is None:
+        logger.warning("Audit log queue is full, writing entry synchronously.")
+        await run_in_threadpool(audit_sink.write, [row])
+    elif wait and not await run_in_threadpool(done.wait, AUDIT_FLUSH_TIMEOUT):
+        logger.warning(
+            f"Audit log entry not written within {AUDIT_FLUSH_TIMEOUT}s, responding without it: {row['action']}"
         )
-        db.add(new_audit_log)
-        db.commit()
-        logger.info(f"Audit log created for user {user_id}: {action}")
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Failed to create audit log for user {user_id}: {e}")
-        raise
+
+def filter_audit_logs(query, user_id: str = None, action: str = None, start: datetime = None, end: datetime = None):
+    """
+    Apply the optional audit log filters shared by listings and exports.
+    :param query: Select statement over AuditLog columns.
+    :return: The filtered statement.
+    """
+    if user_id:
+        query = query.where(AuditLog.user_id == user_id)
+    if action:
+        query = query.where(AuditLog.action == action)
+    if start:
+        query = query.where(AuditLog.timestamp >= start)
+    if end:
+        query = query.where(AuditLog.timestamp < end)
+    return query
+
+async def fetch_audit_log_page(
+    db: AsyncSession,
+    user_id: str = None,
+    action: str = None,
+    start: datetime = None,
+    end: datetime = None,
+    cursor: str = None,
+    limit: int = None,
+):
+    """
+    Fetch one page of audit logs, newest first, using (timestamp, id) keyset pagination.
+    :param db: Database session.
+    :param user_id: Optional user ID filter.
+    :param action: Optional exact action filter.
+    :param start: Optional inclusive lower bound on timestamp.
+    :param end: Optional exclusive upper bound on timestamp.
+    :param cursor: Cursor returned by the previous page, if any.
+    :param limit: Requested page size, bounded by AUDIT_LOG_MAX_PAGE_SIZE.
+    :return: Dict with the page items and the cursor for the next page (None on the last page).
+    """
+    page_size = clamp_page_size(limit, AUDIT_LOG_PAGE_SIZE, AUDIT_LOG_MAX_PAGE_SIZE)
+    query = filter_audit_logs(
+        select(AuditLog.id, AuditLog.user_id, AuditLog.action, AuditLog.timestamp),
+        user_id=user_id, action=action, start=start, end=end,
+    )
+    anchor = end or datetime.utcnow()
+    if cursor:
+        cursor_timestamp, cursor_id = decode_cursor(cursor)
+        # The plain upper bound is what lets MySQL prune partitions; the OR alone does not
+        query = query.where(AuditLog.timestamp <= cursor_timestamp, or_(
+            AuditLog.timestamp < cursor_timestamp,
+            and_(AuditLog.timestamp == cursor_timestamp, AuditLog.id < cursor_id),
+        ))
+        anchor = min(anchor, cursor_timestamp)
+    query = query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
+
+    # Scan backwards from the anchor in windows that double in length, so a
+    # page from a busy table reads only the newest partition(s). The oldest
+    # matching timestamp (or start) bounds the scan once a window falls short.
+    # Fetch one extra row to know whether another page exists.
+    rows, upper, window, oldest = [], None, timedelta(days=AUDIT_LOG_SCAN_WINDOW_DAYS), start
+    while True:
+        lower = (upper or anchor) - window
+        last = oldest is not None and lower <= oldest
+        scan = query if last else query.where(AuditLog.timestamp >= lower)
+        if upper is not None:
+            scan = scan.where(AuditLog.timestamp < upper)
+        rows += (await db.execute(scan.limit(page_size + 1 - len(rows)))).all()
+        if len(rows) > page_size or last:
+            break
+        if oldest is None:
+            oldest = await db.scalar(filter_audit_logs(
+                select(func.min(AuditLog.timestamp)), user_id=user_id, action=action, end=end,
+            ))
+            if oldest is None or oldest >= lower:
+                break
+        upper, window = lower, window * 2
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id) if has_more else None
+    items = [
+        {"id": row.id, "user_id": row.user_id, "action": row.action, "timestamp": row.timestamp}
+        for row in rows
+    ]
+    logger.debug("Fetched {} audit logs (has_more={}).", len(items), has_more)
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,259 @@
+"""
+Audit log storage lifecycle.
+
+On MySQL audit_logs is RANGE COLUMNS partitioned by month (migration 0005):
+partition pYYYYMM holds the rows of that month (the oldest one also holds
+anything earlier) and p_future catches rows beyond the last month created.
+On SQLite the table is a single rolling window instead.
+
+`python -m app.cli audit-maintenance` (run daily) creates partitions ahead
+of time and moves months older than the retention window to archive files:
+a dropped MySQL partition, or a range delete on SQLite.
+"""
+import gzip
+import os
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import delete, func, select, text
+from ..models.database import engine
+from ..models.tables import AuditLog
+from ..utils.config import (
+    AUDIT_ARCHIVE_DIR,
+    AUDIT_ARCHIVE_FORMAT,
+    AUDIT_PARTITIONS_AHEAD,
+    AUDIT_RETENTION_MONTHS,
+    EXPORT_BATCH_SIZE,
+)
+from ..utils.export import encode_rows
+from ..utils.loguru_config import logger
+
+ARCHIVE_COLUMNS = ["id", "user_id", "action", "timestamp"]
+ARCHIVE_SUFFIXES = {"ndjson": ".ndjson.gz", "parquet": ".parquet"}
+_ARCHIVE_NAME = re.compile(r"^audit_logs_(\d{4}-\d{2})(\.ndjson\.gz|\.parquet)$")
+
+FUTURE_PARTITION = "p_future"
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_definitions(first_month: datetime, last_month: datetime) -> list[str]:
+    """
+    DDL for one partition per month from first_month to last_month, followed
+    by the p_future catch-all.
+    """
+    definitions = []
+    month = first_month
+    while month <= last_month:
+        upper = add_months(month, 1)
+        definitions.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{upper:%Y-%m-%d}')")
+        month = upper
+    definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+    return definitions
+
+
+def is_partitioned(bind) -> bool:
+    return bind.dialect.name == "mysql"
+
+
+def monthly_partitions(connection) -> list[tuple[str, datetime]]:
+    """
+    (name, exclusive upper bound) of each month partition, oldest first.
+    """
+    rows = connection.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'audit_logs' AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    )).all()
+    return [
+        (name, datetime.fromisoformat(bound.strip("'")))
+        for name, bound in rows
+        if name != FUTURE_PARTITION
+    ]
+
+
+def ensure_partitions(now: datetime = None) -> int:
+    """
+    Split p_future so that partitions exist up to AUDIT_PARTITIONS_AHEAD
+    months past the current one (no-op on SQLite).
+    :return: Number of partitions added.
+    """
+    if not is_partitioned(engine):
+        return 0
+    now = now or datetime.utcnow()
+    with engine.begin() as connection:
+        partitions = monthly_partitions(connection)
+        next_month = partitions[-1][1] if partitions else month_start(now)
+        last_month = add_months(month_start(now), AUDIT_PARTITIONS_AHEAD)
+        if next_month > last_month:
+            return 0
+        definitions = partition_definitions(next_month, last_month)
+        connection.execute(text(
+            f"ALTER TABLE audit_logs REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(definitions)})"
+        ))
+    added = len(definitions) - 1
+    logger.info(f"Added {added} audit log partition(s) up to {last_month:%Y-%m}.")
+    return added
+
+
+@dataclass
+class ColdMonth:
+    month: datetime
+    lower: datetime | None
+    upper: datetime
+    partition: str | None = None
+
+    def where(self, statement):
+        statement = statement.where(AuditLog.timestamp < self.upper)
+        if self.lower is not None:
+            statement = statement.where(AuditLog.timestamp >= self.lower)
+        return statement
+
+
+def cold_months(cutoff: datetime) -> list[ColdMonth]:
+    """
+    Months that end on or before cutoff and may still hold rows, oldest first.
+    """
+    with engine.connect() as connection:
+        if is_partitioned(engine):
+            months, lower = [], None
+            for name, upper in monthly_partitions(connection):
+                if upper > cutoff:
+                    break
+                months.append(ColdMonth(add_months(upper, -1), lower, upper, name))
+                lower = upper
+            return months
+        oldest = connection.scalar(select(func.min(AuditLog.timestamp)))
+
+    months, month = [], month_start(oldest) if oldest else cutoff
+    while month < cutoff:
+        months.append(ColdMonth(month, month, add_months(month, 1)))
+        month = add_months(month, 1)
+    return months
+
+
+def archive_path(month: datetime, file_format: str = AUDIT_ARCHIVE_FORMAT) -> str:
+    return os.path.join(AUDIT_ARCHIVE_DIR, f"audit_logs_{month:%Y-%m}{ARCHIVE_SUFFIXES[file_format]}")
+
+
+@contextmanager
+def _ndjson_writer(path: str):
+    with gzip.open(path, "wb") as archive:
+        yield lambda rows: archive.write(encode_rows(rows, ARCHIVE_COLUMNS, "ndjson"))
+
+
+@contextmanager
+def _parquet_writer(path: str):
+    # pyarrow is optional; it is only needed when AUDIT_ARCHIVE_FORMAT is parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.string()), ("user_id", pa.string()), ("action", pa.string()), ("timestamp", pa.timestamp("us")),
+    ])
+    with pq.ParquetWriter(path, schema, compression="zstd") as archive:
+        yield lambda rows: archive.write_table(
+            pa.Table.from_arrays([pa.array(column) for column in zip(*rows)], schema=schema)
+        )
+
+
+ARCHIVE_WRITERS = {"ndjson": _ndjson_writer, "parquet": _parquet_writer}
+
+
+def _write_archive(cold: ColdMonth, path: str) -> int:
+    statement = cold.where(
+        select(AuditLog.id, AuditLog.user_id, AuditLog.action, AuditLog.timestamp)
+    ).order_by(AuditLog.timestamp, AuditLog.id)
+
+    # Written under a temporary name so a crash never leaves a truncated archive
+    partial = f"{path}.partial"
+    written = 0
+    with engine.connect() as connection, ARCHIVE_WRITERS[AUDIT_ARCHIVE_FORMAT](partial) as write:
+        result = connection.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(statement)
+        for rows in result.partitions():
+            write(rows)
+            written += len(rows)
+    if written:
+        os.replace(partial, path)
+    else:
+        os.remove(partial)
+    return written
+
+
+def archive_month(cold: ColdMonth) -> int:
+    """
+    Write one cold month to its archive file, then drop its partition (MySQL)
+    or delete its rows (SQLite). Rows are only removed when the database
+    still holds exactly the rows that were archived.
+    :return: Number of rows archived.
+    """
+    path = archive_path(cold.month)
+    written = _write_archive(cold, path)
+    with engine.begin() as connection:
+        remaining = connection.scalar(cold.where(select(func.count()).select_from(AuditLog)))
+        if remaining != written:
+            raise RuntimeError(
+                f"Audit logs for {cold.month:%Y-%m} changed while archiving ({written} archived, {remaining} now)"
+            )
+        if cold.partition:
+            connection.execute(text(f"ALTER TABLE audit_logs DROP PARTITION {cold.partition}"))
+        else:
+            connection.execute(cold.where(delete(AuditLog)))
+    logger.info(f"Archived {written} audit log(s) for {cold.month:%Y-%m}" + (f" to {path}." if written else "."))
+    return written
+
+
+def archive_cold_months(retention_months: int = AUDIT_RETENTION_MONTHS, now: datetime = None) -> list[dict]:
+    """
+    Archive every month older than the retention window.
+    :param retention_months: Months kept in the database, the current one included (0 keeps everything).
+    :return: One entry per archived month.
+    """
+    if retention_months <= 0:
+        return []
+    if AUDIT_ARCHIVE_FORMAT not in ARCHIVE_WRITERS:
+        raise ValueError(f"Unsupported AUDIT_ARCHIVE_FORMAT '{AUDIT_ARCHIVE_FORMAT}'; use ndjson or parquet")
+    os.makedirs(AUDIT_ARCHIVE_DIR, exist_ok=True)
+
+    cutoff = add_months(month_start(now or datetime.utcnow()), 1 - retention_months)
+    report = []
+    for cold in cold_months(cutoff):
+        rows = archive_month(cold)
+        report.append({"month": f"{cold.month:%Y-%m}", "rows": rows, "file": archive_path(cold.month) if rows else None})
+    return report
+
+
+def run_maintenance(retention_months: int = None) -> dict:
+    """
+    Archive cold months, then make sure upcoming partitions exist.
+    :param retention_months: Overrides AUDIT_RETENTION_MONTHS when given.
+    """
+    archived = archive_cold_months(AUDIT_RETENTION_MONTHS if retention_months is None else retention_months)
+    return {"archived": archived, "partitions_added": ensure_partitions()}
+
+
+def list_archives() -> list[dict]:
+    """
+    Archive files on disk, oldest month first.
+    """
+    if not os.path.isdir(AUDIT_ARCHIVE_DIR):
+        return []
+    archives = []
+    for name in sorted(os.listdir(AUDIT_ARCHIVE_DIR)):
+        match = _ARCHIVE_NAME.match(name)
+        if match:
+            archives.append({
+                "month": match.group(1),
+                "file": name,
+                "format": "parquet" if match.group(2) == ".parquet" else "ndjson",
+                "bytes": os.path.getsize(os.path.join(AUDIT_ARCHIVE_DIR, name)),
+            })
+    return archives
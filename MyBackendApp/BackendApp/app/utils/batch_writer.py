@@ -0,0 +1,202 @@
+import queue
+import threading
+import time
+from sqlalchemy import insert
+from ..models.database import SessionLocal
+from ..utils.loguru_config import logger
+
+# Queue marker asking the worker to drain everything and exit
+_STOP = object()
+
+
+class BatchWriter:
+    """
+    In-process sink that buffers rows in a bounded queue and bulk-inserts them
+    from a background thread, flushing when a batch fills up or when the flush
+    interval elapses, whichever comes first.
+    """
+
+    def __init__(self, model, name: str, max_queue_size: int, batch_size: int, flush_interval: float):
+        """
+        :param model: ORM model whose table receives the rows.
+        :param name: Name used in logs, metrics and the worker thread name.
+        :param max_queue_size: Maximum number of rows waiting to be written.
+        :param batch_size: Maximum number of rows per INSERT.
+        :param flush_interval: Maximum seconds a row waits before its batch is written.
+        """
+        self.model = model
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "failed": 0,
+            "rejected": 0,
+            "batches": 0,
+            "max_queue_depth": 0,
+            "last_batch_size": 0,
+            "last_batch_ms": 0.0,
+            "total_batch_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Start the background worker thread (no-op if already running).
+        """
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"Batch writer '{self.name}' started.")
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Write everything still queued and stop the worker thread.
+        :param timeout: Maximum seconds to wait for the queue to drain.
+        """
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"Batch writer '{self.name}' did not drain within {timeout}s.")
+        else:
+            logger.info(f"Batch writer '{self.name}' stopped after draining its queue.")
+        self._thread = None
+
+    def submit(self, row: dict, wait: bool = False):
+        """
+        Queue a row for insertion without blocking.
+        :param row: Column values for one row.
+        :param wait: When True, return an Event that is set once the row's batch is committed.
+        :return: The Event (or True when wait is False), or None if the queue is full.
+        """
+        done = threading.Event() if wait else None
+        try:
+            self._queue.put_nowait((row, done))
+        except queue.Full:
+            with self._lock:
+                self._stats["rejected"] += 1
+            return None
+        with self._lock:
+            self._stats["enqueued"] += 1
+            depth = self._queue.qsize()
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+        return done if wait else True
+
+    @property
+    def full(self) -> bool:
+        return self._queue.full()
+
+    def write(self, rows: list):
+        """
+        Insert rows immediately from the calling thread, bypassing the queue.
+        """
+        self._write(rows)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Block until every row queued before this call has been written.
+        :param timeout: Maximum seconds to wait.
+        :return: True if the flush completed in time.
+        """
+        if not self.running:
+            return True
+        done = threading.Event()
+        self._queue.put((None, done))
+        return done.wait(timeout)
+
+    def metrics(self) -> dict:
+        """
+        Snapshot of queue depth and throughput counters.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        total_ms = stats.pop("total_batch_ms")
+        stats["avg_batch_ms"] = round(total_ms / stats["batches"], 3) if stats["batches"] else 0.0
+        stats["queue_depth"] = self._queue.qsize()
+        stats["queue_capacity"] = self._queue.maxsize
+        stats["running"] = self.running
+        return stats
+
+    def _run(self):
+        draining = False
+        while True:
+            try:
+                item = self._queue.get_nowait() if draining else self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if draining:
+                    return
+                continue
+
+            rows, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    # Write whatever is left, then exit once the queue is empty
+                    draining = True
+                else:
+                    row, done = item
+                    if row is not None:
+                        rows.append(row)
+                    if done is not None:
+                        waiters.append(done)
+
+                if len(rows) >= self.batch_size:
+                    break
+                # Someone is waiting on this batch: take only what is already queued
+                remaining = 0 if draining or waiters else deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if rows:
+                self._write(rows)
+            for done in waiters:
+                done.set()
+
+    def _write(self, rows: list):
+        started = time.perf_counter()
+        session = SessionLocal()
+        try:
+            session.execute(insert(self.model), rows)
+            session.commit()
+            written, failed = len(rows), 0
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Batch insert into {self.model.__tablename__} failed, retrying row by row: {e}")
+            written, failed = self._write_individually(session, rows)
+        finally:
+            session.close()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["written"] += written
+            self._stats["failed"] += failed
+            self._stats["batches"] += 1
+            self._stats["last_batch_size"] = len(rows)
+            self._stats["last_batch_ms"] = round(elapsed_ms, 3)
+            self._stats["total_batch_ms"] += elapsed_ms
+
+    def _write_individually(self, session, rows: list):
+        written, failed = 0, 0
+        for row in rows:
+            try:
+                session.execute(insert(self.model), [row])
+                session.commit()
+                written += 1
+            except Exception as e:
+                session.rollback()
+                failed += 1
+                logger.error(f"Dropping {self.model.__tablename__} row {row}: {e}")
+        return written, failed
@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+from collections import Counter
+from itertools import islice
+from fastapi import HTTPException, UploadFile
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from ..models.keys import new_id
+from ..models.tables import Customer
+from ..utils.config import BULK_IMPORT_CHUNK_SIZE, BULK_IMPORT_MAX_ERRORS
+from ..utils.loguru_config import logger
+from ..utils.package_cache import package_cache
+from ..utils.subscriber_counts import adjust_subscriber_counts, apply_cached_deltas
+from ..utils.customer_search import search_columns
+
+# Columns copied from a validated row into the customers table
+CUSTOMER_COLUMNS = ("first_name", "last_name", "phone_number", "email_address", "address", "package_id")
+
+_FORMATS_BY_EXTENSION = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+def detect_format(upload: UploadFile, requested: str = None) -> str:
+    """
+    Pick the upload format from an explicit value or the file extension.
+    :raises HTTPException: 400 if the format is unknown.
+    """
+    if requested:
+        file_format = requested.lower()
+    else:
+        filename = (upload.filename or "").lower()
+        file_format = next((fmt for ext, fmt in _FORMATS_BY_EXTENSION.items() if filename.endswith(ext)), None)
+    if file_format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Unsupported format; use csv or ndjson")
+    return file_format
+
+
+def iter_records(upload: UploadFile, file_format: str):
+    """
+    Lazily parse an uploaded file into (row_number, record, error) tuples,
+    one line at a time. Exactly one of record and error is set.
+    """
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        for row_number, record in enumerate(csv.DictReader(text), start=1):
+            # Empty CSV cells mean "not provided"
+            yield row_number, {key: value for key, value in record.items() if key and value != ""}, None
+        return
+
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, record, None
+
+
+def _next_chunk(records, size: int) -> list:
+    return list(islice(records, size))
+
+
+async def import_customers(
+    db: AsyncSession,
+    upload: UploadFile,
+    file_format: str,
+    user_id: str,
+    row_model: type[BaseModel],
+) -> dict:
+    """
+    Stream customers from an uploaded CSV/NDJSON file into the database.
+    Rows are validated against row_model and inserted in chunks of
+    BULK_IMPORT_CHUNK_SIZE with one multi-row INSERT and one atomic subscriber
+    count UPDATE per package per chunk. Each chunk is committed separately.
+    :param db: Database session.
+    :param upload: Uploaded file.
+    :param file_format: "csv" or "ndjson".
+    :param user_id: Authenticated user, injected into each row before validation.
+    :param row_model: Pydantic model used to validate rows (CustomerCreate).
+    :return: Report with inserted/failed counts and per-row errors.
+    """
+    package_ids = {package["id"] for package in await package_cache.all(db)}
+    records = iter_records(upload, file_format)
+    report = {"inserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def record_error(row_number, errors):
+        report["failed"] += 1
+        if len(report["errors"]) < BULK_IMPORT_MAX_ERRORS:
+            report["errors"].append({"row": row_number, "errors": errors})
+        else:
+            report["errors_truncated"] = True
+
+    while True:
+        # File parsing and decoding run off the event loop
+        chunk = await run_in_threadpool(_next_chunk, records, BULK_IMPORT_CHUNK_SIZE)
+        if not chunk:
+            break
+
+        rows, row_numbers = [], []
+        for row_number, record, error in chunk:
+            if error:
+                record_error(row_number, [error])
+                continue
+            try:
+                validated = row_model(**{**record, "user_id": user_id})
+            except ValidationError as e:
+                record_error(row_number, [
+                    f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+                ])
+                continue
+            if validated.package_id not in package_ids:
+                record_error(row_number, [f"package_id: Package {validated.package_id} not found"])
+                continue
+            row = {column: getattr(validated, column) for column in CUSTOMER_COLUMNS}
+            row["id"] = new_id()
+            row.update(search_columns(row["first_name"], row["last_name"], row["email_address"], row["phone_number"]))
+            rows.append(row)
+            row_numbers.append(row_number)
+
+        if not rows:
+            continue
+
+        subscribers = Counter(row["package_id"] for row in rows)
+        try:
+            await db.execute(insert(Customer), rows)
+            await adjust_subscriber_counts(db, subscribers)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Bulk import chunk of {len(rows)} rows failed: {e}")
+            for row_number in row_numbers:
+                record_error(row_number, [f"Database error: {e.__class__.__name__}"])
+            continue
+
+        apply_cached_deltas(subscribers)
+        report["inserted"] += len(rows)
+        logger.debug("Bulk import committed {} customers (total {}).", len(rows), report['inserted'])
+
+    return report
@@ -1,7 +1,161 @@
-from decouple import config
+from decouple import Csv, config
 
 try:
     DATABASE_URL = config("DATABASE_URL")
     LOG_LEVEL = config("LOG_LEVEL", default="info")
+    # "console" (colorized text) or "json" (one object per line, for log shippers)
+    LOG_FORMAT = config("LOG_FORMAT", default="console")
+    # Write log records from a background thread instead of the calling thread
+    LOG_ENQUEUE = config("LOG_ENQUEUE", default=True, cast=bool)
+    # Fraction of DEBUG records kept when LOG_LEVEL is debug (1.0 keeps all)
+    LOG_DEBUG_SAMPLE_RATE = config("LOG_DEBUG_SAMPLE_RATE", default=1.0, cast=float)
+
+    # Async database layer. When DB_ASYNC is off, handlers run their queries
+    # through the sync engine in the threadpool instead.
+    DB_ASYNC = config("DB_ASYNC", default=True, cast=bool)
+    ASYNC_DATABASE_URL = config("ASYNC_DATABASE_URL", default=None)
+
+    # Connection pool (applies to each engine in each worker process).
+    # DB_POOL_RECYCLE should stay below MySQL's wait_timeout.
+    DB_POOL_SIZE = config("DB_POOL_SIZE", default=5, cast=int)
+    DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=10, cast=int)
+    DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30.0, cast=float)
+    DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)
+    DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=True, cast=bool)
+    # Connections all worker processes of one instance may open together
+    # (0 disables). When set, each worker's pools are sized from this budget
+    # instead of DB_POOL_SIZE/DB_MAX_OVERFLOW; see app/utils/server_config.py.
+    DB_MAX_CONNECTIONS = config("DB_MAX_CONNECTIONS", default=0, cast=int)
+
+    # Read replicas (comma-separated URLs of copies of DATABASE_URL; async URLs
+    # are derived from them). Read-only endpoints query one replica per request,
+    # picked "round_robin" or by "least_connections". A caller's reads stay on
+    # the primary for DB_REPLICA_STICKY_SECONDS after its own write (tracked by
+    # the worker that served the write and by a short-lived cookie, so other
+    # workers honour it too), and a replica that fails is skipped for
+    # DB_REPLICA_RETRY_INTERVAL seconds.
+    DATABASE_REPLICA_URLS = config("DATABASE_REPLICA_URLS", default="", cast=Csv())
+    DB_REPLICA_SELECTION = config("DB_REPLICA_SELECTION", default="round_robin")
+    DB_REPLICA_STICKY_SECONDS = config("DB_REPLICA_STICKY_SECONDS", default=5.0, cast=float)
+    DB_REPLICA_RETRY_INTERVAL = config("DB_REPLICA_RETRY_INTERVAL", default=30.0, cast=float)
+
+    # Audit log listing (keyset pagination)
+    AUDIT_LOG_PAGE_SIZE = config("AUDIT_LOG_PAGE_SIZE", default=100, cast=int)
+    AUDIT_LOG_MAX_PAGE_SIZE = config("AUDIT_LOG_MAX_PAGE_SIZE", default=500, cast=int)
+
+    # Audit log listings scan newest-first in time windows starting at this
+    # many days and doubling, so a page touches only the latest partitions
+    AUDIT_LOG_SCAN_WINDOW_DAYS = config("AUDIT_LOG_SCAN_WINDOW_DAYS", default=7, cast=float)
+
+    # Users (IDs) who may read every user's audit logs and list the archives;
+    # everyone else only reads their own audit logs
+    AUDIT_LOG_ADMINS = config("AUDIT_LOG_ADMINS", default="", cast=Csv())
+
+    # Audit log storage (see app/utils/audit_retention.py). Months kept in the
+    # database, the current one included (0 keeps everything); older months are
+    # moved to AUDIT_ARCHIVE_DIR as "ndjson" (gzip) or "parquet" (needs pyarrow)
+    # by `python -m app.cli audit-maintenance`, which also keeps
+    # AUDIT_PARTITIONS_AHEAD future monthly partitions created on MySQL.
+    AUDIT_RETENTION_MONTHS = config("AUDIT_RETENTION_MONTHS", default=12, cast=int)
+    AUDIT_ARCHIVE_DIR = config("AUDIT_ARCHIVE_DIR", default="archives/audit_logs")
+    AUDIT_ARCHIVE_FORMAT = config("AUDIT_ARCHIVE_FORMAT", default="ndjson")
+    AUDIT_PARTITIONS_AHEAD = config("AUDIT_PARTITIONS_AHEAD", default=3, cast=int)
+
+    # Audit log writer. AUDIT_LOG_MODE is one of:
+    #   "async"       - queue the row once the request has committed (fire-and-forget)
+    #   "transaction" - write the row in the request's own transaction
+    #   "flush"       - queue the row once the request has committed and wait until
+    #                   the writer has committed its batch before responding
+    AUDIT_LOG_MODE = config("AUDIT_LOG_MODE", default="async")
+    AUDIT_QUEUE_MAX_SIZE = config("AUDIT_QUEUE_MAX_SIZE", default=10000, cast=int)
+    AUDIT_BATCH_SIZE = config("AUDIT_BATCH_SIZE", default=500, cast=int)
+    AUDIT_FLUSH_INTERVAL = config("AUDIT_FLUSH_INTERVAL", default=0.2, cast=float)
+    # Longest a "flush" mode response waits for the writer (seconds); the row
+    # stays queued and the response is sent anyway when it expires
+    AUDIT_FLUSH_TIMEOUT = config("AUDIT_FLUSH_TIMEOUT", default=5.0, cast=float)
+
+    # Package catalog cache (seconds; 0 keeps it until a package write invalidates it)
+    PACKAGE_CACHE_TTL = config("PACKAGE_CACHE_TTL", default=300, cast=float)
+    # Unknown package IDs reload the catalog at most once per this many seconds
+    PACKAGE_CACHE_MISS_INTERVAL = config("PACKAGE_CACHE_MISS_INTERVAL", default=5.0, cast=float)
+
+    # Login sessions. Expiry slides forward on every authenticated request.
+    SESSION_TTL = config("SESSION_TTL", default=1800, cast=int)
+    SESSION_REMEMBER_ME_TTL = config("SESSION_REMEMBER_ME_TTL", default=30 * 24 * 3600, cast=int)
+    # In-memory session cache: entries are re-validated against the database
+    # after SESSION_CACHE_TTL seconds so revocations reach every worker.
+    SESSION_CACHE_SIZE = config("SESSION_CACHE_SIZE", default=10000, cast=int)
+    SESSION_CACHE_TTL = config("SESSION_CACHE_TTL", default=60, cast=int)
+    # Minimum expiry movement (seconds) before a sliding extension is written back
+    SESSION_TOUCH_INTERVAL = config("SESSION_TOUCH_INTERVAL", default=300, cast=int)
+
+    # Idempotency-Key support for POST/PUT/PATCH/DELETE. Completed responses
+    # are replayed for IDEMPOTENCY_TTL seconds (cached per worker, stored in
+    # idempotency_keys for every worker). A running request keeps extending
+    # its claim; one left by a worker that died expires after
+    # IDEMPOTENCY_LOCK_TIMEOUT seconds. A duplicate running on another worker
+    # is waited for up to IDEMPOTENCY_WAIT_TIMEOUT.
+    IDEMPOTENCY_TTL = config("IDEMPOTENCY_TTL", default=24 * 3600, cast=int)
+    IDEMPOTENCY_CACHE_SIZE = config("IDEMPOTENCY_CACHE_SIZE", default=10000, cast=int)
+    IDEMPOTENCY_LOCK_TIMEOUT = config("IDEMPOTENCY_LOCK_TIMEOUT", default=60, cast=int)
+    IDEMPOTENCY_WAIT_TIMEOUT = config("IDEMPOTENCY_WAIT_TIMEOUT", default=10.0, cast=float)
+    # Requests with a larger Content-Length skip idempotency; larger bodies
+    # without one are rejected (413). Larger responses are sent but replayed
+    # as a 422 "too large to replay" marker.
+    IDEMPOTENCY_MAX_BODY_BYTES = config("IDEMPOTENCY_MAX_BODY_BYTES", default=1024 * 1024, cast=int)
+
+    # Bulk customer import
+    BULK_IMPORT_CHUNK_SIZE = config("BULK_IMPORT_CHUNK_SIZE", default=1000, cast=int)
+    BULK_IMPORT_MAX_ERRORS = config("BULK_IMPORT_MAX_ERRORS", default=1000, cast=int)
+
+    # Customer search (type-ahead). Results beyond CUSTOMER_SEARCH_MAX_RESULTS are not paged.
+    CUSTOMER_SEARCH_PAGE_SIZE = config("CUSTOMER_SEARCH_PAGE_SIZE", default=20, cast=int)
+    CUSTOMER_SEARCH_MAX_PAGE_SIZE = config("CUSTOMER_SEARCH_MAX_PAGE_SIZE", default=100, cast=int)
+    CUSTOMER_SEARCH_MAX_RESULTS = config("CUSTOMER_SEARCH_MAX_RESULTS", default=1000, cast=int)
+
+    # Customer and package stats: seconds results are reused per worker, and
+    # the default/maximum look-back window (days) for churn, switches and signups
+    STATS_CACHE_TTL = config("STATS_CACHE_TTL", default=30, cast=float)
+    STATS_DEFAULT_DAYS = config("STATS_DEFAULT_DAYS", default=30, cast=int)
+    STATS_MAX_DAYS = config("STATS_MAX_DAYS", default=366, cast=int)
+
+    # Streaming exports: rows fetched from the server-side cursor per batch
+    EXPORT_BATCH_SIZE = config("EXPORT_BATCH_SIZE", default=1000, cast=int)
+
+    # Seconds between background subscriber count reconciliations (0 disables)
+    SUBSCRIBER_RECONCILE_INTERVAL = config("SUBSCRIBER_RECONCILE_INTERVAL", default=3600, cast=float)
+
+    # Password hashing (scrypt). Pick N for the host with:
+    #   python -m app.utils.passwords --target-ms 100
+    # Existing hashes are upgraded on the next successful login after a change.
+    PASSWORD_SCRYPT_N = config("PASSWORD_SCRYPT_N", default=2 ** 14, cast=int)
+    PASSWORD_SCRYPT_R = config("PASSWORD_SCRYPT_R", default=8, cast=int)
+    PASSWORD_SCRYPT_P = config("PASSWORD_SCRYPT_P", default=1, cast=int)
+    # Hashes computed concurrently; each one holds ~128 * N * R bytes of memory
+    PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=4, cast=int)
+
+    # Login throttling: failed attempts allowed per username and per client IP
+    # within a sliding window. LOGIN_THROTTLE_STORAGE is "memory" (per process).
+    LOGIN_ATTEMPT_WINDOW = config("LOGIN_ATTEMPT_WINDOW", default=300, cast=float)
+    LOGIN_MAX_ATTEMPTS_PER_USER = config("LOGIN_MAX_ATTEMPTS_PER_USER", default=5, cast=int)
+    LOGIN_MAX_ATTEMPTS_PER_IP = config("LOGIN_MAX_ATTEMPTS_PER_IP", default=20, cast=int)
+    LOGIN_THROTTLE_STORAGE = config("LOGIN_THROTTLE_STORAGE", default="memory")
+    LOGIN_THROTTLE_MAX_KEYS = config("LOGIN_THROTTLE_MAX_KEYS", default=100000, cast=int)
+
+    # Web server launched by `python -m app.server`. WEB_WORKERS=0 starts one
+    # worker per available CPU (container quotas included). Workers are
+    # recycled after WEB_MAX_REQUESTS requests (0 disables), plus a random
+    # jitter so they do not all restart at once.
+    WEB_HOST = config("WEB_HOST", default="0.0.0.0")
+    WEB_PORT = config("WEB_PORT", default=10000, cast=int)
+    WEB_WORKERS = config("WEB_WORKERS", default=0, cast=int)
+    WEB_MAX_WORKERS = config("WEB_MAX_WORKERS", default=16, cast=int)
+    WEB_MAX_REQUESTS = config("WEB_MAX_REQUESTS", default=10000, cast=int)
+    WEB_MAX_REQUESTS_JITTER = config("WEB_MAX_REQUESTS_JITTER", default=1000, cast=int)
+    WEB_GRACEFUL_TIMEOUT = config("WEB_GRACEFUL_TIMEOUT", default=30, cast=int)
+    WEB_KEEPALIVE = config("WEB_KEEPALIVE", default=5, cast=int)
+    WEB_BACKLOG = config("WEB_BACKLOG", default=2048, cast=int)
+    # Comma-separated proxy addresses trusted for X-Forwarded-For/-Proto
+    WEB_FORWARDED_ALLOW_IPS = config("WEB_FORWARDED_ALLOW_IPS", default="127.0.0.1")
 except Exception as e:
     print(f"Error: {e}")
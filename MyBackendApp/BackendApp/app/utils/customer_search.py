@@ -0,0 +1,174 @@
+import re
+import unicodedata
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.tables import Customer
+from ..utils.config import CUSTOMER_SEARCH_MAX_RESULTS
+from ..utils.loguru_config import logger
+
+# Columns returned by the search endpoint
+RESULT_COLUMNS = (
+    Customer.id,
+    Customer.first_name,
+    Customer.last_name,
+    Customer.phone_number,
+    Customer.email_address,
+    Customer.address,
+    Customer.package_id,
+)
+# Types of the raw full-text query columns that need decoding (binary keys)
+KEY_TYPES = {"id": Customer.id.type, "package_id": Customer.package_id.type}
+
+# Ranking tiers (lower ranks first)
+EXACT, PREFIX, FULLTEXT = 0, 1, 2
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(value: str) -> str:
+    """
+    Lowercase, strip accents and collapse whitespace, so "  José  Smith" and
+    "jose smith" compare equal.
+    """
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _SPACES.sub(" ", stripped).strip().lower()
+
+
+def normalize_phone(value: str) -> str:
+    """
+    Keep only the digits of a phone number ("+1 (555) 010-2000" -> "15550102000").
+    """
+    return "".join(char for char in value or "" if char.isdigit())[:20]
+
+
+def search_columns(first_name: str, last_name: str, email_address: str, phone_number: str) -> dict:
+    """
+    Values of the normalized prefix-search columns for one customer.
+    """
+    return {
+        "search_name": normalize_text(f"{first_name or ''} {last_name or ''}")[:255],
+        "search_name_reversed": normalize_text(f"{last_name or ''} {first_name or ''}")[:255],
+        "search_email": normalize_text(email_address)[:255],
+        "search_phone": normalize_phone(phone_number) or None,
+    }
+
+
+def apply_search_columns(customer: Customer):
+    """
+    Refresh the search columns of an ORM customer after its fields changed.
+    """
+    for column, value in search_columns(
+        customer.first_name, customer.last_name, customer.email_address, customer.phone_number
+    ).items():
+        setattr(customer, column, value)
+
+
+def _prefix(column, prefix: str):
+    # A half-open range instead of LIKE 'x%': it uses the index on every
+    # backend (SQLite only optimizes LIKE under special collations)
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+
+def _prefix_statement(query: str, window: int):
+    digits = normalize_phone(query)
+    conditions = []
+    if "@" in query:
+        conditions.append(_prefix(Customer.search_email, query))
+    else:
+        conditions.append(_prefix(Customer.search_name, query))
+        conditions.append(_prefix(Customer.search_name_reversed, query))
+        conditions.append(_prefix(Customer.search_email, query))
+        if len(digits) >= 3 and len(digits) * 2 >= len(query.replace(" ", "")):
+            conditions.append(_prefix(Customer.search_phone, digits))
+    return (
+        select(
+            *RESULT_COLUMNS,
+            Customer.search_name,
+            Customer.search_name_reversed,
+            Customer.search_email,
+            Customer.search_phone,
+        )
+        .where(or_(*conditions))
+        .order_by(Customer.search_name)
+        .limit(window)
+    )
+
+
+def _fulltext_statement(dialect: str, terms: list, window: int):
+    columns = ", ".join(f"customers.{column.key}" for column in RESULT_COLUMNS)
+    if dialect == "mysql":
+        # Boolean mode: every term required, each matched as a prefix
+        against = " ".join(f"+{term}*" for term in terms)
+        return text(
+            f"SELECT {columns}, MATCH (first_name, last_name, email_address, address) "
+            f"AGAINST (:terms IN BOOLEAN MODE) AS score FROM customers "
+            f"WHERE MATCH (first_name, last_name, email_address, address) AGAINST (:terms IN BOOLEAN MODE) "
+            f"ORDER BY score DESC LIMIT :window"
+        ).bindparams(terms=against, window=window).columns(**KEY_TYPES)
+    if dialect == "sqlite":
+        # FTS5 prefix queries; bm25() is lower for better matches
+        match = " ".join(f'"{term}"*' for term in terms)
+        return text(
+            f"SELECT {columns}, -bm25(customers_fts) AS score FROM customers_fts "
+            f"JOIN customers ON customers.rowid = customers_fts.rowid "
+            f"WHERE customers_fts MATCH :terms ORDER BY bm25(customers_fts) LIMIT :window"
+        ).bindparams(terms=match, window=window).columns(**KEY_TYPES)
+    return None
+
+
+def _as_item(row) -> dict:
+    return {column.key: getattr(row, column.key) for column in RESULT_COLUMNS}
+
+
+async def search_customers(db: AsyncSession, query: str, page: int, limit: int) -> dict:
+    """
+    Ranked type-ahead search over customer name, email, phone and address.
+    Exact matches rank first, then prefix matches on the normalized
+    name (either order)/email/phone columns, then full-text matches (MySQL FULLTEXT or
+    SQLite FTS5) ordered by relevance.
+    :param db: Database session.
+    :param query: Raw search text.
+    :param page: 1-based page number.
+    :param limit: Results per page.
+    :return: Dict with the page of items and whether more results exist.
+    """
+    normalized = normalize_text(query)
+    terms = _WORD.findall(normalized)
+    if not normalized or not terms:
+        return {"items": [], "page": page, "limit": limit, "has_more": False}
+
+    # Candidates needed to rank the requested page, plus one to detect a next page
+    window = min(page * limit + 1, CUSTOMER_SEARCH_MAX_RESULTS + 1)
+    ranked = {}
+
+    for row in (await db.execute(_prefix_statement(normalized, window))).all():
+        exact = (
+            normalized in (row.search_name, row.search_name_reversed, row.search_email)
+            or normalize_phone(normalized) == row.search_phone
+        )
+        ranked[row.id] = (EXACT if exact else PREFIX, 0.0, row.search_name, _as_item(row))
+
+    # Full-text matches rank below every prefix match, so they are only needed
+    # when prefix matches do not fill the window. Single-character terms are
+    # left out: as prefixes they match most of the table.
+    fulltext_terms = [term for term in terms if len(term) > 1]
+    if len(ranked) < window and fulltext_terms:
+        dialect = db.bind.dialect.name
+        statement = _fulltext_statement(dialect, fulltext_terms, window)
+        if statement is not None:
+            for row in (await db.execute(statement)).all():
+                if row.id not in ranked:
+                    ranked[row.id] = (FULLTEXT, -float(row.score or 0), "", _as_item(row))
+        else:
+            logger.debug("No full-text index for dialect {}, prefix matches only.", dialect)
+
+    ordered = sorted(ranked.values(), key=lambda entry: entry[:3])
+    start = (page - 1) * limit
+    items = [entry[3] for entry in ordered[start:start + limit]]
+    has_more = len(ordered) > start + limit and start + limit < CUSTOMER_SEARCH_MAX_RESULTS
+    return {"items": items, "page": page, "limit": limit, "has_more": has_more}
@@ -0,0 +1,227 @@
+import asyncio
+import time
+from datetime import datetime, time as day_start, timedelta
+from sqlalchemy import and_, func, literal, null, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.tables import AuditLog, Customer, Package
+from ..utils.config import STATS_CACHE_TTL
+from ..utils.loguru_config import logger
+
+# Audit actions the stats are derived from. Deletions written before the
+# package was recorded still count towards total churn.
+CHURN_PREFIX = "Deleted customer "
+SWITCH_PREFIX = "Switched customer "
+
+# pandas resampling rules per bucket; periods are labelled by their first
+# day and weeks start on Monday
+BUCKETS = {"day": "D", "week": "W-MON", "month": "MS"}
+
+
+def churn_action(customer_id: str, package_id: str) -> str:
+    return f"{CHURN_PREFIX}{customer_id} from package {package_id}"
+
+
+def switch_action(customer_id: str, old_package_id: str, new_package_id: str) -> str:
+    return f"{SWITCH_PREFIX}{customer_id} from package {old_package_id} to package {new_package_id}"
+
+
+# IDs are canonical UUIDs, so the package IDs sit at fixed (1-based) offsets
+# of the action text and can be grouped on in SQL
+_ID_LENGTH = 36
+_CUSTOMER, _SOURCE, _TARGET = ("\x00" * _ID_LENGTH, "\x01" * _ID_LENGTH, "\x02" * _ID_LENGTH)
+_CHURN_SOURCE = churn_action(_CUSTOMER, _SOURCE).index(_SOURCE) + 1
+_SWITCH_SOURCE = switch_action(_CUSTOMER, _SOURCE, _TARGET).index(_SOURCE) + 1
+_SWITCH_TARGET = switch_action(_CUSTOMER, _SOURCE, _TARGET).index(_TARGET) + 1
+
+
+class StatsCache:
+    """
+    Short-lived, process-local cache of computed stats. Concurrent requests
+    for the same key while it is being computed wait for that computation
+    instead of running their own.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}
+        self._locks = {}
+
+    async def get_or_compute(self, key, compute):
+        """
+        :param key: Hashable cache key.
+        :param compute: Coroutine function producing the value on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            value = await compute()
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+stats_cache = StatsCache(ttl=STATS_CACHE_TTL)
+
+
+def _window_start(days: int) -> datetime:
+    # Whole calendar days (UTC), today included
+    return datetime.combine(datetime.utcnow().date() - timedelta(days=days - 1), day_start.min)
+
+
+def _prefix(column, prefix: str):
+    # Range form of LIKE 'prefix%' so the action index is used on every backend
+    return and_(column >= prefix, column < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+async def _package_frame(db: AsyncSession):
+    # pandas is imported on first use so it does not slow down every worker's start-up
+    import pandas as pd
+
+    rows = (await db.execute(
+        select(Package.id, Package.package_name, Package.monthly_price, Package.subscriber_count)
+        .order_by(Package.monthly_price, Package.package_name)
+    )).all()
+    frame = pd.DataFrame(rows, columns=["package_id", "package_name", "monthly_price", "subscribers"])
+    # subscriber_count is kept exact by the write paths and the reconciler,
+    # so per-package customer counts never need a COUNT over customers
+    frame["subscribers"] = frame["subscribers"].fillna(0).astype("int64")
+    frame["mrr"] = frame["monthly_price"].astype("int64") * frame["subscribers"]
+    return frame
+
+
+def _package_in_action(offset: int):
+    return func.substr(AuditLog.action, offset, _ID_LENGTH)
+
+
+async def _event_frame(db: AsyncSession, since: datetime):
+    """
+    Churn and switch counts per (source, target) package, aggregated in SQL.
+    Deletions recorded without their package have an empty source.
+    """
+    import pandas as pd
+
+    churn_source = _package_in_action(_CHURN_SOURCE)
+    churned = (
+        select(literal("Deleted").label("kind"), churn_source.label("source"), null().label("target"),
+               func.count().label("events"))
+        .where(_prefix(AuditLog.action, CHURN_PREFIX), AuditLog.timestamp >= since)
+        .group_by(churn_source)
+    )
+    switch_source, switch_target = _package_in_action(_SWITCH_SOURCE), _package_in_action(_SWITCH_TARGET)
+    switched = (
+        select(literal("Switched").label("kind"), switch_source.label("source"), switch_target.label("target"),
+               func.count().label("events"))
+        .where(_prefix(AuditLog.action, SWITCH_PREFIX), AuditLog.timestamp >= since)
+        .group_by(switch_source, switch_target)
+    )
+    rows = (await db.execute(union_all(churned, switched))).all()
+    return pd.DataFrame(rows, columns=["kind", "source", "target", "events"]).astype({"events": "int64"})
+
+
+def _per_package(events, kind: str, column: str):
+    return events.loc[events["kind"] == kind].groupby(column)["events"].sum()
+
+
+def _total(events, kind: str) -> int:
+    return int(events.loc[events["kind"] == kind, "events"].sum())
+
+
+async def _compute_package_stats(db: AsyncSession, days: int) -> dict:
+    packages = await _package_frame(db)
+    events = await _event_frame(db, _window_start(days))
+
+    packages = packages.set_index("package_id")
+    packages["churned"] = _per_package(events, "Deleted", "source")
+    packages["switched_in"] = _per_package(events, "Switched", "target")
+    packages["switched_out"] = _per_package(events, "Switched", "source")
+    counters = ["churned", "switched_in", "switched_out"]
+    packages[counters] = packages[counters].fillna(0).astype("int64")
+    packages["net_change"] = packages["switched_in"] - packages["switched_out"] - packages["churned"]
+
+    return {
+        "generated_at": datetime.utcnow(),
+        "window_days": days,
+        "total_subscribers": int(packages["subscribers"].sum()),
+        "total_mrr": int(packages["mrr"].sum()),
+        "packages": packages.reset_index().to_dict("records"),
+    }
+
+
+async def _compute_customer_stats(db: AsyncSession, days: int, bucket: str) -> dict:
+    import pandas as pd
+
+    now = datetime.utcnow()
+    since = _window_start(days)
+    packages = await _package_frame(db)
+    events = await _event_frame(db, since)
+
+    # One row per signup day from SQL; pandas fills empty days and re-buckets
+    signup_day = func.date(Customer.created_at)
+    rows = (await db.execute(
+        select(signup_day.label("day"), func.count().label("signups"))
+        .where(Customer.created_at >= since)
+        .group_by(signup_day)
+    )).all()
+    daily = pd.Series(
+        [row.signups for row in rows], index=pd.to_datetime([row.day for row in rows]), dtype="int64"
+    )
+    daily = daily.reindex(pd.date_range(since.date(), now.date(), freq="D"), fill_value=0)
+    series = daily.resample(BUCKETS[bucket], label="left", closed="left").sum()
+
+    return {
+        "generated_at": now,
+        "window_days": days,
+        "bucket": bucket,
+        "total_customers": int(packages["subscribers"].sum()),
+        "customers_by_package": packages[["package_id", "package_name", "subscribers"]]
+        .rename(columns={"subscribers": "customers"})
+        .to_dict("records"),
+        "signups_total": int(series.sum()),
+        "signups": [
+            {"period": period.date(), "signups": int(count)} for period, count in series.items()
+        ],
+        "churned": _total(events, "Deleted"),
+        "package_switches": _total(events, "Switched"),
+    }
+
+
+async def package_stats(db: AsyncSession, days: int) -> dict:
+    """
+    Per-package subscribers, monthly recurring revenue (monthly_price *
+    subscribers), churn and switches in/out over the last `days` days.
+    Cached for STATS_CACHE_TTL seconds.
+    :param db: Database session.
+    :param days: Look-back window for churn and switches.
+    """
+    async def compute():
+        started = time.perf_counter()
+        stats = await _compute_package_stats(db, days)
+        logger.debug("Package stats computed in {:.1f} ms.", (time.perf_counter() - started) * 1000)
+        return stats
+
+    return await stats_cache.get_or_compute(("packages", days), compute)
+
+
+async def customer_stats(db: AsyncSession, days: int, bucket: str) -> dict:
+    """
+    Customer totals per package, churn and package-switch counts, and a
+    signup series bucketed by day, week or month over the last `days` days.
+    Cached for STATS_CACHE_TTL seconds.
+    :param db: Database session.
+    :param days: Look-back window.
+    :param bucket: "day", "week" or "month".
+    """
+    async def compute():
+        started = time.perf_counter()
+        stats = await _compute_customer_stats(db, days, bucket)
+        logger.debug("Customer stats computed in {:.1f} ms.", (time.perf_counter() - started) * 1000)
+        return stats
+
+    return await stats_cache.get_or_compute(("customers", days, bucket), compute)
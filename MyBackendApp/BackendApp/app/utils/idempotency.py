@@ -0,0 +1,412 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import orjson
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from ..models.database import engine, open_session
+from ..models.tables import IdempotencyKey
+from ..utils.config import (
+    IDEMPOTENCY_TTL,
+    IDEMPOTENCY_CACHE_SIZE,
+    IDEMPOTENCY_LOCK_TIMEOUT,
+    IDEMPOTENCY_WAIT_TIMEOUT,
+    IDEMPOTENCY_MAX_BODY_BYTES,
+)
+from ..utils.loguru_config import logger
+
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+# Outcomes a retry may legitimately change, so they are never replayed
+UNSTORED_STATUSES = {408, 409, 425, 429}
+# Seconds between checks on a duplicate that is running on another worker
+POLL_INTERVAL = 0.1
+# Stored instead of a response too large to keep, so a retry neither runs the request again nor gets a partial body
+TOO_LARGE_STATUS = 422
+TOO_LARGE_BODY = orjson.dumps({"detail": "The response to this Idempotency-Key was too large to store and cannot be replayed"})
+
+# Outcomes of IdempotencyStore.begin besides a stored response
+CLAIMED = "claimed"
+IN_PROGRESS = "in_progress"
+
+
+@dataclass
+class StoredResponse:
+    """
+    Completed response replayed for retries of the same key.
+    """
+    request_hash: str
+    status_code: int
+    content_type: str | None
+    body: bytes
+    expires_at: datetime
+
+
+class IdempotencyStore:
+    """
+    LRU/TTL cache of completed responses keyed by idempotency key, in front
+    of the idempotency_keys table. Inserting the table row claims the key,
+    so a duplicate runs at most once across workers; duplicates within this
+    worker wait on the first request instead of polling the database.
+    """
+
+    def __init__(self, max_entries: int, ttl: int):
+        """
+        :param max_entries: Maximum number of cached responses (least recently used are evicted).
+        :param ttl: Seconds a completed response is replayed.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stats = {"executed": 0, "replayed": 0, "coalesced": 0, "conflicts": 0, "mismatches": 0, "released": 0}
+
+    async def begin(self, key_hash: str, request_hash: str):
+        """
+        Claim a key for execution or find its earlier outcome.
+        :param key_hash: Scoped idempotency key.
+        :param request_hash: Hash of the request body.
+        :return: A StoredResponse to replay, CLAIMED when the caller must run the
+            request and then call complete() or release(), or IN_PROGRESS when
+            another worker is still running it.
+        """
+        while True:
+            stored = self._get(key_hash)
+            if stored is not None:
+                return stored
+            waiter = self._in_flight.get(key_hash)
+            if waiter is None:
+                break
+            self.record("coalesced")
+            # The first request finished or gave up; look again
+            await asyncio.shield(waiter)
+
+        self._in_flight[key_hash] = asyncio.get_running_loop().create_future()
+        try:
+            outcome = await self._claim(key_hash, request_hash)
+        except BaseException:
+            self._finish(key_hash)
+            raise
+        if outcome is not CLAIMED:
+            self._finish(key_hash)
+        return outcome
+
+    async def complete(self, key_hash: str, stored: StoredResponse):
+        """
+        Store the response of a claimed key and wake up waiting duplicates.
+        """
+        db = open_session()
+        try:
+            await db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key_hash == key_hash)
+                .values(
+                    status_code=stored.status_code,
+                    content_type=stored.content_type,
+                    response_body=stored.body,
+                    expires_at=stored.expires_at,
+                )
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to store idempotent response: {e}")
+        finally:
+            await db.close()
+        self._put(key_hash, stored)
+        self.record("executed")
+        self._finish(key_hash)
+
+    async def hold(self, key_hash: str):
+        """
+        Keep extending the claim of a running request, so it does not expire
+        (and let a retry run the request again) however long the request
+        takes. Runs until cancelled.
+        """
+        while True:
+            await asyncio.sleep(IDEMPOTENCY_LOCK_TIMEOUT / 3)
+            db = open_session()
+            try:
+                await db.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.status_code.is_(None))
+                    .values(expires_at=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT))
+                )
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.warning(f"Failed to extend idempotency key claim: {e}")
+            finally:
+                await db.close()
+
+    async def release(self, key_hash: str):
+        """
+        Drop the claim of a request that failed, so a retry runs it again.
+        """
+        db = open_session()
+        try:
+            await db.execute(
+                delete(IdempotencyKey)
+                .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.status_code.is_(None))
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to release idempotency key: {e}")
+        finally:
+            await db.close()
+        self.record("released")
+        self._finish(key_hash)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_responses"] = len(self._entries)
+        stats["in_flight"] = len(self._in_flight)
+        return stats
+
+    def record(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    async def _claim(self, key_hash: str, request_hash: str):
+        db = open_session()
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+        try:
+            while True:
+                now = datetime.utcnow()
+                # Expired responses and abandoned claims no longer hold the key
+                await db.execute(
+                    delete(IdempotencyKey)
+                    .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.expires_at <= now)
+                )
+                db.add(IdempotencyKey(
+                    key_hash=key_hash,
+                    request_hash=request_hash,
+                    expires_at=now + timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT),
+                ))
+                try:
+                    await db.commit()
+                    return CLAIMED
+                except IntegrityError:
+                    await db.rollback()
+
+                row = (await db.execute(
+                    select(
+                        IdempotencyKey.request_hash,
+                        IdempotencyKey.status_code,
+                        IdempotencyKey.content_type,
+                        IdempotencyKey.response_body,
+                        IdempotencyKey.expires_at,
+                    ).where(IdempotencyKey.key_hash == key_hash)
+                )).first()
+                if row is None:
+                    continue
+                if row.status_code is not None:
+                    stored = StoredResponse(
+                        row.request_hash, row.status_code, row.content_type, row.response_body or b"", row.expires_at
+                    )
+                    self._put(key_hash, stored)
+                    return stored
+                if time.monotonic() >= deadline:
+                    return IN_PROGRESS
+                await asyncio.sleep(POLL_INTERVAL)
+        finally:
+            await db.close()
+
+    def _finish(self, key_hash: str):
+        waiter = self._in_flight.pop(key_hash, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _get(self, key_hash: str):
+        with self._lock:
+            stored = self._entries.get(key_hash)
+            if stored is None:
+                return None
+            if stored.expires_at <= datetime.utcnow():
+                del self._entries[key_hash]
+                return None
+            self._entries.move_to_end(key_hash)
+            return stored
+
+    def _put(self, key_hash: str, stored: StoredResponse):
+        with self._lock:
+            self._entries[key_hash] = stored
+            self._entries.move_to_end(key_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+idempotency_store = IdempotencyStore(max_entries=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL)
+
+
+def purge_expired_keys() -> int:
+    """
+    Delete expired responses and abandoned claims from idempotency_keys.
+    :return: Number of rows deleted.
+    """
+    with engine.begin() as connection:
+        result = connection.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+    logger.info(f"Purged {result.rowcount} expired idempotency key(s).")
+    return result.rowcount
+
+
+def _header(scope, name: bytes) -> bytes:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return b""
+
+
+class IdempotencyMiddleware:
+    """
+    Pure ASGI middleware that makes POST/PUT/PATCH/DELETE requests carrying an
+    Idempotency-Key header safe to retry: the first request runs, and retries
+    with the same key, method, path and caller get its response replayed
+    (marked with Idempotent-Replayed: true) instead of running again.
+    Server errors are not stored, so those requests can be retried.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+        key = _header(scope, b"idempotency-key")
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await ORJSONResponse({"detail": "Idempotency-Key is too long"}, status_code=400)(scope, receive, send)
+            return
+        content_length = _header(scope, b"content-length")
+        if content_length.isdigit() and int(content_length) > IDEMPOTENCY_MAX_BODY_BYTES:
+            # Large uploads (e.g. bulk imports) stream straight through instead of being buffered
+            logger.warning(f"Ignoring Idempotency-Key on a {int(content_length)} byte request to {scope['path']}.")
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            response = ORJSONResponse(
+                {"detail": "Request body is too large to be sent with an Idempotency-Key"}, status_code=413
+            )
+            await response(scope, receive, send)
+            return
+        key_hash = hashlib.sha256(b"\0".join((
+            scope["method"].encode(), scope["path"].encode(), _header(scope, b"authorization"), key,
+        ))).hexdigest()
+        request_hash = hashlib.sha256(body).hexdigest()
+
+        outcome = await idempotency_store.begin(key_hash, request_hash)
+        if outcome is IN_PROGRESS:
+            idempotency_store.record("conflicts")
+            response = ORJSONResponse(
+                {"detail": "A request with this Idempotency-Key is still in progress"}, status_code=409
+            )
+            await response(scope, receive, send)
+            return
+        if outcome is not CLAIMED:
+            await self._replay(outcome, request_hash, scope, receive, send)
+            return
+
+        await self._execute(key_hash, request_hash, body, scope, receive, send)
+
+    async def _execute(self, key_hash, request_hash, body, scope, receive, send):
+        body_sent = False
+        captured = {"status": 500, "content_type": None, "chunks": [], "size": 0}
+
+        async def receive_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_capturing(message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        captured["content_type"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body" and captured["chunks"] is not None:
+                chunk = message.get("body", b"")
+                captured["size"] += len(chunk)
+                if captured["size"] > IDEMPOTENCY_MAX_BODY_BYTES:
+                    captured["chunks"] = None
+                else:
+                    captured["chunks"].append(chunk)
+            await send(message)
+
+        holder = asyncio.create_task(idempotency_store.hold(key_hash))
+        try:
+            await self.app(scope, receive_body, send_capturing)
+        except BaseException:
+            await idempotency_store.release(key_hash)
+            raise
+        finally:
+            holder.cancel()
+
+        status = captured["status"]
+        if status >= 500 or status in UNSTORED_STATUSES:
+            await idempotency_store.release(key_hash)
+            return
+        if captured["chunks"] is None:
+            # The request ran, so the key stays claimed; retries get a marker instead of running it again
+            logger.warning(f"Response to {scope['path']} is too large to store for its Idempotency-Key.")
+            status, content_type, body = TOO_LARGE_STATUS, "application/json", TOO_LARGE_BODY
+        else:
+            content_type, body = captured["content_type"], b"".join(captured["chunks"])
+        await idempotency_store.complete(key_hash, StoredResponse(
+            request_hash=request_hash,
+            status_code=status,
+            content_type=content_type,
+            body=body,
+            expires_at=datetime.utcnow() + timedelta(seconds=idempotency_store.ttl),
+        ))
+
+    @staticmethod
+    async def _replay(stored: StoredResponse, request_hash: str, scope, receive, send):
+        if stored.request_hash != request_hash:
+            idempotency_store.record("mismatches")
+            response = ORJSONResponse(
+                {"detail": "Idempotency-Key was already used with a different request body"}, status_code=422
+            )
+            await response(scope, receive, send)
+            return
+        idempotency_store.record("replayed")
+        headers = [(b"content-length", str(len(stored.body)).encode()), (b"idempotent-replayed", b"true")]
+        if stored.content_type:
+            headers.append((b"content-type", stored.content_type.encode("latin-1")))
+        await send({"type": "http.response.start", "status": stored.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": stored.body})
+
+    @staticmethod
+    async def _read_body(receive):
+        """
+        Buffer the request body, which is hashed and handed to the application.
+        :return: The body, or None once it grows past IDEMPOTENCY_MAX_BODY_BYTES
+            (only possible without Content-Length, e.g. chunked uploads).
+        """
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > IDEMPOTENCY_MAX_BODY_BYTES:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
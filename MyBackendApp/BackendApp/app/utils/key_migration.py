@@ -0,0 +1,181 @@
+"""
+Online conversion of the UUID keys from CHAR(36) text to BINARY(16)
+(migrations 0007 and 0008, see app/models/keys.py).
+
+On MySQL every key column gets a `<column>_bin` shadow column that triggers
+keep in step with new writes while existing rows are backfilled in small
+committed batches (0007, run while the previous release still serves
+traffic). The cutover (0008) then swaps each shadow in for its column with
+one ALTER per table and re-creates the indexes and foreign keys around it.
+SQLite, whose column types are only affinities, converts the values in place.
+"""
+from uuid import UUID
+import sqlalchemy as sa
+
+# Table -> its UUID key columns (primary key first)
+KEY_COLUMNS = {
+    "users": ["id"],
+    "packages": ["id"],
+    "customers": ["id", "package_id"],
+    "audit_logs": ["id", "user_id"],
+    "failed_login_attempts": ["id"],
+    "contact_submissions": ["id"],
+    "user_sessions": ["id", "user_id"],
+    "password_resets": ["id", "user_id"],
+}
+SHADOW_SUFFIX = "_bin"
+BACKFILL_BATCH = 5000
+
+
+def shadow(column: str) -> str:
+    return f"{column}{SHADOW_SUFFIX}"
+
+
+def trigger_names(table: str) -> list[str]:
+    return [f"{table}_key_shadow_insert", f"{table}_key_shadow_update"]
+
+
+def add_shadows(bind, column_type: str, function: str):
+    """
+    Add a shadow column per key column, and triggers filling it from the
+    column on every insert and update.
+    :param column_type: SQL type of the shadow columns.
+    :param function: SQL function converting a key value to the shadow type.
+    """
+    for table, columns in KEY_COLUMNS.items():
+        bind.exec_driver_sql(
+            f"ALTER TABLE {table} " + ", ".join(f"ADD COLUMN {shadow(column)} {column_type} NULL" for column in columns)
+        )
+        assignments = ", ".join(f"NEW.{shadow(column)} = {function}(NEW.{column})" for column in columns)
+        for name, event in zip(trigger_names(table), ("INSERT", "UPDATE")):
+            bind.exec_driver_sql(f"CREATE TRIGGER {name} BEFORE {event} ON {table} FOR EACH ROW SET {assignments}")
+
+
+def backfill(bind, function: str, batch_size: int = BACKFILL_BATCH):
+    """
+    Fill the shadow columns of existing rows, walking each table in primary
+    key order and committing every batch, so locks are held briefly. Must
+    run in autocommit mode.
+    """
+    for table, columns in KEY_COLUMNS.items():
+        assignments = ", ".join(f"{shadow(column)} = {function}({column})" for column in columns)
+        last_id = ""
+        while True:
+            upper = bind.exec_driver_sql(
+                f"SELECT id FROM {table} WHERE id > %s ORDER BY id LIMIT 1 OFFSET %s", (last_id, batch_size - 1)
+            ).scalar()
+            if upper is None:
+                bind.exec_driver_sql(f"UPDATE {table} SET {assignments} WHERE id > %s", (last_id,))
+                break
+            bind.exec_driver_sql(f"UPDATE {table} SET {assignments} WHERE id > %s AND id <= %s", (last_id, upper))
+            last_id = upper
+
+
+def catch_up(bind, function: str):
+    """
+    Fill the shadow values still missing, e.g. when a backfill() was
+    interrupted.
+    """
+    for table, columns in KEY_COLUMNS.items():
+        for column in columns:
+            bind.exec_driver_sql(
+                f"UPDATE {table} SET {shadow(column)} = {function}({column}) "
+                f"WHERE {shadow(column)} IS NULL AND {column} IS NOT NULL"
+            )
+
+
+def drop_triggers(bind):
+    for table in KEY_COLUMNS:
+        for name in trigger_names(table):
+            bind.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def drop_shadows(bind):
+    """
+    Remove the triggers and whatever shadow columns exist.
+    """
+    drop_triggers(bind)
+    inspector = sa.inspect(bind)
+    for table, columns in KEY_COLUMNS.items():
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        drops = [f"DROP COLUMN {shadow(column)}" for column in columns if shadow(column) in existing]
+        if drops:
+            bind.exec_driver_sql(f"ALTER TABLE {table} {', '.join(drops)}")
+
+
+def _index_definition(index: dict) -> str:
+    prefix = index.get("dialect_options", {}).get("mysql_prefix")
+    kind = "UNIQUE INDEX" if index["unique"] else f"{prefix} INDEX" if prefix else "INDEX"
+    lengths = index.get("dialect_options", {}).get("mysql_length") or {}
+    parts = [f"`{column}`({lengths[column]})" if column in lengths else f"`{column}`" for column in index["column_names"]]
+    return f"{kind} `{index['name']}` ({', '.join(parts)})"
+
+
+def swap(bind, column_type: str):
+    """
+    Replace every key column by its shadow column (MySQL), keeping the
+    primary keys, indexes and foreign keys. Each table is rebuilt once.
+    :param column_type: SQL type of the shadow columns.
+    """
+    inspector = sa.inspect(bind)
+    foreign_keys = [
+        (table, foreign_key)
+        for table in KEY_COLUMNS
+        for foreign_key in inspector.get_foreign_keys(table)
+    ]
+    for table, foreign_key in foreign_keys:
+        bind.exec_driver_sql(f"ALTER TABLE {table} DROP FOREIGN KEY `{foreign_key['name']}`")
+
+    for table, columns in KEY_COLUMNS.items():
+        nullable = {column["name"]: column["nullable"] for column in inspector.get_columns(table)}
+        primary_key = inspector.get_pk_constraint(table)["constrained_columns"]
+        # MySQL silently narrows a multi-column index when one of its columns is dropped
+        indexes = [
+            index for index in inspector.get_indexes(table)
+            if set(index["column_names"]) & set(columns)
+        ]
+        clauses = [f"DROP INDEX `{index['name']}`" for index in indexes]
+        clauses.append("DROP PRIMARY KEY")
+        for column in columns:
+            null = "NULL" if nullable[column] else "NOT NULL"
+            clauses.append(f"DROP COLUMN `{column}`")
+            clauses.append(f"CHANGE COLUMN `{shadow(column)}` `{column}` {column_type} {null}")
+        clauses.append(f"ADD PRIMARY KEY ({', '.join(f'`{column}`' for column in primary_key)})")
+        clauses.extend(f"ADD {_index_definition(index)}" for index in indexes)
+        bind.exec_driver_sql(f"ALTER TABLE {table} {', '.join(clauses)}")
+
+    # The keys were converted together, so the existing rows need no checking
+    bind.exec_driver_sql("SET SESSION foreign_key_checks = 0")
+    try:
+        for table, foreign_key in foreign_keys:
+            bind.exec_driver_sql(
+                f"ALTER TABLE {table} ADD CONSTRAINT `{foreign_key['name']}` "
+                f"FOREIGN KEY ({', '.join(foreign_key['constrained_columns'])}) "
+                f"REFERENCES {foreign_key['referred_table']} ({', '.join(foreign_key['referred_columns'])})"
+            )
+    finally:
+        bind.exec_driver_sql("SET SESSION foreign_key_checks = 1")
+
+
+def _text_to_binary(value):
+    return UUID(value).bytes if isinstance(value, str) else value
+
+
+def _binary_to_text(value):
+    return str(UUID(bytes=value)) if isinstance(value, bytes) and len(value) == 16 else value
+
+
+def convert_in_place(bind, to_binary: bool):
+    """
+    Rewrite the key values of every table (SQLite), through a Python
+    function registered on the migration's connection.
+    """
+    name, storage = ("uuid_to_bin", "text") if to_binary else ("bin_to_uuid", "blob")
+    bind.connection.dbapi_connection.create_function(
+        name, 1, _text_to_binary if to_binary else _binary_to_text, deterministic=True
+    )
+    for table, columns in KEY_COLUMNS.items():
+        for column in columns:
+            bind.exec_driver_sql(
+                f"UPDATE {table} SET {column} = {name}({column}) WHERE typeof({column}) = '{storage}'"
+            )
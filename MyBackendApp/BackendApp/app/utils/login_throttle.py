@@ -0,0 +1,140 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from ..models.keys import new_id
+from ..models.tables import FailedLoginAttempt
+from ..utils.batch_writer import BatchWriter
+from ..utils.config import (
+    LOGIN_ATTEMPT_WINDOW,
+    LOGIN_MAX_ATTEMPTS_PER_USER,
+    LOGIN_MAX_ATTEMPTS_PER_IP,
+    LOGIN_THROTTLE_STORAGE,
+    LOGIN_THROTTLE_MAX_KEYS,
+    AUDIT_QUEUE_MAX_SIZE,
+    AUDIT_BATCH_SIZE,
+    AUDIT_FLUSH_INTERVAL,
+)
+from ..utils.loguru_config import logger
+from ..utils.rate_limit import MemoryStorage, RateLimitStorage, SlidingWindowLimiter
+
+# Failed attempts are kept for forensics; they share the audit writer's tuning
+failed_login_sink = BatchWriter(
+    FailedLoginAttempt,
+    name="failed_login_attempts",
+    max_queue_size=AUDIT_QUEUE_MAX_SIZE,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval=AUDIT_FLUSH_INTERVAL,
+)
+
+
+@dataclass
+class LoginAttempt:
+    """
+    Outcome of LoginThrottle.reserve. An admitted attempt already counts as a
+    failure in both windows until record_success or release takes it back.
+    """
+    username: str
+    ip_address: str
+    retry_after: float = 0.0
+    user_hit: float = None
+    ip_hit: float = None
+
+
+class LoginThrottle:
+    """
+    Brute-force protection for the login endpoint. Failed attempts are
+    counted in two sliding windows, per username and per client IP; once
+    either is exhausted, further attempts are rejected before any database
+    query is made. Every attempt is counted before its password is checked,
+    so parallel guesses cannot all pass the limit before the first failure
+    is recorded.
+    """
+
+    def __init__(self, storage: RateLimitStorage, window: float, per_user: int, per_ip: int):
+        """
+        :param storage: Backend holding the attempt timestamps.
+        :param window: Window length in seconds.
+        :param per_user: Failed attempts allowed per username within the window.
+        :param per_ip: Failed attempts allowed per client IP within the window.
+        """
+        self.storage = storage
+        self.users = SlidingWindowLimiter(storage, per_user, window)
+        self.ips = SlidingWindowLimiter(storage, per_ip, window)
+        self._lock = threading.Lock()
+        self._stats = {"allowed": 0, "throttled": 0, "failures": 0}
+
+    def reserve(self, username: str, ip_address: str) -> LoginAttempt:
+        """
+        Admit an attempt, counting it in both windows in the same step as the
+        check. Nothing is counted when the attempt is throttled.
+        :return: LoginAttempt whose retry_after is the seconds the client must
+            wait, or 0.0 if the attempt may proceed.
+        """
+        attempt = LoginAttempt(username, ip_address)
+        attempt.user_hit, attempt.retry_after = self.users.reserve(self._user_key(username))
+        if attempt.user_hit is not None:
+            attempt.ip_hit, attempt.retry_after = self.ips.reserve(self._ip_key(ip_address))
+            if attempt.ip_hit is None:
+                self.users.refund(self._user_key(username), attempt.user_hit)
+                attempt.user_hit = None
+        with self._lock:
+            self._stats["throttled" if attempt.retry_after else "allowed"] += 1
+        return attempt
+
+    def record_failure(self, attempt: LoginAttempt):
+        """
+        Keep a failed attempt counted and queue it for the failed_login_attempts table.
+        """
+        with self._lock:
+            self._stats["failures"] += 1
+        username, ip_address = attempt.username, attempt.ip_address
+        row = {"id": new_id(), "username": username[:255], "ip_address": ip_address[:50], "timestamp": datetime.utcnow()}
+        if not failed_login_sink.running or failed_login_sink.submit(row) is None:
+            logger.warning(f"Failed login attempt for {username} from {ip_address} was not persisted.")
+
+    def record_success(self, attempt: LoginAttempt):
+        """
+        Clear the username's failure window and take the attempt back from the
+        IP window (earlier failures from the IP are kept).
+        """
+        self.users.reset(self._user_key(attempt.username))
+        self.ips.refund(self._ip_key(attempt.ip_address), attempt.ip_hit)
+
+    def release(self, attempt: LoginAttempt):
+        """
+        Take back an attempt that ended without a verdict (e.g. a server error).
+        """
+        self.users.refund(self._user_key(attempt.username), attempt.user_hit)
+        self.ips.refund(self._ip_key(attempt.ip_address), attempt.ip_hit)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["tracked_keys"] = self.storage.size()
+        stats["writer"] = failed_login_sink.metrics()
+        return stats
+
+    @staticmethod
+    def _user_key(username: str) -> str:
+        return f"user:{username.strip().lower()}"
+
+    @staticmethod
+    def _ip_key(ip_address: str) -> str:
+        return f"ip:{ip_address}"
+
+
+def _build_storage(name: str) -> RateLimitStorage:
+    if name == "memory":
+        return MemoryStorage(
+            max_keys=LOGIN_THROTTLE_MAX_KEYS,
+            max_hits=max(LOGIN_MAX_ATTEMPTS_PER_USER, LOGIN_MAX_ATTEMPTS_PER_IP),
+        )
+    raise ValueError(f"Unknown LOGIN_THROTTLE_STORAGE: {name}")
+
+
+login_throttle = LoginThrottle(
+    storage=_build_storage(LOGIN_THROTTLE_STORAGE),
+    window=LOGIN_ATTEMPT_WINDOW,
+    per_user=LOGIN_MAX_ATTEMPTS_PER_USER,
+    per_ip=LOGIN_MAX_ATTEMPTS_PER_IP,
+)
@@ -1,17 +1,75 @@
 from loguru import logger
+import json
+import random
 import sys
+import traceback
+from ..utils.config import LOG_LEVEL, LOG_FORMAT, LOG_ENQUEUE, LOG_DEBUG_SAMPLE_RATE
 
-def setup_loguru():
+
+def _json_sink(stream):
+    """
+    Build a sink that writes one compact JSON object per record. With
+    enqueue=True it runs on loguru's background thread, so serialization
+    and the write stay off the request path.
+    """
+    def sink(message):
+        record = message.record
+        entry = {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "message": record["message"],
+            "logger": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+        }
+        if record["extra"]:
+            entry["extra"] = record["extra"]
+        if record["exception"] is not None:
+            error = record["exception"]
+            entry["exception"] = "".join(traceback.format_exception(error.type, error.value, error.traceback))
+        stream.write(json.dumps(entry, default=str) + "\n")
+    return sink
+
+
+def _debug_sampler(sample_rate: float):
+    """
+    Filter that keeps only a fraction of DEBUG (and TRACE) records; higher levels always pass.
+    """
+    def keep(record):
+        return record["level"].no > 10 or random.random() < sample_rate
+    return keep
+
+
+def setup_loguru(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, enqueue: bool = LOG_ENQUEUE,
+                 debug_sample_rate: float = LOG_DEBUG_SAMPLE_RATE, sink=sys.stdout):
+    """
+    (Re)configure the application logger.
+    Records below the level are dropped before their message is formatted,
+    so debug statements using brace arguments, e.g. logger.debug("x={}", x),
+    cost almost nothing when debug logging is off.
+    :param level: Minimum level name (LOG_LEVEL).
+    :param log_format: "console" (human readable, colorized) or "json" (one object per line).
+    :param enqueue: Hand records to a background thread instead of writing them in the caller.
+    :param debug_sample_rate: Fraction of DEBUG records kept (1.0 keeps all).
+    :param sink: Stream the records are written to.
+    """
     # Clear default handlers to avoid duplicate logs
     logger.remove()
 
-    # Add a custom handler for console logging
-    logger.add(
-        sys.stdout,
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
-        level="DEBUG",  # Adjust log level as needed
-        colorize=True,
-    )
+    options = {"level": level.upper(), "enqueue": enqueue}
+    if debug_sample_rate < 1.0:
+        options["filter"] = _debug_sampler(debug_sample_rate)
+
+    if log_format == "json":
+        logger.add(_json_sink(sink), **options)
+    else:
+        # Add a custom handler for console logging
+        logger.add(
+            sink,
+            format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
+            colorize=True,
+            **options,
+        )
     return logger
 
 loguru_logger = setup_loguru()
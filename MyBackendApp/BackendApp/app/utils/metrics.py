@@ -0,0 +1,184 @@
+import bisect
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Histogram bucket upper bounds
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+HOLD_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+LIFETIME_BUCKETS_S = (1, 10, 60, 300, 900, 1800, 3600, 14400, 28800)
+
+
+class Histogram:
+    """
+    Thread-safe fixed-bucket histogram (cumulative buckets, Prometheus style).
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        """
+        :return: Dict with cumulative bucket counts (keyed by upper bound, "+Inf" last), sum and count.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+            running += bucket_count
+            cumulative[str(bound)] = running
+        return {"buckets": cumulative, "sum": round(total, 3), "count": count}
+
+
+class PoolMetrics:
+    """
+    Collects connection pool statistics for one engine from SQLAlchemy pool
+    events, plus checkout wait time measured by an instrumented pool class.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.wait_ms = Histogram(WAIT_BUCKETS_MS)
+        self.hold_ms = Histogram(HOLD_BUCKETS_MS)
+        self.lifetime_s = Histogram(LIFETIME_BUCKETS_S)
+        self._open = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "connects": 0,
+            "closes": 0,
+            "checkouts": 0,
+            "checkins": 0,
+            "invalidations": 0,
+            "timeouts": 0,
+        }
+
+    def pool_class(self, base):
+        """
+        Build a subclass of the given pool class that times every checkout.
+        The subclass survives pool recreation (engine.dispose()).
+        """
+        metrics = self
+
+        def _do_get(pool):
+            started = time.perf_counter()
+            try:
+                return base._do_get(pool)
+            except exc.TimeoutError:
+                metrics._increment("timeouts")
+                raise
+            finally:
+                metrics.wait_ms.observe((time.perf_counter() - started) * 1000)
+
+        return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+    def attach(self, engine):
+        """
+        Register pool event listeners on a sync engine (or an AsyncEngine's sync_engine).
+        """
+        self.pool = engine.pool
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "close", self._on_close)
+        event.listen(engine, "close_detached", self._on_close_detached)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "soft_invalidate", self._on_invalidate)
+
+    def snapshot(self) -> dict:
+        """
+        Current pool state, event counters and histograms.
+        """
+        pool = self.pool
+        now = time.monotonic()
+        with self._lock:
+            counters = dict(self._counters)
+            ages = [now - connected_at for connected_at in self._open.values()]
+        state = {"pool_class": type(pool).__name__ if pool is not None else None}
+        if isinstance(pool, QueuePool):
+            state.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            })
+        return {
+            "name": self.name,
+            **state,
+            **counters,
+            "open_connections": len(ages),
+            "oldest_connection_age_s": round(max(ages), 3) if ages else 0.0,
+            "checkout_wait_ms": self.wait_ms.snapshot(),
+            "checkout_hold_ms": self.hold_ms.snapshot(),
+            "connection_lifetime_s": self.lifetime_s.snapshot(),
+        }
+
+    def _increment(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._counters["connects"] += 1
+            self._open[id(connection_record)] = time.monotonic()
+
+    def _on_close(self, dbapi_connection, connection_record):
+        self._closed(id(connection_record))
+
+    def _on_close_detached(self, dbapi_connection):
+        self._increment("closes")
+
+    def _closed(self, key):
+        with self._lock:
+            self._counters["closes"] += 1
+            connected_at = self._open.pop(key, None)
+        if connected_at is not None:
+            self.lifetime_s.observe(time.monotonic() - connected_at)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        self._increment("checkouts")
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            self.hold_ms.observe((time.perf_counter() - checked_out_at) * 1000)
+        self._increment("checkins")
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self._increment("invalidations")
+
+
+def engine_options(url: str, metrics: PoolMetrics, pool_size: int, max_overflow: int,
+                   pool_timeout: float, pool_recycle: int, pool_pre_ping: bool) -> dict:
+    """
+    Build create_engine/create_async_engine keyword arguments with an
+    instrumented pool. Sizing arguments only apply to queue-based pools
+    (e.g. not to in-memory SQLite).
+    """
+    parsed = make_url(url)
+    default_pool = parsed.get_dialect().get_pool_class(parsed)
+    options = {
+        "poolclass": metrics.pool_class(default_pool),
+        "pool_pre_ping": pool_pre_ping,
+        "pool_recycle": pool_recycle,
+    }
+    if issubclass(default_pool, QueuePool):
+        options.update({"pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": pool_timeout})
+    return options
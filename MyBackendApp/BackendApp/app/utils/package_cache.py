@@ -0,0 +1,132 @@
+import threading
+import time
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.tables import Package
+from ..utils.config import PACKAGE_CACHE_MISS_INTERVAL, PACKAGE_CACHE_TTL
+from ..utils.loguru_config import logger
+
+# Columns served from the cache (matches what the package endpoints return)
+_COLUMNS = (Package.id, Package.package_name, Package.description, Package.monthly_price, Package.subscriber_count)
+
+
+class PackageCache:
+    """
+    Read-through, process-local cache of the whole package catalog.
+    The table is tiny, so it is loaded in a single query and kept until a
+    package write invalidates it or the optional TTL expires. Every change
+    bumps a generation counter; a load that overlapped a change is returned
+    to its caller but not cached, since it may predate the change.
+    """
+
+    def __init__(self, ttl: float = 0, miss_interval: float = 5.0):
+        """
+        :param ttl: Seconds before the catalog is reloaded; 0 keeps it until invalidated.
+        :param miss_interval: Minimum seconds between reloads caused by unknown package IDs.
+        """
+        self.ttl = ttl
+        self.miss_interval = miss_interval
+        self._packages = None
+        self._loaded_at = 0.0
+        self._miss_reload_at = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "stale_loads": 0, "invalidations": 0, "unknown_ids": 0}
+
+    async def all(self, db: AsyncSession) -> list:
+        """
+        Return every package.
+        :param db: Database session used when the catalog has to be loaded.
+        :return: List of package dicts.
+        """
+        packages = await self._catalog(db)
+        return [dict(package) for package in packages.values()]
+
+    async def get(self, db: AsyncSession, package_id: str):
+        """
+        Return a single package. An unknown ID forces a reload, since the
+        package may have been created by another worker, but at most one per
+        miss_interval: unknown IDs within it are answered from the cache, so
+        requests for missing IDs cannot reload the catalog over and over.
+        :param db: Database session used when the catalog has to be loaded.
+        :param package_id: ID of the package.
+        :return: Package dict, or None if it does not exist.
+        """
+        package = (await self._catalog(db)).get(package_id)
+        if package is None and self._reload_for_miss():
+            package = (await self._catalog(db)).get(package_id)
+        return dict(package) if package else None
+
+    def invalidate(self):
+        """
+        Drop the cached catalog so the next read reloads it.
+        """
+        with self._lock:
+            self._packages = None
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    def adjust_subscribers(self, package_id: str, delta: int):
+        """
+        Apply a committed subscriber count change to the cached copy.
+        :param package_id: ID of the package.
+        :param delta: Change in subscriber count.
+        """
+        with self._lock:
+            self._generation += 1
+            if self._packages and package_id in self._packages:
+                package = self._packages[package_id]
+                package["subscriber_count"] = (package["subscriber_count"] or 0) + delta
+
+    def stats(self) -> dict:
+        """
+        Snapshot of hit/miss counters.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_packages"] = len(self._packages) if self._packages is not None else 0
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    async def _catalog(self, db: AsyncSession) -> dict:
+        with self._lock:
+            if self._packages is not None and not self._expired():
+                self._stats["hits"] += 1
+                return self._packages
+            self._stats["misses"] += 1
+            generation = self._generation
+
+        # From the primary even in read-only sessions: a lagging replica would
+        # keep a stale catalog cached until the next invalidation or TTL
+        rows = (await db.execute(select(*_COLUMNS).execution_options(use_primary=True))).all()
+        packages = {row.id: dict(row._mapping) for row in rows}
+        with self._lock:
+            self._stats["loads"] += 1
+            if generation != self._generation:
+                self._stats["stale_loads"] += 1
+                logger.debug("Package cache load overlapped a change and was not cached.")
+                return packages
+            self._packages = packages
+            self._loaded_at = time.monotonic()
+        logger.debug("Package cache loaded {} packages.", len(packages))
+        return packages
+
+    def _reload_for_miss(self) -> bool:
+        # Claim the miss reload of the current interval by dropping the catalog
+        now = time.monotonic()
+        with self._lock:
+            self._stats["unknown_ids"] += 1
+            if self._miss_reload_at is not None and now - self._miss_reload_at < self.miss_interval:
+                return False
+            self._miss_reload_at = now
+            self._packages = None
+            self._generation += 1
+            self._stats["invalidations"] += 1
+        return True
+
+    def _expired(self) -> bool:
+        return bool(self.ttl) and time.monotonic() - self._loaded_at > self.ttl
+
+
+package_cache = PackageCache(ttl=PACKAGE_CACHE_TTL, miss_interval=PACKAGE_CACHE_MISS_INTERVAL)
@@ -0,0 +1,40 @@
+import base64
+import binascii
+from datetime import datetime
+from fastapi import HTTPException
+
+
+def encode_cursor(timestamp: datetime, record_id: str) -> str:
+    """
+    Encode a (timestamp, id) keyset position into an opaque cursor token.
+    :param timestamp: Timestamp of the last row on the current page.
+    :param record_id: ID of the last row on the current page.
+    :return: URL-safe cursor string.
+    """
+    raw = f"{timestamp.isoformat()}|{record_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    Decode a cursor token produced by encode_cursor.
+    :param cursor: Opaque cursor string from a previous page.
+    :return: Tuple of (timestamp, id).
+    :raises HTTPException: 400 if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        timestamp, record_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), record_id
+    except (ValueError, UnicodeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def clamp_page_size(limit: int | None, default: int, maximum: int) -> int:
+    """
+    Bound a requested page size to [1, maximum], falling back to the default.
+    """
+    if not limit or limit < 1:
+        return default
+    return min(limit, maximum)
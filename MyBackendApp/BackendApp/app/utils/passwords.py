@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ..utils.config import PASSWORD_HASH_WORKERS, PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P
+from ..utils.loguru_config import logger
+
+_SCHEME = "scrypt"
+_SALT_BYTES = 16
+_KEY_BYTES = 32
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # OpenSSL's default memory cap (32 MiB) is below what larger cost settings need
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=_KEY_BYTES
+    )
+
+
+class PasswordHasher:
+    """
+    scrypt password hashing on a dedicated, bounded thread pool.
+    hashlib.scrypt releases the GIL, so hashes run in parallel without
+    occupying the event loop or the request threadpool.
+    Hashes are stored as "scrypt$<n>$<r>$<p>$<salt>$<hash>" so cost
+    parameters can change without invalidating existing passwords.
+    """
+
+    def __init__(self, n: int, r: int, p: int, workers: int):
+        """
+        :param n: CPU/memory cost (power of two).
+        :param r: Block size.
+        :param p: Parallelization factor.
+        :param workers: Maximum number of hashes computed at once.
+        """
+        if n < 2 or n & (n - 1):
+            raise ValueError("PASSWORD_SCRYPT_N must be a power of two greater than 1")
+        self.n, self.r, self.p = n, r, p
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        # A valid hash at current cost, verified when a user is unknown so
+        # response time does not reveal whether the account exists.
+        # Computed on first use to keep it out of application startup.
+        self._dummy_hash = None
+
+    def hash_sync(self, password: str) -> str:
+        salt = secrets.token_bytes(_SALT_BYTES)
+        key = _scrypt(password, salt, self.n, self.r, self.p)
+        return f"{_SCHEME}${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(key)}"
+
+    def verify_sync(self, password: str, stored: str) -> tuple[bool, bool]:
+        """
+        :return: (matches, needs_rehash).
+        """
+        if not stored or not stored.startswith(f"{_SCHEME}$"):
+            # Rows written before hashing was introduced hold the plaintext
+            return hmac.compare_digest((stored or "").encode("utf-8"), password.encode("utf-8")), True
+        try:
+            _, n, r, p, salt, key = stored.split("$")
+            n, r, p = int(n), int(r), int(p)
+            expected = _b64decode(key)
+            actual = _scrypt(password, _b64decode(salt), n, r, p)
+        except ValueError:
+            logger.error("Stored password hash is malformed.")
+            return False, False
+        return hmac.compare_digest(actual, expected), (n, r, p) != (self.n, self.r, self.p)
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password on the hasher pool.
+        :return: Encoded hash including its parameters and salt.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.hash_sync, password)
+
+    async def verify(self, password: str, stored: str) -> tuple[bool, bool]:
+        """
+        Check a password against a stored hash on the hasher pool.
+        :param password: Plaintext password from the client.
+        :param stored: Stored hash, or None for an unknown user (a dummy hash is checked instead).
+        :return: (matches, needs_rehash); needs_rehash is set when the stored
+            hash uses outdated parameters or is a legacy plaintext value.
+        """
+        if stored is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = await self.hash(secrets.token_urlsafe(16))
+            await asyncio.get_running_loop().run_in_executor(self._executor, self.verify_sync, password, self._dummy_hash)
+            return False, False
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.verify_sync, password, stored)
+
+
+password_hasher = PasswordHasher(
+    n=PASSWORD_SCRYPT_N, r=PASSWORD_SCRYPT_R, p=PASSWORD_SCRYPT_P, workers=PASSWORD_HASH_WORKERS
+)
+
+
+def calibrate(target_ms: float, r: int = PASSWORD_SCRYPT_R, p: int = PASSWORD_SCRYPT_P, rounds: int = 3) -> dict:
+    """
+    Find the largest scrypt N whose single-hash latency on this host stays within target_ms.
+    :param target_ms: Target latency per hash in milliseconds.
+    :param r: Block size to calibrate with.
+    :param p: Parallelization factor to calibrate with.
+    :param rounds: Hashes timed per candidate (the median is used).
+    :return: Chosen parameters and the measured latency of each candidate.
+    """
+    salt = secrets.token_bytes(_SALT_BYTES)
+    chosen, timings = None, {}
+    n = 2 ** 10
+    while n <= 2 ** 22:
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            _scrypt("calibration-password", salt, n, r, p)
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[n] = round(sorted(samples)[len(samples) // 2], 2)
+        if timings[n] > target_ms:
+            break
+        chosen = n
+        n *= 2
+    return {"n": chosen or 2 ** 10, "r": r, "p": p, "target_ms": target_ms, "timings_ms": timings}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick scrypt cost parameters for a target hash latency on this host.")
+    parser.add_argument("--target-ms", type=float, default=100.0, help="Target latency per hash in milliseconds.")
+    parser.add_argument("-r", type=int, default=PASSWORD_SCRYPT_R, help="scrypt block size.")
+    parser.add_argument("-p", type=int, default=PASSWORD_SCRYPT_P, help="scrypt parallelization factor.")
+    args = parser.parse_args()
+
+    result = calibrate(args.target_ms, r=args.r, p=args.p)
+    for n, elapsed in result["timings_ms"].items():
+        print(f"N={n:<8} {elapsed:>9.2f} ms")
+    print(f"\nPASSWORD_SCRYPT_N={result['n']}")
+    print(f"PASSWORD_SCRYPT_R={result['r']}")
+    print(f"PASSWORD_SCRYPT_P={result['p']}")
@@ -1,8 +1,13 @@
+from sqlalchemy import select
 from sqlalchemy.orm import sessionmaker
 from app.models.database import engine
 from app.models.tables import Package
 
 def populate_packages():
+    """
+    Insert the default packages that are missing (one SELECT for all of them).
+    :return: Number of packages inserted.
+    """
     SessionLocal = sessionmaker(bind=engine)
     session = SessionLocal()
 
@@ -13,9 +18,13 @@ def populate_packages():
         {"package_name": "VIP", "description": "VIP package with exclusive benefits.", "monthly_price": 200},
     ]
 
+    existing_names = set(session.scalars(
+        select(Package.package_name).where(Package.package_name.in_([package["package_name"] for package in packages]))
+    ))
+
+    inserted = 0
     for package in packages:
-        existing_package = session.query(Package).filter_by(package_name=package["package_name"]).first()
-        if existing_package:
+        if package["package_name"] in existing_names:
             continue
 
         new_package = Package(
@@ -24,6 +33,8 @@ def populate_packages():
             monthly_price=package["monthly_price"],
         )
         session.add(new_package)
+        inserted += 1
 
     session.commit()
     session.close()
+    return inserted
@@ -0,0 +1,248 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class RateLimitStorage:
+    """
+    Storage interface for sliding-window rate limiting.
+    A backend keeps, per key, the timestamps of hits inside the window.
+    Every method must be atomic per key, so concurrent workers sharing a
+    backend never over- or under-count.
+    """
+
+    def hit(self, key: str, now: float, window: float) -> int:
+        """
+        Record a hit and drop timestamps older than the window.
+        :return: Number of hits inside the window, including this one.
+        """
+        raise NotImplementedError
+
+    def peek(self, key: str, now: float, window: float) -> tuple[int, float]:
+        """
+        Inspect a key without recording a hit.
+        :return: (hits inside the window, timestamp of the oldest of them or 0.0).
+        """
+        raise NotImplementedError
+
+    def hit_below(self, key: str, now: float, window: float, limit: int) -> tuple[bool, float]:
+        """
+        Record a hit only if fewer than limit hits are inside the window,
+        checking and recording in one atomic step.
+        :return: (whether the hit was recorded, timestamp of the oldest hit inside the window or 0.0).
+        """
+        raise NotImplementedError
+
+    def remove(self, key: str, timestamp: float):
+        """
+        Take back one hit recorded at timestamp (no-op if it is gone).
+        """
+        raise NotImplementedError
+
+    def reset(self, key: str):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        """
+        Number of keys currently tracked.
+        """
+        raise NotImplementedError
+
+
+class MemoryStorage(RateLimitStorage):
+    """
+    Process-local storage: one deque of timestamps per key, with the least
+    recently used keys evicted beyond max_keys so memory stays bounded under
+    attacks that rotate usernames or addresses.
+    """
+
+    def __init__(self, max_keys: int = 100000, max_hits: int = 1000):
+        """
+        :param max_keys: Maximum number of tracked keys.
+        :param max_hits: Timestamps kept per key (should be at least the largest limit).
+        """
+        self.max_keys = max_keys
+        self.max_hits = max_hits
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, now: float, window: float) -> int:
+        with self._lock:
+            hits = self._window(key, now, window)
+            hits.append(now)
+            return len(hits)
+
+    def peek(self, key: str, now: float, window: float) -> tuple[int, float]:
+        with self._lock:
+            hits = self._hits.get(key)
+            if not hits:
+                return 0, 0.0
+            self._trim(hits, now - window)
+            return len(hits), hits[0] if hits else 0.0
+
+    def hit_below(self, key: str, now: float, window: float, limit: int) -> tuple[bool, float]:
+        with self._lock:
+            hits = self._window(key, now, window)
+            if len(hits) >= limit:
+                return False, hits[0]
+            hits.append(now)
+            return True, 0.0
+
+    def remove(self, key: str, timestamp: float):
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits and timestamp in hits:
+                hits.remove(timestamp)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._hits)
+
+    def _window(self, key: str, now: float, window: float) -> deque:
+        # The key's hits inside the window, marked most recently used; call with the lock held
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = self._hits[key] = deque(maxlen=self.max_hits)
+            while len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+        else:
+            self._hits.move_to_end(key)
+        self._trim(hits, now - window)
+        return hits
+
+    @staticmethod
+    def _trim(hits: deque, cutoff: float):
+        while hits and hits[0] <= cutoff:
+            hits.popleft()
+
+
+class SharedStorage(RateLimitStorage):
+    """
+    Interface for a backend shared by every worker process (one sorted set per
+    key, e.g. Redis ZADD + ZREMRANGEBYSCORE + ZCARD in a MULTI block, and a
+    Lua script for hit_below). Limits are then enforced across processes and
+    hosts instead of per process.
+    """
+
+
+class FakeSharedStorage(SharedStorage):
+    """
+    Local stand-in for a shared backend, for tests and benchmarks. It models
+    the sorted-set semantics (and optionally the round-trip latency) of a
+    remote store without needing one.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """
+        :param latency: Seconds slept per call to simulate a network round trip.
+        """
+        self.latency = latency
+        self._sets = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, now: float, window: float) -> int:
+        self._round_trip()
+        with self._lock:
+            scores = self._sets.setdefault(key, [])
+            del scores[:bisect.bisect_right(scores, now - window)]
+            bisect.insort(scores, now)
+            return len(scores)
+
+    def peek(self, key: str, now: float, window: float) -> tuple[int, float]:
+        self._round_trip()
+        with self._lock:
+            scores = self._sets.get(key, [])
+            del scores[:bisect.bisect_right(scores, now - window)]
+            return len(scores), scores[0] if scores else 0.0
+
+    def hit_below(self, key: str, now: float, window: float, limit: int) -> tuple[bool, float]:
+        self._round_trip()
+        with self._lock:
+            scores = self._sets.setdefault(key, [])
+            del scores[:bisect.bisect_right(scores, now - window)]
+            if len(scores) >= limit:
+                return False, scores[0]
+            bisect.insort(scores, now)
+            return True, 0.0
+
+    def remove(self, key: str, timestamp: float):
+        self._round_trip()
+        with self._lock:
+            scores = self._sets.get(key)
+            if scores and timestamp in scores:
+                scores.remove(timestamp)
+
+    def reset(self, key: str):
+        self._round_trip()
+        with self._lock:
+            self._sets.pop(key, None)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._sets)
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class SlidingWindowLimiter:
+    """
+    Allows at most `limit` hits per key within any `window` seconds.
+    """
+
+    def __init__(self, storage: RateLimitStorage, limit: int, window: float):
+        """
+        :param storage: Backend that holds the hit timestamps.
+        :param limit: Maximum hits per window.
+        :param window: Window length in seconds.
+        """
+        self.storage = storage
+        self.limit = limit
+        self.window = window
+
+    def retry_after(self, key: str, now: float = None) -> float:
+        """
+        Check a key without recording a hit.
+        :return: Seconds until the key may be hit again, or 0.0 if it is not limited.
+        """
+        now = time.time() if now is None else now
+        count, oldest = self.storage.peek(key, now, self.window)
+        if count < self.limit:
+            return 0.0
+        return max(oldest + self.window - now, 0.0)
+
+    def hit(self, key: str, now: float = None) -> int:
+        """
+        Record a hit.
+        :return: Number of hits inside the window, including this one.
+        """
+        return self.storage.hit(key, time.time() if now is None else now, self.window)
+
+    def reserve(self, key: str, now: float = None) -> tuple[float, float]:
+        """
+        Record a hit if the key is not limited, atomically, so concurrent
+        callers cannot all pass the check before any of them is counted.
+        :return: (timestamp of the recorded hit, 0.0) or, when limited,
+            (None, seconds until the key may be hit again).
+        """
+        now = time.time() if now is None else now
+        recorded, oldest = self.storage.hit_below(key, now, self.window, self.limit)
+        if recorded:
+            return now, 0.0
+        return None, max(oldest + self.window - now, 0.0)
+
+    def refund(self, key: str, timestamp: float):
+        """
+        Take back a hit recorded by reserve (no-op for None).
+        """
+        if timestamp is not None:
+            self.storage.remove(key, timestamp)
+
+    def reset(self, key: str):
+        self.storage.reset(key)
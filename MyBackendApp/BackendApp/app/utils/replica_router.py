@@ -0,0 +1,168 @@
+import hashlib
+import itertools
+import math
+import threading
+import time
+from ..utils.loguru_config import logger
+
+SELECTIONS = ("round_robin", "least_connections")
+# Cookie carrying the wall-clock time until which the client reads from the
+# primary, so every worker (not only the one that served the write) knows
+STICKY_COOKIE = "read_primary_until"
+
+
+def caller_key(request) -> str:
+    """
+    Identity used for read-your-writes stickiness: the caller's credentials,
+    or its address for anonymous requests.
+    """
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.sha256(authorization.encode()).hexdigest()
+    return request.client.host if request.client else ""
+
+
+def _checked_out(engine) -> int:
+    # Pools without a connection queue (e.g. NullPool) do not track checkouts
+    checkedout = getattr(engine.pool, "checkedout", None)
+    return checkedout() if checkedout else 0
+
+
+class ReplicaRouter:
+    """
+    Chooses the read replica of each read-only session and keeps the state
+    that decides when reads must go to the primary instead: replicas that
+    recently failed, and callers that recently wrote (their writes may not
+    have replicated yet).
+    """
+
+    def __init__(self, names: list, selection: str = "round_robin", sticky_seconds: float = 5.0,
+                 retry_interval: float = 30.0, max_callers: int = 100000):
+        """
+        :param names: Display names of the replicas, in engine order.
+        :param selection: "round_robin" or "least_connections" (fewest checked-out connections).
+        :param sticky_seconds: Seconds a caller reads from the primary after a write.
+        :param retry_interval: Seconds a failed replica is skipped.
+        :param max_callers: Maximum number of sticky callers tracked.
+        """
+        if selection not in SELECTIONS:
+            raise ValueError(f"Unsupported DB_REPLICA_SELECTION '{selection}'; use one of {', '.join(SELECTIONS)}")
+        self.names = list(names)
+        self.selection = selection
+        self.sticky_seconds = sticky_seconds
+        self.retry_interval = retry_interval
+        self.max_callers = max_callers
+        self._down_until = [0.0] * len(self.names)
+        self._sticky = {}
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {"replica_sessions": [0] * len(self.names), "primary_sessions": 0, "sticky_sessions": 0, "failovers": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.names)
+
+    def choose(self, engines: list):
+        """
+        Pick the replica for a new read-only session.
+        :param engines: Replica engines, in the order of names.
+        :return: Index of the replica, or None when all of them are down.
+        """
+        now = time.monotonic()
+        with self._lock:
+            available = [index for index, until in enumerate(self._down_until) if until <= now]
+            if not available:
+                self._stats["primary_sessions"] += 1
+                return None
+            # Rotate so ties (and round robin) spread over the replicas
+            offset = next(self._turn) % len(available)
+            available = available[offset:] + available[:offset]
+        if self.selection == "least_connections":
+            index = min(available, key=lambda index: _checked_out(engines[index]))
+        else:
+            index = available[0]
+        with self._lock:
+            self._stats["replica_sessions"][index] += 1
+        return index
+
+    def mark_down(self, index: int, error: Exception):
+        """
+        Skip a replica for retry_interval seconds after it failed.
+        """
+        with self._lock:
+            already_down = self._down_until[index] > time.monotonic()
+            self._down_until[index] = time.monotonic() + self.retry_interval
+            self._stats["failovers"] += 1
+        if not already_down:
+            logger.warning(
+                f"Read replica {self.names[index]} is unavailable, reading from the primary "
+                f"for {self.retry_interval:g}s: {error}"
+            )
+
+    def note_write(self, caller: str):
+        """
+        Send the caller's reads to the primary for the next sticky_seconds.
+        """
+        if not self.enabled or self.sticky_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._sticky.pop(caller, None)
+            self._sticky[caller] = now + self.sticky_seconds
+            if len(self._sticky) > self.max_callers:
+                # Entries are in write order, so the oldest ones expire first
+                for key in list(itertools.islice(self._sticky, len(self._sticky) - self.max_callers // 2)):
+                    del self._sticky[key]
+
+    def mark_client(self, response):
+        """
+        Set the sticky cookie on the response to a write, so the client's next
+        reads go to the primary whichever worker serves them.
+        """
+        if not self.enabled or self.sticky_seconds <= 0:
+            return
+        response.set_cookie(
+            STICKY_COOKIE,
+            f"{time.time() + self.sticky_seconds:.3f}",
+            max_age=math.ceil(self.sticky_seconds),
+            httponly=True,
+            samesite="lax",
+        )
+
+    def is_sticky(self, caller: str, cookie: str = None) -> bool:
+        """
+        Whether the caller wrote recently and must read from the primary.
+        :param caller: caller_key of the request.
+        :param cookie: Value of the request's STICKY_COOKIE, if any.
+        """
+        try:
+            marked = cookie is not None and float(cookie) > time.time()
+        except ValueError:
+            marked = False
+        with self._lock:
+            if marked:
+                self._stats["sticky_sessions"] += 1
+                return True
+            until = self._sticky.get(caller)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._sticky[caller]
+                return False
+            self._stats["sticky_sessions"] += 1
+            return True
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "selection": self.selection,
+                "replicas": [
+                    {"name": name, "up": self._down_until[index] <= now, "sessions": self._stats["replica_sessions"][index]}
+                    for index, name in enumerate(self.names)
+                ],
+                "primary_sessions": self._stats["primary_sessions"],
+                "sticky_sessions": self._stats["sticky_sessions"],
+                "failovers": self._stats["failovers"],
+                "sticky_callers": len(self._sticky),
+            }
@@ -0,0 +1,182 @@
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from ..utils.metrics import Histogram
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+# Label used for requests that did not match a route (keeps label cardinality bounded)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestStats:
+    """
+    Database work done on behalf of one request.
+    Mutated from the event loop and from threadpool workers, which share it
+    through the copied context, so it is updated under a lock.
+    """
+    __slots__ = ("queries", "db_ms", "_lock")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self._lock = threading.Lock()
+
+    def add_query(self, elapsed_ms: float):
+        with self._lock:
+            self.queries += 1
+            self.db_ms += elapsed_ms
+
+
+# Stats of the request being served in the current context (None outside requests)
+current_request_stats: ContextVar = ContextVar("current_request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _finish_query(conn)
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; without this its
+    # start time would stay on the connection (and be popped by a later query)
+    if context.connection is not None and context.execution_context is not None:
+        _finish_query(context.connection)
+
+
+def _finish_query(conn):
+    pending = conn.info.get("query_started_at")
+    if not pending:
+        return
+    started = pending.pop()
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.add_query((time.perf_counter() - started) * 1000)
+
+
+def instrument_queries(engine):
+    """
+    Register cursor execution hooks on a sync engine (or an AsyncEngine's
+    sync_engine) that attribute query count and time to the current request.
+    Failed statements are counted too.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class RouteMetrics:
+    """
+    Per-route request counters and latency / query histograms.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._latency_ms = {}
+        self._db_ms = {}
+        self._queries = {}
+
+    def observe(self, method: str, route: str, status: int, elapsed_ms: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self._requests[key + (status,)] = self._requests.get(key + (status,), 0) + 1
+            if key not in self._latency_ms:
+                self._latency_ms[key] = Histogram(LATENCY_BUCKETS_MS)
+                self._db_ms[key] = Histogram(LATENCY_BUCKETS_MS)
+                self._queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+        self._latency_ms[key].observe(elapsed_ms)
+        self._db_ms[key].observe(stats.db_ms)
+        self._queries[key].observe(stats.queries)
+
+    def render_prometheus(self) -> str:
+        """
+        Prometheus text exposition (version 0.0.4) of every route metric.
+        """
+        with self._lock:
+            requests = dict(self._requests)
+            histograms = (
+                ("http_request_duration_seconds", "Request latency.", dict(self._latency_ms), 1000),
+                ("http_request_db_seconds", "Database time spent per request.", dict(self._db_ms), 1000),
+                ("http_request_db_queries", "Database queries executed per request.", dict(self._queries), 1),
+            )
+
+        lines = ["# HELP http_requests_total Requests served.", "# TYPE http_requests_total counter"]
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+        for name, help_text, by_route, divisor in histograms:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (method, route), histogram in sorted(by_route.items()):
+                labels = f'method="{method}",route="{route}"'
+                snapshot = histogram.snapshot()
+                for bound, count in snapshot["buckets"].items():
+                    le = bound if bound == "+Inf" else f"{float(bound) / divisor:g}"
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {snapshot['sum'] / divisor:g}")
+                lines.append(f"{name}_count{{{labels}}} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+
+route_metrics = RouteMetrics()
+
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware that times each HTTP request, tracks the database
+    work it triggers, records both per route template (e.g. /customers/{customer_id})
+    and reports them to the client in an X-Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes_by_endpoint = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                timing = f'app;dur={elapsed_ms:.1f}, db;dur={stats.db_ms:.1f};desc="{stats.queries} queries"'
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request_stats.reset(token)
+            route_metrics.observe(
+                scope["method"],
+                self._route_template(scope),
+                status,
+                (time.perf_counter() - started) * 1000,
+                stats,
+            )
+
+    def _route_template(self, scope) -> str:
+        # The router stores the matched endpoint in the scope; map it back to its path template
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._routes_by_endpoint is None:
+            self._routes_by_endpoint = {
+                getattr(route, "endpoint", None): route.path for route in scope["app"].router.routes
+            }
+        return self._routes_by_endpoint.get(endpoint, UNMATCHED_ROUTE)
@@ -0,0 +1,16 @@
+from fastapi.responses import ORJSONResponse
+
+
+def rows_response(rows) -> ORJSONResponse:
+    """
+    Render column-tuple rows (select(Model.a, Model.b, ...)) as a JSON array
+    of objects. Returning a Response skips response-model validation, which
+    dominates the cost of large lists; only use it for selects whose columns
+    are exactly the fields of the route's declared response_model.
+    :param rows: Sequence of SQLAlchemy Row objects.
+    :return: ORJSONResponse with one object per row.
+    """
+    if not rows:
+        return ORJSONResponse([])
+    keys = rows[0]._fields
+    return ORJSONResponse([dict(zip(keys, row)) for row in rows])
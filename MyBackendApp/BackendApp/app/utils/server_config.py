@@ -0,0 +1,87 @@
+import importlib.util
+import math
+import os
+from ..utils.config import (
+    DB_ASYNC,
+    DB_MAX_CONNECTIONS,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    WEB_MAX_WORKERS,
+    WEB_WORKERS,
+)
+
+# Share of a worker's connection budget kept for the sync engine when
+# DB_ASYNC is on (background audit/failed-login writers and the reconciler)
+SYNC_ENGINE_SHARE = 0.25
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may actually use: the scheduler affinity mask, further
+    limited by a cgroup v2 CPU quota when running in a container.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(cpus, 1)
+
+
+def worker_count(requested: int = WEB_WORKERS) -> int:
+    """
+    Number of worker processes: the requested count, or one per available
+    CPU (capped at WEB_MAX_WORKERS) when requested is 0.
+    :param requested: Configured worker count (0 for automatic).
+    """
+    if requested > 0:
+        return requested
+    return max(1, min(available_cpus(), WEB_MAX_WORKERS))
+
+
+def pool_limits(workers: int = None, max_connections: int = DB_MAX_CONNECTIONS, async_enabled: bool = DB_ASYNC) -> dict:
+    """
+    Per-worker (pool_size, max_overflow) for each engine.
+
+    Every worker process builds its engines when it imports models/database.py,
+    so the sizing has to be known from configuration alone. The launcher
+    exports the resolved WEB_WORKERS before spawning workers; a worker started
+    some other way (plain uvicorn, a script) resolves the same count itself.
+    Without a DB_MAX_CONNECTIONS budget the configured pool settings are used as is.
+    :param workers: Worker processes sharing the budget.
+    :param max_connections: Connections all workers may open together (0 disables).
+    :param async_enabled: Whether an async engine is created next to the sync one.
+    :return: {"sync": (pool_size, max_overflow), "async": (...)} for the engines in use.
+    """
+    engines = ("sync", "async") if async_enabled else ("sync",)
+    if max_connections <= 0:
+        return {name: (DB_POOL_SIZE, DB_MAX_OVERFLOW) for name in engines}
+
+    per_worker = max_connections // worker_count(workers or WEB_WORKERS)
+    if async_enabled:
+        sync_budget = max(1, int(per_worker * SYNC_ENGINE_SHARE))
+        budgets = {"sync": sync_budget, "async": max(1, per_worker - sync_budget)}
+    else:
+        budgets = {"sync": max(1, per_worker)}
+    # Keep DB_POOL_SIZE connections open at most; the rest of the budget is overflow
+    return {name: (min(DB_POOL_SIZE, budget), budget - min(DB_POOL_SIZE, budget)) for name, budget in budgets.items()}
+
+
+def event_loop() -> str:
+    """
+    uvloop when installed (not available on Windows), otherwise asyncio.
+    """
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    """
+    The httptools parser when installed, otherwise the pure-Python h11.
+    """
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
@@ -0,0 +1,275 @@
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from fastapi import Header, HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.database import open_session
+from ..models.keys import canonical_id, new_id
+from ..models.tables import UserSession
+from ..utils.config import (
+    AUDIT_LOG_ADMINS,
+    SESSION_TTL,
+    SESSION_REMEMBER_ME_TTL,
+    SESSION_CACHE_SIZE,
+    SESSION_CACHE_TTL,
+    SESSION_TOUCH_INTERVAL,
+)
+from ..utils.loguru_config import logger
+
+
+@dataclass
+class ActiveSession:
+    """
+    Cached view of a valid login session.
+    """
+    session_id: str
+    token_hash: str
+    user_id: str
+    remember_me: bool
+    expires_at: datetime
+    persisted_expires_at: datetime
+    cached_at: float
+
+
+def hash_token(token: str) -> str:
+    """
+    SHA-256 hex digest of a session token (the only form stored server-side).
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class SessionStore:
+    """
+    LRU/TTL cache of active sessions keyed by token hash, with write-through
+    to the user_sessions table. A hot cache validates tokens without a query.
+    """
+
+    def __init__(self, max_entries: int, cache_ttl: float):
+        """
+        :param max_entries: Maximum number of cached sessions (least recently used are evicted).
+        :param cache_ttl: Seconds a cached entry is trusted before it is re-read from the database.
+        """
+        self.max_entries = max_entries
+        self.cache_ttl = cache_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "touches": 0}
+
+    @staticmethod
+    def lifetime(remember_me: bool) -> timedelta:
+        return timedelta(seconds=SESSION_REMEMBER_ME_TTL if remember_me else SESSION_TTL)
+
+    async def create(self, db: AsyncSession, user_id: str, remember_me: bool) -> str:
+        """
+        Issue a new session token. The session row is added to db and is
+        persisted by the caller's commit.
+        :param db: Database session.
+        :param user_id: ID of the authenticated user.
+        :param remember_me: Whether the session uses the long sliding window.
+        :return: The plaintext token (returned to the client, never stored).
+        """
+        token = secrets.token_urlsafe(32)
+        expires_at = datetime.utcnow() + self.lifetime(remember_me)
+        user_session = UserSession(
+            id=new_id(),
+            user_id=user_id,
+            token_hash=hash_token(token),
+            remember_me=remember_me,
+            expires_at=expires_at,
+            revoked=False,
+        )
+        db.add(user_session)
+        self._put(user_session.token_hash, ActiveSession(
+            session_id=user_session.id,
+            token_hash=user_session.token_hash,
+            user_id=user_id,
+            remember_me=remember_me,
+            expires_at=expires_at,
+            persisted_expires_at=expires_at,
+            cached_at=time.monotonic(),
+        ))
+        return token
+
+    async def validate(self, token: str):
+        """
+        Resolve a token to its active session and slide its expiry forward.
+        A cached session needs no query. A cache miss or a write-back of the
+        expiry runs in a short session of its own, so authenticating never
+        holds a primary connection next to the request's (read) session.
+        :param token: Plaintext token from the client.
+        :return: ActiveSession, or None if the token is unknown, revoked or expired.
+        """
+        token_hash = hash_token(token)
+        active = self._get(token_hash)
+        if active is None:
+            active = await self._in_session(self._load, token_hash)
+            if active is None:
+                return None
+
+        now = datetime.utcnow()
+        if active.expires_at <= now:
+            self._drop(token_hash)
+            return None
+
+        active.expires_at = now + self.lifetime(active.remember_me)
+        if (active.expires_at - active.persisted_expires_at).total_seconds() >= SESSION_TOUCH_INTERVAL:
+            expires_at = active.expires_at
+            try:
+                await self._in_session(self._touch, active.session_id, expires_at)
+                self._touched(active, expires_at)
+            except Exception as e:
+                # Retried on the next request; the cached expiry is still valid
+                logger.warning(f"Failed to extend session expiry: {e}")
+        return active
+
+    async def revoke(self, db: AsyncSession, token_hash: str):
+        """
+        Revoke one session. The update is persisted by the caller's commit.
+        """
+        self._drop(token_hash)
+        await db.execute(update(UserSession).where(UserSession.token_hash == token_hash).values(revoked=True))
+
+    async def revoke_user(self, db: AsyncSession, user_id: str):
+        """
+        Revoke every session of a user (e.g. after a password reset).
+        The update is persisted by the caller's commit.
+        """
+        with self._lock:
+            for token_hash in [key for key, entry in self._entries.items() if entry.user_id == user_id]:
+                del self._entries[token_hash]
+        await db.execute(
+            update(UserSession)
+            .where(UserSession.user_id == user_id, UserSession.revoked.is_(False))
+            .values(revoked=True)
+        )
+
+    @staticmethod
+    async def _in_session(operation, *args):
+        db = open_session()
+        try:
+            result = await operation(db, *args)
+            await db.commit()
+            return result
+        except Exception:
+            await db.rollback()
+            raise
+        finally:
+            await db.close()
+
+    @staticmethod
+    async def _touch(db: AsyncSession, session_id: str, expires_at: datetime):
+        await db.execute(update(UserSession).where(UserSession.id == session_id).values(expires_at=expires_at))
+
+    def _touched(self, active: ActiveSession, expires_at: datetime):
+        active.persisted_expires_at = max(active.persisted_expires_at, expires_at)
+        with self._lock:
+            self._stats["touches"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_sessions"] = len(self._entries)
+        return stats
+
+    async def _load(self, db: AsyncSession, token_hash: str):
+        user_session = await db.scalar(
+            select(UserSession).where(UserSession.token_hash == token_hash, UserSession.revoked.is_(False))
+        )
+        if user_session is None:
+            return None
+        active = ActiveSession(
+            session_id=user_session.id,
+            token_hash=token_hash,
+            user_id=user_session.user_id,
+            remember_me=bool(user_session.remember_me),
+            expires_at=user_session.expires_at,
+            persisted_expires_at=user_session.expires_at,
+            cached_at=time.monotonic(),
+        )
+        self._put(token_hash, active)
+        return active
+
+    def _get(self, token_hash: str):
+        with self._lock:
+            active = self._entries.get(token_hash)
+            if active is None or time.monotonic() - active.cached_at > self.cache_ttl:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(token_hash)
+            self._stats["hits"] += 1
+            return active
+
+    def _put(self, token_hash: str, active: ActiveSession):
+        with self._lock:
+            self._entries[token_hash] = active
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _drop(self, token_hash: str):
+        with self._lock:
+            self._entries.pop(token_hash, None)
+
+
+session_store = SessionStore(max_entries=SESSION_CACHE_SIZE, cache_ttl=SESSION_CACHE_TTL)
+
+
+async def get_current_session(authorization: str = Header(None)):
+    """
+    FastAPI dependency that authenticates the request's "Authorization: Bearer <token>" header.
+    :return: ActiveSession of the caller.
+    :raises HTTPException: 401 if the token is missing, unknown, revoked or expired.
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    active = await session_store.validate(token.strip())
+    if active is None:
+        logger.warning("Rejected request with an invalid or expired session token.")
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    return active
+
+
+def ensure_same_user(active: ActiveSession, user_id: str):
+    """
+    Reject requests whose body claims a different user than the authenticated session.
+    :raises HTTPException: 403 on mismatch.
+    """
+    if user_id and user_id != active.user_id:
+        logger.warning(f"User {active.user_id} attempted to act as {user_id}.")
+        raise HTTPException(status_code=403, detail="user_id does not match the authenticated user")
+
+
+# Canonical IDs of the users listed in AUDIT_LOG_ADMINS
+audit_log_admins = {canonical_id(user_id) for user_id in AUDIT_LOG_ADMINS if user_id}
+
+
+def audit_log_scope(active: ActiveSession, user_id: str = None):
+    """
+    Limit an audit log read to what the caller may see: AUDIT_LOG_ADMINS read
+    any user's logs, everyone else only their own.
+    :param active: Authenticated session of the caller.
+    :param user_id: User whose logs were asked for (None for everyone's).
+    :return: User ID to filter the read by (None only for administrators reading everyone's).
+    :raises HTTPException: 403 if a non-administrator asks for another user's logs.
+    """
+    if active.user_id in audit_log_admins:
+        return user_id
+    ensure_same_user(active, user_id and canonical_id(user_id))
+    return active.user_id
+
+
+def ensure_audit_log_admin(active: ActiveSession):
+    """
+    Reject callers that are not listed in AUDIT_LOG_ADMINS.
+    :raises HTTPException: 403 for non-administrators.
+    """
+    if active.user_id not in audit_log_admins:
+        logger.warning(f"User {active.user_id} attempted an audit log administrator action.")
+        raise HTTPException(status_code=403, detail="Not an audit log administrator")
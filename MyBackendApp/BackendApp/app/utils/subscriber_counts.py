@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.database import open_session
+from ..models.tables import Customer, Package
+from ..utils.config import SUBSCRIBER_RECONCILE_INTERVAL
+from ..utils.loguru_config import logger
+from ..utils.package_cache import package_cache
+
+
+async def adjust_subscriber_counts(db: AsyncSession, deltas: dict):
+    """
+    Apply subscriber count changes with atomic in-database increments
+    (subscriber_count = subscriber_count + delta), so concurrent writers never
+    lose updates. Rows are updated in package ID order to keep lock
+    acquisition consistent across transactions and avoid deadlocks.
+    :param db: Database session (the caller commits).
+    :param deltas: Mapping of package ID to count change; None IDs and zero deltas are skipped.
+    """
+    for package_id in sorted(package_id for package_id, delta in deltas.items() if package_id and delta):
+        await db.execute(
+            update(Package)
+            .where(Package.id == package_id)
+            .values(subscriber_count=func.coalesce(Package.subscriber_count, 0) + deltas[package_id])
+            .execution_options(synchronize_session=False)
+        )
+
+
+def apply_cached_deltas(deltas: dict):
+    """
+    Mirror committed subscriber count changes into the package cache.
+    """
+    for package_id, delta in deltas.items():
+        package_cache.adjust_subscribers(package_id, delta)
+
+
+async def reconcile_subscriber_counts(db: AsyncSession, fix: bool = True) -> dict:
+    """
+    Recompute subscriber counts from the customers table and report drift.
+    Fixes are applied with a correlated COUNT(*) so the stored value reflects
+    the table at UPDATE time, not at the time drift was measured.
+    :param db: Database session.
+    :param fix: Whether to correct drifted counters.
+    :return: Report with the packages whose stored count differs from the actual count.
+    """
+    actual = dict((await db.execute(
+        select(Customer.package_id, func.count()).where(Customer.package_id.is_not(None)).group_by(Customer.package_id)
+    )).all())
+    packages = (await db.execute(select(Package.id, Package.package_name, Package.subscriber_count))).all()
+
+    drift = [
+        {
+            "package_id": package.id,
+            "package_name": package.package_name,
+            "stored": package.subscriber_count or 0,
+            "actual": actual.get(package.id, 0),
+            "drift": (package.subscriber_count or 0) - actual.get(package.id, 0),
+        }
+        for package in packages
+        if (package.subscriber_count or 0) != actual.get(package.id, 0)
+    ]
+
+    if fix and drift:
+        recount = (
+            select(func.count())
+            .select_from(Customer)
+            .where(Customer.package_id == Package.id)
+            .scalar_subquery()
+        )
+        for item in sorted(drift, key=lambda item: item["package_id"]):
+            await db.execute(
+                update(Package)
+                .where(Package.id == item["package_id"])
+                .values(subscriber_count=recount)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+        package_cache.invalidate()
+
+    if drift:
+        logger.warning(f"Subscriber count drift on {len(drift)} package(s) (fixed={fix}): {drift}")
+    return {
+        "checked_at": datetime.utcnow(),
+        "packages_checked": len(packages),
+        "drifted": len(drift),
+        "fixed": bool(fix and drift),
+        "drift": drift,
+    }
+
+
+class SubscriberReconciler:
+    """
+    Periodically reconciles subscriber counts in the background and keeps the last report.
+    """
+
+    def __init__(self, interval: float):
+        """
+        :param interval: Seconds between runs; 0 disables the periodic job.
+        """
+        self.interval = interval
+        self.last_report = None
+        self._task = None
+
+    async def run_once(self, fix: bool = True) -> dict:
+        db = open_session()
+        try:
+            self.last_report = await reconcile_subscriber_counts(db, fix=fix)
+        finally:
+            await db.close()
+        return self.last_report
+
+    async def start(self):
+        if self.interval and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Subscriber count reconciliation scheduled every {self.interval}s.")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Subscriber count reconciliation failed: {e}")
+
+
+subscriber_reconciler = SubscriberReconciler(interval=SUBSCRIBER_RECONCILE_INTERVAL)
@@ -0,0 +1,151 @@
+"""
+Customer search latency at scale, with a deterministic dataset generator.
+
+Generates customers with realistic names, emails, phones and addresses
+through batched Core inserts (search columns and the full-text index are
+populated exactly as in production), then times a mix of type-ahead
+queries through search_customers(). Uses a SQLite file unless DATABASE_URL
+is set; pass --customers 0 to reuse an already generated database.
+
+    python -m benchmarks.customer_search --customers 1000000 --queries 500
+    DATABASE_URL=sqlite:////tmp/search.db python -m benchmarks.customer_search --customers 0
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/search_benchmark.db")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from app.cli import init_database  # noqa: E402
+from app.models.database import engine, open_session  # noqa: E402
+from app.models.tables import Customer, Package  # noqa: E402
+from app.utils.customer_search import search_columns, search_customers  # noqa: E402
+
+FIRST_NAMES = (
+    "James Mary John Patricia Robert Jennifer Michael Linda David Elizabeth William Barbara Richard Susan "
+    "Joseph Jessica Thomas Sarah Charles Karen Daniel Lisa Matthew Nancy Anthony Betty Mark Sandra Noa "
+    "Yosef Avigail David Tamar Omer Shira José María Zoë Chloé Renée André Björn Søren Ana Luis Wei Mei"
+).split()
+LAST_NAMES = (
+    "Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez Hernandez Lopez Gonzalez "
+    "Wilson Anderson Thomas Taylor Moore Jackson Martin Lee Perez Thompson White Harris Sanchez Clark "
+    "Cohen Levi Mizrahi Peretz Biton Friedman Katz Azoulay Müller Schmidt Dubois Rossi Novak Kowalski"
+).split()
+STREETS = "Main Oak Pine Maple Cedar Elm Herzl Rothschild Baker King Queen Park Lake Hill Station".split()
+STREET_TYPES = ("Street", "Avenue", "Road", "Boulevard", "Lane")
+DOMAINS = ("example.com", "mail.test", "inbox.test", "corp.example")
+
+
+def generate_customers(count: int, seed: int, batch_size: int = 10000):
+    """
+    Insert `count` customers spread over the existing packages (skewed towards
+    the cheaper ones), with signup times over the past year, and keep
+    Package.subscriber_count consistent.
+    """
+    rng = random.Random(seed)
+    with engine.begin() as connection:
+        package_ids = list(connection.scalars(select(Package.id).order_by(Package.monthly_price)))
+    weights = [len(package_ids) - index for index in range(len(package_ids))]
+    subscribers = dict.fromkeys(package_ids, 0)
+    now = datetime.utcnow()
+
+    started = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        rows = []
+        for index in range(offset, min(offset + batch_size, count)):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            row = {
+                "id": str(uuid4()),
+                "first_name": first,
+                "last_name": last,
+                "email_address": f"{first.lower()}.{last.lower()}{index}@{rng.choice(DOMAINS)}",
+                "phone_number": f"05{rng.randint(0, 9)}-{rng.randint(1000000, 9999999)}",
+                "address": f"{rng.randint(1, 250)} {rng.choice(STREETS)} {rng.choice(STREET_TYPES)}",
+                "package_id": rng.choices(package_ids, weights)[0],
+                "created_at": now - timedelta(seconds=rng.randrange(365 * 86400)),
+            }
+            row.update(search_columns(first, last, row["email_address"], row["phone_number"]))
+            subscribers[row["package_id"]] += 1
+            rows.append(row)
+        with engine.begin() as connection:
+            connection.execute(insert(Customer), rows)
+        print(f"\r  generated {offset + len(rows):>10,} customers", end="", flush=True)
+
+    with engine.begin() as connection:
+        for package_id, added in subscribers.items():
+            connection.execute(
+                Package.__table__.update()
+                .where(Package.id == package_id)
+                .values(subscriber_count=func.coalesce(Package.subscriber_count, 0) + added)
+            )
+    print(f"\n  done in {time.perf_counter() - started:.1f}s")
+
+
+def query_mix(rng: random.Random, count: int) -> list:
+    """
+    Type-ahead style queries: name prefixes of growing length, full names,
+    email and phone prefixes, and address words.
+    """
+    queries = []
+    for _ in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        kind = rng.randrange(6)
+        if kind == 0:
+            queries.append(first[:rng.randint(2, len(first))])
+        elif kind == 1:
+            queries.append(f"{first} {last[:rng.randint(1, len(last))]}")
+        elif kind == 2:
+            queries.append(last)
+        elif kind == 3:
+            queries.append(f"{first.lower()}.{last.lower()}"[:rng.randint(4, 12)] + "@"[:rng.randint(0, 1)])
+        elif kind == 4:
+            queries.append(f"05{rng.randint(0, 9)}-{rng.randint(100, 999)}")
+        else:
+            queries.append(f"{rng.choice(STREETS)} {rng.choice(STREET_TYPES)}")
+    return queries
+
+
+async def run_queries(queries: list, limit: int) -> list:
+    db = open_session()
+    latencies = []
+    try:
+        for query in queries:
+            started = time.perf_counter()
+            await search_customers(db, query, page=1, limit=limit)
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        await db.close()
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate customers and measure search latency.")
+    parser.add_argument("--customers", type=int, default=100000, help="Customers to generate (0 reuses existing data).")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    init_database()
+    if args.customers:
+        generate_customers(args.customers, args.seed)
+    with engine.connect() as connection:
+        total = connection.scalar(select(func.count()).select_from(Customer))
+
+    queries = query_mix(random.Random(args.seed), args.queries)
+    asyncio.run(run_queries(queries[:20], args.limit))  # warm caches
+    latencies = sorted(asyncio.run(run_queries(queries, args.limit)))
+    print(f"customers: {total:,}   queries: {len(latencies)}   page size: {args.limit}")
+    print(
+        f"p50 {statistics.median(latencies):.2f} ms   "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms   "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms   "
+        f"max {latencies[-1]:.2f} ms"
+    )
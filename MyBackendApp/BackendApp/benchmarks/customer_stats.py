@@ -0,0 +1,124 @@
+"""
+Latency of /customers/stats and /packages/stats computations at scale.
+
+Generates customers (signups spread over the past year), churn and
+package-switch audit entries plus unrelated audit noise, then times the
+uncached computation (what a request pays once per STATS_CACHE_TTL) and the
+cached lookup. Uses a SQLite file unless DATABASE_URL is set; pass
+--customers 0 to reuse an already generated database.
+
+    python -m benchmarks.customer_stats --customers 1000000
+    DATABASE_URL=sqlite:////tmp/stats.db python -m benchmarks.customer_stats --customers 0
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/stats_benchmark.db")
+os.environ.setdefault("LOG_LEVEL", "warning")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from app.cli import init_database  # noqa: E402
+from app.models.database import engine, open_session  # noqa: E402
+from app.models.tables import AuditLog, Customer, Package, User  # noqa: E402
+from app.utils.customer_stats import churn_action, customer_stats, package_stats, stats_cache, switch_action  # noqa: E402
+from benchmarks.customer_search import generate_customers  # noqa: E402
+
+NOISE_ACTIONS = ("Fetched all packages", "Searched customers", "Fetched customer stats", "User login")
+
+
+def generate_audit_events(customers: int, noise: int, seed: int, batch_size: int = 20000):
+    """
+    Churn (2% of customers) and package switches (5%) over the past year,
+    plus `noise` unrelated audit rows.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        package_ids = list(connection.scalars(select(Package.id)))
+        user_id = str(uuid4())
+        connection.execute(insert(User), [{
+            "id": user_id, "full_name": "Stats Benchmark", "username": f"stats-{user_id[:8]}",
+            "email": f"stats-{user_id[:8]}@example.com", "hashed_password": "-",
+        }])
+
+    def actions():
+        for _ in range(customers // 50):
+            yield churn_action(str(uuid4()), rng.choice(package_ids))
+        for _ in range(customers // 20):
+            source, target = rng.sample(package_ids, 2)
+            yield switch_action(str(uuid4()), source, target)
+        for _ in range(noise):
+            yield rng.choice(NOISE_ACTIONS)
+
+    batch = []
+    for action in actions():
+        batch.append({
+            "id": str(uuid4()), "user_id": user_id, "action": action,
+            "timestamp": now - timedelta(seconds=rng.randrange(365 * 86400)),
+        })
+        if len(batch) == batch_size:
+            with engine.begin() as connection:
+                connection.execute(insert(AuditLog), batch)
+            batch = []
+    if batch:
+        with engine.begin() as connection:
+            connection.execute(insert(AuditLog), batch)
+
+
+async def timed(compute, runs: int, cached: bool) -> list:
+    db = open_session()
+    samples = []
+    try:
+        for _ in range(runs):
+            if not cached:
+                stats_cache.clear()
+            started = time.perf_counter()
+            await compute(db)
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        await db.close()
+    return samples
+
+
+async def main(runs: int):
+    cases = (
+        ("packages, 30 days", lambda db: package_stats(db, 30)),
+        ("packages, 365 days", lambda db: package_stats(db, 365)),
+        ("customers, 30 days by day", lambda db: customer_stats(db, 30, "day")),
+        ("customers, 365 days by week", lambda db: customer_stats(db, 365, "week")),
+        ("customers, 365 days by month", lambda db: customer_stats(db, 365, "month")),
+    )
+    await timed(cases[0][1], 1, cached=False)  # import pandas, warm caches
+    for label, compute in cases:
+        cold = sorted(await timed(compute, runs, cached=False))
+        warm = await timed(compute, runs, cached=True)
+        print(
+            f"{label:>30}: uncached p50 {statistics.median(cold):7.1f} ms  max {cold[-1]:7.1f} ms   "
+            f"cached p50 {statistics.median(warm):6.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure stats endpoint computation latency.")
+    parser.add_argument("--customers", type=int, default=1000000, help="Customers to generate (0 reuses existing data).")
+    parser.add_argument("--audit-noise", type=int, default=1000000, help="Unrelated audit rows to generate.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    init_database()
+    if args.customers:
+        generate_customers(args.customers, args.seed)
+        generate_audit_events(args.customers, args.audit_noise, args.seed)
+    with engine.connect() as connection:
+        total = connection.scalar(select(func.count()).select_from(Customer))
+        audit = connection.scalar(select(func.count()).select_from(AuditLog))
+    print(f"customers: {total:,}   audit rows: {audit:,}")
+    asyncio.run(main(args.runs))
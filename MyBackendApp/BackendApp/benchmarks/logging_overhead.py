@@ -0,0 +1,100 @@
+"""
+Request throughput under different logging configurations.
+
+Serves authenticated GET /packages/ and GET /customers/{id} requests in-process
+against a throwaway SQLite database (unless DATABASE_URL is set), with log
+output sent to /dev/null so only the logging pipeline itself is measured.
+
+    python -m benchmarks.logging_overhead --requests 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/logging_benchmark.db")
+
+import httpx  # noqa: E402
+from app.cli import init_database  # noqa: E402
+from app.main import app  # noqa: E402
+from app.utils.audit_log import audit_sink  # noqa: E402
+from app.utils.loguru_config import logger, setup_loguru  # noqa: E402
+
+USER = {
+    "full_name": "Benchmark User",
+    "username": "benchmark",
+    "email": "benchmark@example.com",
+    "phone_number": "0000000000",
+    "password": "benchmark-password",
+    "confirm_password": "benchmark-password",
+    "accept_terms": True,
+}
+
+# name -> setup_loguru arguments (None disables logging entirely)
+MODES = {
+    "off": None,
+    "console debug, sync": {"level": "debug", "log_format": "console", "enqueue": False},
+    "console info, enqueued": {"level": "info", "log_format": "console", "enqueue": True},
+    "json info, enqueued": {"level": "info", "log_format": "json", "enqueue": True},
+    "json debug 10%, enqueued": {"level": "debug", "log_format": "json", "enqueue": True, "debug_sample_rate": 0.1},
+}
+
+
+async def prepare(client: httpx.AsyncClient) -> tuple[dict, str, str]:
+    await client.post("/users/register", json=USER)
+    login = (await client.post("/users/login", json={"username_or_email": USER["username"], "password": USER["password"]})).json()
+    headers = {"Authorization": f"Bearer {login['token']}"}
+    packages = (await client.request("GET", "/packages/", json={"user_id": login["id"]}, headers=headers)).json()
+    customer = (await client.post("/customers/", headers=headers, json={
+        "user_id": login["id"],
+        "first_name": "Bench",
+        "last_name": "Mark",
+        "phone_number": "0000000000",
+        "email_address": "bench@example.com",
+        "address": "Nowhere 1",
+        "package_id": packages[0]["id"],
+    })).json()
+    return headers, login["id"], customer["id"]
+
+
+async def run(requests: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        logger.remove()
+        headers, user_id, customer_id = await prepare(client)
+        devnull = open(os.devnull, "w")
+        for name, options in MODES.items():
+            if options is None:
+                logger.remove()
+            else:
+                setup_loguru(sink=devnull, **options)
+            started = time.perf_counter()
+            for i in range(requests):
+                path = "/packages/" if i % 2 else f"/customers/{customer_id}"
+                await client.request("GET", path, json={"user_id": user_id}, headers=headers)
+            await logger.complete()
+            results[name] = round(requests / (time.perf_counter() - started), 1)
+        logger.remove()
+        devnull.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare request throughput with logging on and off.")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    init_database()
+
+    audit_sink.start()
+    try:
+        results = asyncio.run(run(args.requests))
+    finally:
+        audit_sink.stop()
+    setup_loguru(sink=sys.stdout, level="info", enqueue=False)
+    baseline = results["off"]
+    for name, throughput in results.items():
+        print(f"{name:>26}: {throughput:>8.1f} req/s ({throughput / baseline:.0%} of logging off)")
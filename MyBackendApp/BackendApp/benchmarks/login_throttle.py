@@ -0,0 +1,99 @@
+"""
+Cost of rejecting throttled login attempts.
+
+Measures the limiter check on its own, then replays a credential-stuffing
+burst against POST /users/login in-process and compares throttled requests
+(rejected with 429 before any query) with ordinary failed logins. Uses a
+throwaway SQLite database unless DATABASE_URL is set.
+
+    python -m benchmarks.login_throttle --checks 200000 --requests 500
+    python -m benchmarks.login_throttle --fake-shared --latency 0.0005
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/throttle_benchmark.db")
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from app.cli import init_database  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import database  # noqa: E402
+from app.utils.login_throttle import login_throttle  # noqa: E402
+from app.utils.rate_limit import FakeSharedStorage  # noqa: E402
+
+
+def count_queries() -> list:
+    """
+    Count statements executed on every engine; returns a one-element list used as a counter.
+    """
+    counter = [0]
+
+    def before_execute(*args):
+        counter[0] += 1
+
+    engines = [database.engine] + ([database.async_engine.sync_engine] if database.async_engine is not None else [])
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_execute)
+    return counter
+
+
+def bench_checks(checks: int) -> float:
+    username, ip_address = "stuffed-user", "203.0.113.7"
+    for _ in range(login_throttle.users.limit):
+        login_throttle.record_failure(login_throttle.reserve(username, ip_address))
+    start = time.perf_counter()
+    for _ in range(checks):
+        login_throttle.reserve(username, ip_address)
+    return (time.perf_counter() - start) / checks * 1e6
+
+
+async def bench_requests(requests: int) -> dict:
+    queries = count_queries()
+    transport = httpx.ASGITransport(app=app, client=("198.51.100.9", 4000))
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for label, username in (("failed (unthrottled)", "probe-{i}"), ("throttled", "victim")):
+            latencies, statuses = [], {}
+            before = queries[0]
+            for i in range(requests):
+                login_throttle.ips.reset("ip:198.51.100.9")
+                start = time.perf_counter()
+                response = await client.post(
+                    "/users/login", json={"username_or_email": username.format(i=i), "password": "guess"}
+                )
+                latencies.append((time.perf_counter() - start) * 1e6)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            latencies.sort()
+            results[label] = {
+                "statuses": statuses,
+                "p50_us": round(statistics.median(latencies), 1),
+                "p95_us": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+                "queries_per_request": round((queries[0] - before) / requests, 2),
+            }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cost of throttled login attempts.")
+    parser.add_argument("--checks", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--fake-shared", action="store_true", help="Use the stand-in for a shared backend.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated round trip of the shared backend (s).")
+    args = parser.parse_args()
+
+    if args.fake_shared:
+        storage = FakeSharedStorage(latency=args.latency)
+        for holder in (login_throttle, login_throttle.users, login_throttle.ips):
+            holder.storage = storage
+
+    init_database()
+
+    print(f"storage: {type(login_throttle.storage).__name__}")
+    print(f"limiter check on a throttled key: {bench_checks(args.checks):.2f} us/op")
+    for label, result in asyncio.run(bench_requests(args.requests)).items():
+        print(f"{label:>22}: {result}")
@@ -0,0 +1,81 @@
+"""
+Login throughput at the configured password hashing cost.
+
+Runs the application in-process against a throwaway SQLite database (unless
+DATABASE_URL is set) and fires concurrent POST /users/login requests.
+
+    python -m benchmarks.login_throughput --requests 200 --concurrency 16
+    PASSWORD_SCRYPT_N=32768 PASSWORD_HASH_WORKERS=8 python -m benchmarks.login_throughput
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/login_benchmark.db")
+
+import httpx  # noqa: E402
+from app.cli import init_database  # noqa: E402
+from app.main import app  # noqa: E402
+from app.utils.passwords import password_hasher  # noqa: E402
+
+USER = {
+    "full_name": "Benchmark User",
+    "username": "benchmark",
+    "email": "benchmark@example.com",
+    "phone_number": "0000000000",
+    "password": "benchmark-password",
+    "confirm_password": "benchmark-password",
+    "accept_terms": True,
+}
+
+
+async def run(requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        await client.post("/users/register", json=USER)
+        credentials = {"username_or_email": USER["username"], "password": USER["password"]}
+
+        latencies, failures = [], 0
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def login():
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/users/login", json=credentials)
+                latencies.append((time.perf_counter() - start) * 1000)
+                failures += response.status_code != 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "failures": failures,
+        "logins_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+        "max_ms": round(latencies[-1], 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure login throughput at the configured scrypt cost.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    init_database()
+
+    print(
+        f"scrypt N={password_hasher.n} r={password_hasher.r} p={password_hasher.p}, "
+        f"{password_hasher.workers} hasher workers"
+    )
+    for key, value in asyncio.run(run(args.requests, args.concurrency)).items():
+        print(f"{key:>18}: {value}")
@@ -0,0 +1,147 @@
+"""
+Per-endpoint query and transaction budget check.
+
+Runs the application in-process against a throwaway SQLite database (unless
+DATABASE_URL is set), calls each endpoint once and compares the number of
+SQL statements (from X-Server-Timing) and commits it caused with its budget.
+Audit rows are written in the request's transaction so they are counted.
+Exits with status 1 when an endpoint goes over budget.
+The application is only imported by main(), so tests/test_query_counts.py
+reuses BUDGETS and run() against a server of its own.
+
+    python -m benchmarks.query_counts
+"""
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import httpx
+
+USER = {
+    "full_name": "Query Count",
+    "username": "querycount",
+    "email": "querycount@example.com",
+    "phone_number": "0000000000",
+    "password": "query-count-password",
+    "confirm_password": "query-count-password",
+    "accept_terms": True,
+}
+
+# (queries, commits) allowed per endpoint. Writes commit exactly once, with
+# their audit row in the same transaction; nothing is re-read after a write.
+BUDGETS = {
+    "POST /users/register": (3, 1),          # duplicate check, insert user, insert audit
+    "POST /users/login": (4, 1),             # user lookup, insert session, update user, audit
+    "POST /packages/": (2, 1),               # insert package, insert audit
+    "PUT /packages/{id}": (3, 1),            # select, update, audit
+    "POST /customers/": (3, 1),              # count increment, insert customer, audit
+    "GET /customers/{id}": (2, 1),           # select, audit
+    "PUT /customers/{id}": (5, 1),           # select for update, guarded update customer, 2 count updates, audit
+    "DELETE /customers/{id}": (4, 1),        # select for update, delete, count decrement, audit
+    "DELETE /packages/{id}": (4, 1),         # select, load customers to detach, delete, audit
+    "POST /users/logout": (2, 1),            # revoke session, audit
+}
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+commits = 0
+
+
+def _count_commit(connection):
+    global commits
+    commits += 1
+
+
+async def measure(client, label: str, method: str, url: str, **kwargs):
+    before = commits
+    response = await client.request(method, url, **kwargs)
+    response.raise_for_status()
+    queries = int(_QUERIES.search(response.headers["x-server-timing"]).group(1))
+    return label, queries, commits - before, response.json()
+
+
+async def run(**client_options) -> list:
+    """
+    Call each budgeted endpoint once.
+    :param client_options: httpx.AsyncClient arguments reaching the application.
+    :return: (label, queries, commits, response body) per endpoint; commits are
+        only counted for an application running in this process (see main).
+    """
+    results = []
+    async with httpx.AsyncClient(**client_options) as client:
+        results.append(await measure(client, "POST /users/register", "POST", "/users/register", json=USER))
+        login = await measure(client, "POST /users/login", "POST", "/users/login", json={
+            "username_or_email": USER["username"], "password": USER["password"],
+        })
+        results.append(login)
+        user_id, token = login[3]["id"], login[3]["token"]
+        auth = {"Authorization": f"Bearer {token}"}
+        # Warm the session and package caches so only the endpoint's own work is counted
+        await client.request("GET", "/packages/", json={"user_id": user_id}, headers=auth)
+
+        package = await measure(client, "POST /packages/", "POST", "/packages/", headers=auth, json={
+            "user_id": user_id, "package_name": "Query Count", "description": "-", "monthly_price": 10,
+        })
+        results.append(package)
+        package_id = package[3]["id"]
+        results.append(await measure(
+            client, "PUT /packages/{id}", "PUT", f"/packages/{package_id}", headers=auth,
+            json={"user_id": user_id, "description": "--", "monthly_price": 12},
+        ))
+        other_package_id = (await client.request(
+            "GET", "/packages/", json={"user_id": user_id}, headers=auth
+        )).json()[0]["id"]
+
+        customer = await measure(client, "POST /customers/", "POST", "/customers/", headers=auth, json={
+            "user_id": user_id, "first_name": "Query", "last_name": "Count", "phone_number": "050-0000000",
+            "email_address": "customer@example.com", "address": "1 Main Street", "package_id": package_id,
+        })
+        results.append(customer)
+        customer_id = customer[3]["id"]
+        results.append(await measure(
+            client, "GET /customers/{id}", "GET", f"/customers/{customer_id}", headers=auth,
+            json={"user_id": user_id},
+        ))
+        results.append(await measure(
+            client, "PUT /customers/{id}", "PUT", f"/customers/{customer_id}", headers=auth,
+            json={"user_id": user_id, "first_name": "Changed", "package_id": other_package_id},
+        ))
+        results.append(await measure(
+            client, "DELETE /customers/{id}", "DELETE", f"/customers/{customer_id}", headers=auth,
+            json={"user_id": user_id},
+        ))
+        results.append(await measure(
+            client, "DELETE /packages/{id}", "DELETE", f"/packages/{package_id}", headers=auth,
+            json={"user_id": user_id},
+        ))
+        results.append(await measure(client, "POST /users/logout", "POST", "/users/logout", headers=auth))
+    return results
+
+
+def main() -> int:
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/query_counts.db")
+    os.environ.setdefault("LOG_LEVEL", "warning")
+    os.environ["AUDIT_LOG_MODE"] = "transaction"
+    from sqlalchemy import event
+    from app.cli import init_database
+    from app.main import app
+    from app.models.database import async_engine, engine
+
+    init_database()
+    for bind in (engine, async_engine.sync_engine if async_engine is not None else None):
+        if bind is not None:
+            event.listen(bind, "commit", _count_commit)
+
+    failures = 0
+    transport = httpx.ASGITransport(app=app)
+    for label, queries, committed, _ in asyncio.run(run(transport=transport, base_url="http://query-counts")):
+        max_queries, max_commits = BUDGETS[label]
+        ok = queries <= max_queries and committed <= max_commits
+        failures += not ok
+        print(f"{'ok  ' if ok else 'OVER'} {label:>24}: {queries} queries (budget {max_queries}), "
+              f"{committed} commits (budget {max_commits})")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
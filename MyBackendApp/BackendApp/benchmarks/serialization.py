@@ -0,0 +1,127 @@
+"""
+Serialization cost of a 10k-row list response.
+
+Loads the same customers as full ORM entities and as plain column tuples,
+then times the work FastAPI does after the handler returns: the old path
+(no response model, jsonable_encoder + JSONResponse) against response
+models rendered by JSONResponse and ORJSONResponse, and rows_response(),
+which GET /customers/ uses to skip validation. Query time is reported
+separately. Uses a throwaway SQLite database unless DATABASE_URL is set.
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from uuid import uuid4
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/serialization_benchmark.db")
+os.environ.setdefault("LOG_LEVEL", "warning")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+from app.cli import init_database  # noqa: E402
+from app.models.database import engine, open_session  # noqa: E402
+from app.models.schemas import CustomerResponse  # noqa: E402
+from app.models.tables import Customer  # noqa: E402
+from app.routes.customers import CUSTOMER_COLUMNS  # noqa: E402
+from app.utils.customer_search import search_columns  # noqa: E402
+from app.utils.responses import rows_response  # noqa: E402
+
+RESPONSE_FIELD = create_model_field(name="Response", type_=list[CustomerResponse], mode="serialization")
+
+
+def generate(rows: int):
+    """
+    Top the customers table up to `rows` rows (existing rows are kept).
+    """
+    with engine.begin() as connection:
+        existing = connection.scalar(select(func.count()).select_from(Customer))
+        batch = []
+        for index in range(existing, rows):
+            row = {
+                "id": str(uuid4()),
+                "first_name": f"First{index}",
+                "last_name": f"Last{index}",
+                "phone_number": f"050-{index:07d}",
+                "email_address": f"customer{index}@example.com",
+                "address": f"{index} Main Street",
+                "package_id": None,
+            }
+            row.update(search_columns(row["first_name"], row["last_name"], row["email_address"], row["phone_number"]))
+            batch.append(row)
+        if batch:
+            connection.execute(insert(Customer), batch)
+
+
+async def load(statement, scalars: bool):
+    db = open_session()
+    try:
+        started = time.perf_counter()
+        result = await db.execute(statement)
+        rows = result.scalars().all() if scalars else result.all()
+        return rows, time.perf_counter() - started
+    finally:
+        await db.close()
+
+
+async def legacy(content) -> bytes:
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+async def model_json(content) -> bytes:
+    return JSONResponse(await serialize_response(field=RESPONSE_FIELD, response_content=content)).body
+
+
+async def model_orjson(content) -> bytes:
+    return ORJSONResponse(await serialize_response(field=RESPONSE_FIELD, response_content=content)).body
+
+
+async def plain_rows(content) -> bytes:
+    return rows_response(content).body
+
+
+async def measure(render, content, repeat: int) -> tuple:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = await render(content)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), len(body)
+
+
+async def main(rows: int, repeat: int):
+    entities, entity_query = await load(select(Customer).limit(rows), scalars=True)
+    tuples, tuple_query = await load(select(*CUSTOMER_COLUMNS).limit(rows), scalars=False)
+    print(f"rows: {len(entities):,}")
+    print(f"{'query: ORM entities':>40}: {entity_query * 1000:8.1f} ms")
+    print(f"{'query: column tuples':>40}: {tuple_query * 1000:8.1f} ms")
+
+    cases = (
+        ("entities + jsonable_encoder (before)", legacy, entities),
+        ("entities + response model + json", model_json, entities),
+        ("entities + response model + orjson", model_orjson, entities),
+        ("tuples + response model + json", model_json, tuples),
+        ("tuples + response model + orjson", model_orjson, tuples),
+        ("tuples + rows_response (GET /customers/)", plain_rows, tuples),
+    )
+    for label, render, content in cases:
+        seconds, size = await measure(render, content, repeat)
+        print(f"{label:>40}: {seconds * 1000:8.1f} ms   {size / 1024:8.0f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare response serialization paths for a large list.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    init_database()
+    generate(args.rows)
+    asyncio.run(main(args.rows, args.repeat))
@@ -0,0 +1,89 @@
+"""
+Application startup cost: import time and time-to-first-request.
+
+Each measurement runs in a fresh interpreter against a throwaway SQLite
+database (unless DATABASE_URL is set). The one-shot `app.cli init` step is
+timed separately; it used to run inside every worker on every boot.
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def timed_init(env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "app.cli", "init"], cwd=APP_ROOT, env=env, check=True, capture_output=True)
+    return time.perf_counter() - started
+
+
+def import_time(env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=APP_ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_to_first_request(env: dict, timeout: float = 30.0) -> float:
+    """
+    Seconds from spawning uvicorn until the first request that reads the database
+    is answered: an unknown session token, rejected after looking it up.
+    """
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/audit-logs/?limit=1"
+    probe = {"Authorization": "Bearer startup-probe"}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(url, headers=probe).status_code == 401:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+        raise RuntimeError(f"Server did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summary(samples: list) -> str:
+    return f"median {statistics.median(samples) * 1000:8.1f} ms   min {min(samples) * 1000:8.1f} ms"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-request.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/startup_benchmark.db")
+    env.setdefault("LOG_LEVEL", "warning")
+
+    print(f"{'app.cli init (once per deploy)':>32}: {timed_init(env) * 1000:8.1f} ms")
+    print(f"{'import app.main':>32}: {summary([import_time(env) for _ in range(args.runs)])}")
+    print(f"{'time to first request':>32}: {summary([time_to_first_request(env) for _ in range(args.runs)])}")
@@ -0,0 +1,73 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+from app.models.keys import UUIDKey
+from app.models.tables import Base
+from app.utils.config import DATABASE_URL
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Dialect-specific search objects created by hand in migrations (not in the models)
+UNMANAGED_PREFIXES = ("customers_fts", "ft_")
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # MySQL cannot keep foreign keys on the partitioned audit_logs table (0005)
+    if type_ == "foreign_key_constraint" and obj.table.name == "audit_logs":
+        return False
+    return not (name or "").startswith(UNMANAGED_PREFIXES)
+
+
+def compare_type(context, inspected_column, metadata_column, inspected_type, metadata_type):
+    # SQLite column types are only affinities: 0008 converts the keys in place
+    # and leaves their columns declared VARCHAR(36), and a BINARY(16) created
+    # from the models reflects as NUMERIC
+    if isinstance(metadata_type, UUIDKey) and context.dialect.name == "sqlite":
+        return False
+    return None
+
+
+def database_url() -> str:
+    # An explicit URL (e.g. from the init command or `alembic -x`) wins over the environment
+    return config.get_main_option("sqlalchemy.url") or DATABASE_URL
+
+
+def run_migrations_offline():
+    """
+    Emit the migration SQL to stdout instead of running it (alembic upgrade --sql).
+    """
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = create_engine(database_url(), poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            compare_type=compare_type,
+            # SQLite cannot ALTER most constraints in place
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,90 @@
+"""Initial schema (tables previously created by Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("full_name", sa.String(255), nullable=False),
+        sa.Column("username", sa.String(255), nullable=False, unique=True),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("phone_number", sa.String(20), nullable=True),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_logged_in", sa.Boolean(), nullable=True),
+        sa.Column("current_token", sa.String(255), nullable=True),
+        sa.Column("last_login", sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        "packages",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("package_name", sa.String(50), nullable=False, unique=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("monthly_price", sa.Integer(), nullable=False),
+        sa.Column("subscriber_count", sa.Integer(), nullable=True),
+    )
+    op.create_table(
+        "customers",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("first_name", sa.String(255), nullable=False),
+        sa.Column("last_name", sa.String(255), nullable=False),
+        sa.Column("phone_number", sa.String(20), nullable=True),
+        sa.Column("email_address", sa.String(255), nullable=False),
+        sa.Column("address", sa.String(255), nullable=True),
+        sa.Column("package_id", sa.String(36), sa.ForeignKey("packages.id"), nullable=True),
+    )
+    op.create_table(
+        "audit_logs",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("action", sa.Text(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        "failed_login_attempts",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("username", sa.String(255), nullable=False),
+        sa.Column("ip_address", sa.String(50), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        "contact_submissions",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("submitted_at", sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        "password_resets",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("reset_token", sa.String(255), nullable=False, unique=True),
+        sa.Column("token_expiry", sa.DateTime(), nullable=False),
+        sa.Column("used", sa.Boolean(), nullable=True),
+    )
+
+
+def downgrade():
+    for table in (
+        "password_resets",
+        "contact_submissions",
+        "failed_login_attempts",
+        "audit_logs",
+        "customers",
+        "packages",
+        "users",
+    ):
+        op.drop_table(table)
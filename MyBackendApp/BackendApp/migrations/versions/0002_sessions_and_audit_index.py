@@ -0,0 +1,43 @@
+"""Login sessions table and per-user audit log index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+Databases bootstrapped by create_all before migrations existed may already
+have these objects, so each one is only created when missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    audit_indexes = {index["name"] for index in inspector.get_indexes("audit_logs")}
+    if "ix_audit_logs_user_id_timestamp" not in audit_indexes:
+        op.create_index("ix_audit_logs_user_id_timestamp", "audit_logs", ["user_id", "timestamp"])
+
+    if not inspector.has_table("user_sessions"):
+        op.create_table(
+            "user_sessions",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("token_hash", sa.String(64), nullable=False, unique=True),
+            sa.Column("remember_me", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("revoked", sa.Boolean(), nullable=True),
+        )
+        op.create_index("ix_user_sessions_user_id", "user_sessions", ["user_id"])
+
+
+def downgrade():
+    op.drop_index("ix_user_sessions_user_id", table_name="user_sessions")
+    op.drop_table("user_sessions")
+    op.drop_index("ix_audit_logs_user_id_timestamp", table_name="audit_logs")
@@ -0,0 +1,118 @@
+"""Customer search: normalized prefix columns and a full-text index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+MySQL gets a FULLTEXT index; SQLite gets an external-content FTS5 table kept
+in sync by triggers. Neither is declared on the models (see env.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.utils.customer_search import search_columns
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 5000
+FULLTEXT_COLUMNS = ["first_name", "last_name", "email_address", "address"]
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE customers_fts USING fts5("
+    "first_name, last_name, email_address, address, "
+    "content='customers', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER customers_fts_insert AFTER INSERT ON customers BEGIN "
+    "INSERT INTO customers_fts(rowid, first_name, last_name, email_address, address) "
+    "VALUES (new.rowid, new.first_name, new.last_name, new.email_address, new.address); END",
+    "CREATE TRIGGER customers_fts_delete AFTER DELETE ON customers BEGIN "
+    "INSERT INTO customers_fts(customers_fts, rowid, first_name, last_name, email_address, address) "
+    "VALUES ('delete', old.rowid, old.first_name, old.last_name, old.email_address, old.address); END",
+    "CREATE TRIGGER customers_fts_update AFTER UPDATE ON customers BEGIN "
+    "INSERT INTO customers_fts(customers_fts, rowid, first_name, last_name, email_address, address) "
+    "VALUES ('delete', old.rowid, old.first_name, old.last_name, old.email_address, old.address); "
+    "INSERT INTO customers_fts(rowid, first_name, last_name, email_address, address) "
+    "VALUES (new.rowid, new.first_name, new.last_name, new.email_address, new.address); END",
+    "INSERT INTO customers_fts(customers_fts) VALUES ('rebuild')",
+]
+
+
+def backfill(bind):
+    customers = sa.table(
+        "customers",
+        sa.column("id"),
+        sa.column("first_name"),
+        sa.column("last_name"),
+        sa.column("email_address"),
+        sa.column("phone_number"),
+        sa.column("search_name"),
+        sa.column("search_name_reversed"),
+        sa.column("search_email"),
+        sa.column("search_phone"),
+    )
+    last_id = ""
+    while True:
+        rows = bind.execute(
+            sa.select(
+                customers.c.id,
+                customers.c.first_name,
+                customers.c.last_name,
+                customers.c.email_address,
+                customers.c.phone_number,
+            )
+            .where(customers.c.id > last_id)
+            .order_by(customers.c.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            return
+        bind.execute(
+            customers.update().where(customers.c.id == sa.bindparam("customer_id")),
+            [
+                {"customer_id": row.id, **search_columns(row.first_name, row.last_name, row.email_address, row.phone_number)}
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    op.add_column("customers", sa.Column("search_name", sa.String(255), nullable=True))
+    op.add_column("customers", sa.Column("search_name_reversed", sa.String(255), nullable=True))
+    op.add_column("customers", sa.Column("search_email", sa.String(255), nullable=True))
+    op.add_column("customers", sa.Column("search_phone", sa.String(20), nullable=True))
+
+    bind = op.get_bind()
+    backfill(bind)
+
+    op.create_index("ix_customers_search_name", "customers", ["search_name"])
+    op.create_index("ix_customers_search_name_reversed", "customers", ["search_name_reversed"])
+    op.create_index("ix_customers_search_email", "customers", ["search_email"])
+    op.create_index("ix_customers_search_phone", "customers", ["search_phone"])
+
+    if bind.dialect.name == "mysql":
+        op.create_index("ft_customers_search", "customers", FULLTEXT_COLUMNS, mysql_prefix="FULLTEXT")
+    elif bind.dialect.name == "sqlite":
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "mysql":
+        op.drop_index("ft_customers_search", table_name="customers")
+    elif bind.dialect.name == "sqlite":
+        for trigger in ("customers_fts_insert", "customers_fts_delete", "customers_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS customers_fts")
+
+    op.drop_index("ix_customers_search_phone", table_name="customers")
+    op.drop_index("ix_customers_search_email", table_name="customers")
+    op.drop_index("ix_customers_search_name_reversed", table_name="customers")
+    op.drop_index("ix_customers_search_name", table_name="customers")
+    with op.batch_alter_table("customers") as batch:
+        batch.drop_column("search_phone")
+        batch.drop_column("search_email")
+        batch.drop_column("search_name_reversed")
+        batch.drop_column("search_name")
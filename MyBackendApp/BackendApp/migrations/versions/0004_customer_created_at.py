@@ -0,0 +1,42 @@
+"""Customer signup time and an audit log action index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+created_at is backfilled from the "Created customer <id>" audit entries;
+customers without one (e.g. bulk imports) keep a null signup time.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_audit_logs_action_timestamp", "audit_logs", ["action", "timestamp"], mysql_length={"action": 64}
+    )
+    op.add_column("customers", sa.Column("created_at", sa.DateTime(), nullable=True))
+
+    customers = sa.table("customers", sa.column("id", sa.String), sa.column("created_at", sa.DateTime))
+    audit_logs = sa.table("audit_logs", sa.column("action", sa.Text), sa.column("timestamp", sa.DateTime))
+    created = (
+        sa.select(sa.func.min(audit_logs.c.timestamp))
+        .where(audit_logs.c.action == sa.literal("Created customer ", sa.Text) + customers.c.id)
+        .scalar_subquery()
+    )
+    op.execute(customers.update().values(created_at=created))
+
+    op.create_index("ix_customers_created_at", "customers", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_customers_created_at", table_name="customers")
+    # A plain DROP COLUMN (SQLite 3.35+): recreating the table in batch mode
+    # would drop the full-text triggers from 0003
+    op.drop_column("customers", "created_at")
+    op.drop_index("ix_audit_logs_action_timestamp", table_name="audit_logs")
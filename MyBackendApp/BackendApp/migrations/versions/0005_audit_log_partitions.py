@@ -0,0 +1,56 @@
+"""Monthly partitions and a time index for audit logs
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+audit_logs.timestamp becomes NOT NULL and gets a (timestamp, id) index on
+every backend. On MySQL the table is then RANGE COLUMNS partitioned by
+month, which requires the partitioning column in the primary key and no
+foreign keys; SQLite keeps a single table (see app/utils/audit_retention.py).
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+from app.utils.audit_retention import add_months, month_start, partition_definitions
+from app.utils.config import AUDIT_PARTITIONS_AHEAD
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    audit_logs = sa.table("audit_logs", sa.column("timestamp", sa.DateTime))
+    now = datetime.utcnow()
+
+    op.execute(audit_logs.update().where(audit_logs.c.timestamp.is_(None)).values(timestamp=now))
+    with op.batch_alter_table("audit_logs") as batch:
+        batch.alter_column("timestamp", existing_type=sa.DateTime(), nullable=False)
+    op.create_index("ix_audit_logs_timestamp_id", "audit_logs", ["timestamp", "id"])
+
+    if bind.dialect.name != "mysql":
+        return
+
+    for foreign_key in sa.inspect(bind).get_foreign_keys("audit_logs"):
+        op.drop_constraint(foreign_key["name"], "audit_logs", type_="foreignkey")
+    op.execute("ALTER TABLE audit_logs DROP PRIMARY KEY, ADD PRIMARY KEY (id, `timestamp`)")
+
+    oldest = bind.scalar(sa.select(sa.func.min(audit_logs.c.timestamp)))
+    definitions = partition_definitions(
+        month_start(oldest or now), add_months(month_start(now), AUDIT_PARTITIONS_AHEAD)
+    )
+    op.execute(f"ALTER TABLE audit_logs PARTITION BY RANGE COLUMNS(`timestamp`) ({', '.join(definitions)})")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "mysql":
+        op.execute("ALTER TABLE audit_logs REMOVE PARTITIONING")
+        op.execute("ALTER TABLE audit_logs DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+        op.create_foreign_key(None, "audit_logs", "users", ["user_id"], ["id"])
+
+    op.drop_index("ix_audit_logs_timestamp_id", table_name="audit_logs")
+    with op.batch_alter_table("audit_logs") as batch:
+        batch.alter_column("timestamp", existing_type=sa.DateTime(), nullable=True)
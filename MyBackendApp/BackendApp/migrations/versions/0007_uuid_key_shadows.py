@@ -0,0 +1,34 @@
+"""Binary shadow columns for the UUID keys
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+First, online half of the switch to BINARY(16) keys (see
+app/utils/key_migration.py): on MySQL every key column gets a BINARY(16)
+shadow column kept in step by triggers, and existing rows are backfilled in
+committed batches. It is safe to run ahead of the deploy, while the previous
+release serves traffic; 0008 is the cutover. Nothing to do on SQLite.
+"""
+from alembic import op
+from app.utils.key_migration import add_shadows, backfill, drop_shadows
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "mysql":
+        return
+    add_shadows(bind, "BINARY(16)", "UUID_TO_BIN")
+    with op.get_context().autocommit_block():
+        backfill(bind, "UUID_TO_BIN")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "mysql":
+        drop_shadows(bind)
@@ -0,0 +1,44 @@
+"""UUID keys stored as BINARY(16)
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+
+Cutover of the switch to BINARY(16) keys, applied with the release that
+reads them (app/models/keys.py). On MySQL each table is rebuilt once with
+its shadow column in place of the CHAR(36) one; foreign keys are dropped
+first and re-created without re-checking the converted rows. Writes made
+after the triggers are dropped are not carried over, so it runs once the
+previous release has stopped writing. SQLite keeps
+its declared column types and converts the stored values in place. Existing
+keys keep their (uuid4) values; new rows get UUIDv7 keys.
+"""
+from alembic import op
+from app.utils.key_migration import add_shadows, backfill, catch_up, convert_in_place, drop_triggers, swap
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        convert_in_place(bind, to_binary=True)
+    elif bind.dialect.name == "mysql":
+        drop_triggers(bind)
+        catch_up(bind, "UUID_TO_BIN")
+        swap(bind, "BINARY(16)")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        convert_in_place(bind, to_binary=False)
+    elif bind.dialect.name == "mysql":
+        # Back to CHAR(36) the same way, without the shadow columns of 0007
+        add_shadows(bind, "CHAR(36)", "BIN_TO_UUID")
+        backfill(bind, "BIN_TO_UUID")
+        drop_triggers(bind)
+        swap(bind, "CHAR(36)")
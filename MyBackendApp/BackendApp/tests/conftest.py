@@ -0,0 +1,107 @@
+"""
+The application reads its settings from the environment when it is
+imported, so every test server runs in its own process, against a fresh
+SQLite file.
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+from uuid import UUID
+import httpx
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "test-suite-password"
+
+# Tests that import application modules directly, without a server, get a
+# throwaway in-memory database instead of the one configured in .env
+os.environ["DATABASE_URL"] = "sqlite://"
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class Server:
+    def __init__(self, database_url: str, db_async: bool, **settings):
+        self.database_url = database_url
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.env = {
+            **os.environ,
+            "DATABASE_URL": database_url,
+            "DB_ASYNC": str(db_async).lower(),
+            "LOG_LEVEL": "warning",
+            # Audit rows in the request transaction, so query counts are deterministic
+            "AUDIT_LOG_MODE": "transaction",
+            "SUBSCRIBER_RECONCILE_INTERVAL": "0",
+            **settings,
+        }
+        self.process = None
+
+    def start(self):
+        subprocess.run([sys.executable, "-m", "app.cli", "init"], cwd=ROOT, env=self.env, check=True,
+                       capture_output=True)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(self.port), "--log-level", "warning"],
+            cwd=ROOT, env=self.env,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                httpx.get(f"{self.base_url}/metrics/db-pool", timeout=1)
+                return self
+            except httpx.TransportError:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError("test server did not start")
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=30)
+            self.process = None
+
+
+@pytest.fixture
+def start_server(tmp_path):
+    """
+    Start an application server: start_server(db_async=True, database=None, **settings).
+    Servers given the database_path of another one share its database, like
+    the workers of one deployment.
+    """
+    servers = []
+
+    def start(db_async: bool = True, database: str = None, **settings) -> Server:
+        path = database or tmp_path / f"test-{len(servers)}.db"
+        servers.append(Server(f"sqlite:///{path}", db_async, **settings).start())
+        servers[-1].database_path = str(path)
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def login(client: httpx.Client, username: str) -> tuple[str, dict]:
+    """
+    Register and log in a user.
+    :return: (user ID, authorization headers)
+    """
+    client.post("/users/register", json={
+        "full_name": username, "username": username, "email": f"{username}@example.com",
+        "phone_number": "0000000000", "password": PASSWORD, "confirm_password": PASSWORD, "accept_terms": True,
+    }).raise_for_status()
+    response = client.post("/users/login", json={"username_or_email": username, "password": PASSWORD})
+    response.raise_for_status()
+    body = response.json()
+    return body["id"], {"Authorization": f"Bearer {body['token']}"}
+
+
+def key(value: str) -> bytes:
+    # Keys are stored as BINARY(16)
+    return UUID(value).bytes
@@ -0,0 +1,21 @@
+"""
+"flush" mode audit writes (see app/utils/audit_log.py) wait for the
+background writer for at most AUDIT_FLUSH_TIMEOUT seconds.
+"""
+import asyncio
+import time
+from app.models.tables import AuditLog
+from app.utils import audit_log
+from app.utils.batch_writer import BatchWriter
+
+
+def test_flush_wait_gives_up_when_the_writer_is_stuck(monkeypatch):
+    # Never started, so nothing ever writes the queued row
+    stuck = BatchWriter(AuditLog, name="stuck", max_queue_size=10, batch_size=10, flush_interval=0.1)
+    monkeypatch.setattr(audit_log, "audit_sink", stuck)
+    monkeypatch.setattr(audit_log, "AUDIT_FLUSH_TIMEOUT", 0.2)
+
+    started = time.monotonic()
+    asyncio.run(audit_log._submit({"action": "Stuck"}, wait=True))
+    assert time.monotonic() - started < 5
+    assert stuck.metrics()["queue_depth"] == 1
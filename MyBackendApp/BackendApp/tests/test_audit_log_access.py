@@ -0,0 +1,52 @@
+"""
+Audit logs and user details are only readable and writable by their owner:
+other users get 403, anonymous callers 401, and only AUDIT_LOG_ADMINS read
+everyone's audit logs and the archive listing.
+"""
+import httpx
+from .conftest import PASSWORD, login
+
+
+def test_users_only_reach_their_own_audit_logs_and_details(start_server):
+    server = start_server()
+    with httpx.Client(base_url=server.base_url, timeout=60) as client:
+        owner_id, owner = login(client, "log-owner")
+        other_id, other = login(client, "log-other")
+        log_id = client.get(f"/audit-logs/user/{owner_id}", headers=owner).json()["items"][0]["id"]
+
+        for url in ("/audit-logs/", f"/audit-logs/{log_id}", "/audit-logs/export", "/audit-logs/archives"):
+            assert client.get(url).status_code == 401
+        assert client.get(f"/audit-logs/{log_id}", headers=other).status_code == 403
+        assert client.get(f"/audit-logs/user/{owner_id}", headers=other).status_code == 403
+        assert client.get("/audit-logs/", params={"user_id": owner_id}, headers=other).status_code == 403
+        assert client.get("/audit-logs/archives", headers=owner).status_code == 403
+
+        # Without a user filter, a page and an export only hold the caller's own logs
+        page = client.get("/audit-logs/", headers=other).json()["items"]
+        assert page and {log["user_id"] for log in page} == {other_id}
+        exported = client.get("/audit-logs/export", headers=other).text.splitlines()
+        assert exported and all(other_id in line for line in exported)
+
+        details = {"full_name": "Not The Owner"}
+        assert client.put(f"/users/users/{owner_id}", json=details).status_code == 401
+        assert client.put(f"/users/users/{owner_id}", json=details, headers=other).status_code == 403
+        assert client.put(f"/users/users/{owner_id.upper()}", json=details, headers=owner).status_code == 200
+
+
+def test_audit_log_admins_read_every_users_logs(start_server):
+    server = start_server()
+    with httpx.Client(base_url=server.base_url, timeout=60) as client:
+        admin_id, _ = login(client, "log-admin")
+        owner_id, owner = login(client, "log-owned")
+        log_id = client.get(f"/audit-logs/user/{owner_id}", headers=owner).json()["items"][0]["id"]
+
+    admin_server = start_server(database=server.database_path, AUDIT_LOG_ADMINS=admin_id)
+    with httpx.Client(base_url=admin_server.base_url, timeout=60) as client:
+        response = client.post("/users/login", json={"username_or_email": "log-admin", "password": PASSWORD})
+        admin = {"Authorization": f"Bearer {response.json()['token']}"}
+
+        assert client.get(f"/audit-logs/{log_id}", headers=admin).status_code == 200
+        assert client.get(f"/audit-logs/user/{owner_id}", headers=admin).json()["items"]
+        users = {log["user_id"] for log in client.get("/audit-logs/", headers=admin).json()["items"]}
+        assert {admin_id, owner_id} <= users
+        assert client.get("/audit-logs/archives", headers=admin).status_code == 200
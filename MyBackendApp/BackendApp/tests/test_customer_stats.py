@@ -0,0 +1,37 @@
+"""
+Churn and package switches are counted from the audit log (see
+app/utils/customer_stats.py), whatever form of the IDs the request used.
+"""
+from uuid import UUID
+import httpx
+from .conftest import login
+
+
+def test_non_canonical_ids_are_counted(start_server):
+    server = start_server()
+    with httpx.Client(base_url=server.base_url, timeout=60) as client:
+        user_id, auth = login(client, "stats")
+        body = {"user_id": user_id}
+        first, second = [package["id"] for package in client.request("GET", "/packages/", json=body, headers=auth).json()[:2]]
+        customers = [
+            client.post("/customers/", headers=auth, json={
+                **body, "first_name": "Stats", "last_name": f"Check{index}", "phone_number": f"050-000000{index}",
+                "email_address": f"stats{index}@example.com", "address": "1 Main Street", "package_id": first,
+            }).json()["id"]
+            for index in range(2)
+        ]
+
+        # Upper case without dashes, and braces: the same rows and packages
+        switched = client.put(f"/customers/{UUID(customers[0]).hex.upper()}", headers=auth,
+                              json={**body, "package_id": "{" + second.upper() + "}"})
+        assert switched.status_code == 200 and switched.json()["package_id"] == second
+        unchanged = client.put(f"/customers/{customers[0]}", headers=auth, json={**body, "package_id": second.upper()})
+        assert unchanged.status_code == 200
+        deleted = client.request("DELETE", f"/customers/{customers[1].upper()}", json=body, headers=auth)
+        assert deleted.status_code == 200
+
+        stats = {item["package_id"]: item for item in client.get("/packages/stats", headers=auth).json()["packages"]}
+        assert (stats[first]["subscribers"], stats[first]["churned"], stats[first]["switched_out"]) == (0, 1, 1)
+        assert (stats[second]["subscribers"], stats[second]["switched_in"]) == (1, 1)
+        customer_stats = client.get("/customers/stats", headers=auth).json()
+        assert (customer_stats["churned"], customer_stats["package_switches"]) == (1, 1)
@@ -0,0 +1,146 @@
+"""
+The async database layer (DB_ASYNC=true, aiosqlite) and the sync engine run
+in the threadpool (DB_ASYNC=false, ThreadedSession) give the same responses
+and run the same number of queries for the same requests.
+"""
+import base64
+import json
+import re
+import httpx
+from .conftest import PASSWORD, login
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+_UUID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+_TIME = re.compile(r"\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}:\d{2}(\.\d+)?)?")
+
+
+class Recorder:
+    """
+    Sends requests and records what a run returned, with the values that
+    differ between runs (generated IDs, times, tokens) replaced by
+    placeholders numbered in order of appearance.
+    """
+
+    def __init__(self, client: httpx.Client):
+        self.client = client
+        self.ids = {}
+        self.calls = []
+
+    def __call__(self, method: str, url: str, label: str = None, **kwargs) -> httpx.Response:
+        response = self.client.request(method, url, **kwargs)
+        timing = _QUERIES.search(response.headers.get("x-server-timing", ""))
+        try:
+            body = self.normalize(response.json())
+        except ValueError:
+            body = self.normalize(response.text)
+        self.calls.append({
+            "request": f"{method} {label or url}",
+            "status": response.status_code,
+            "queries": int(timing.group(1)) if timing else None,
+            "body": body,
+        })
+        return response
+
+    def normalize(self, value, key: str = None):
+        if isinstance(value, dict):
+            return {name: self.normalize(item, name) for name, item in value.items()}
+        if isinstance(value, list):
+            return [self.normalize(item) for item in value]
+        if not isinstance(value, str):
+            return value
+        if key == "token":
+            return "<token>"
+        if key == "next_cursor":
+            value = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+        value = _UUID.sub(lambda match: self.ids.setdefault(match.group(), f"<id{len(self.ids)}>"), value)
+        return _TIME.sub("<time>", value)
+
+
+def scenario(base_url: str) -> list:
+    """
+    Exercise every router once against a fresh database.
+    """
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        call = Recorder(client)
+        user_id, auth = login(client, "layers")
+        body = {"user_id": user_id}
+
+        call("POST", "/users/login", json={"username_or_email": "layers", "password": "wrong-password"})
+        call("PUT", f"/users/users/{user_id}", label="/users/users/{id}", json={"full_name": "Layers Test"}, headers=auth)
+
+        packages = call("GET", "/packages/", json=body, headers=auth).json()
+        package_id = call("POST", "/packages/", headers=auth, json={
+            **body, "package_name": "Layers", "description": "Parity", "monthly_price": 42,
+        }).json()["id"]
+        call("GET", f"/packages/{package_id}", label="/packages/{id}", json=body, headers=auth)
+        call("PUT", f"/packages/{package_id}", label="/packages/{id}", headers=auth,
+             json={**body, "description": "Parity check", "monthly_price": 43})
+        call("GET", "/packages/missing", json=body, headers=auth)
+
+        customer_ids = [
+            call("POST", "/customers/", headers=auth, json={
+                **body, "first_name": first, "last_name": "Parity", "phone_number": f"050-000000{index}",
+                "email_address": f"{first.lower()}@example.com", "address": f"{index} Main Street",
+                "package_id": package_id if index % 2 else packages[0]["id"],
+            }).json()["id"]
+            for index, first in enumerate(["Ada", "Grace", "Linus"])
+        ]
+        call("POST", "/customers/bulk", headers=auth, files={"file": (
+            "customers.csv",
+            "first_name,last_name,phone_number,email_address,address,package_id\n"
+            f"Bulk,Parity,050-1111111,bulk@example.com,2 Side Street,{package_id}\n"
+            f"Broken,Parity,050-1111111,not-an-email,2 Side Street,{package_id}\n",
+        )})
+        call("GET", f"/customers/{customer_ids[0]}", label="/customers/{id}", json=body, headers=auth)
+        call("GET", "/customers/", json=body, headers=auth)
+        call("PUT", f"/customers/{customer_ids[0]}", label="/customers/{id}", headers=auth,
+             json={**body, "first_name": "Augusta", "package_id": package_id})
+        call("GET", "/customers/search", params={"q": "augusta"}, headers=auth)
+        call("GET", "/customers/search", params={"q": "main street"}, headers=auth)
+        call("GET", "/customers/export", params={"format": "csv"}, headers=auth)
+        call("DELETE", f"/customers/{customer_ids[1]}", label="/customers/{id}", json=body, headers=auth)
+        call("DELETE", f"/customers/{customer_ids[1]}", label="/customers/{id}", json=body, headers=auth)
+        call("GET", "/customers/stats", params={"days": 7}, headers=auth)
+        call("GET", "/packages/stats", params={"days": 7}, headers=auth)
+        call("POST", "/packages/subscribers/reconcile", headers=auth, json=body)
+        call("DELETE", f"/packages/{package_id}", label="/packages/{id}", json=body, headers=auth)
+
+        first_page = call("GET", "/audit-logs/", params={"limit": 5}, headers=auth).json()
+        call("GET", "/audit-logs/", params={"limit": 5, "cursor": first_page["next_cursor"]}, headers=auth)
+        call("GET", "/audit-logs/", params={"action": "Fetched all customers"}, headers=auth)
+        call("GET", f"/audit-logs/{first_page['items'][0]['id']}", label="/audit-logs/{id}", headers=auth)
+        call("GET", f"/audit-logs/user/{user_id}", label="/audit-logs/user/{id}",
+             params={"limit": 3}, headers=auth)
+        call("GET", "/audit-logs/export", params={"format": "ndjson"}, headers=auth)
+        call("GET", "/audit-logs-view-filter", params={"user_id": user_id, "limit": 3}, headers=auth)
+        call("POST", "/users/logout", headers=auth)
+        call("GET", "/customers/", json=body, headers=auth)
+        reset = call("POST", "/users/password-reset", json={"email": "layers@example.com"}).json()
+        call("POST", "/users/reset-password", json={
+            "reset_token": reset["reset_token"], "new_password": PASSWORD, "confirm_password": PASSWORD,
+        })
+    return call.calls
+
+
+def checkouts(base_url: str) -> dict:
+    """
+    Connections checked out so far, per engine.
+    """
+    pools = httpx.get(f"{base_url}/metrics/db-pool").json()
+    return {name: pool["checkout_hold_ms"]["count"] for name, pool in pools.items()}
+
+
+def test_async_and_threadpool_layers_agree(start_server):
+    async_server, threaded_server = start_server(db_async=True), start_server(db_async=False)
+    async_calls = scenario(async_server.base_url)
+    threaded_calls = scenario(threaded_server.base_url)
+
+    # Each server really ran its requests on its own layer
+    assert checkouts(async_server.base_url)["async"] > 0
+    threaded_checkouts = checkouts(threaded_server.base_url)
+    assert "async" not in threaded_checkouts and threaded_checkouts["sync"] > 0
+
+    assert all(call["status"] < 500 for call in async_calls), json.dumps(async_calls, indent=1)
+    assert all(call["queries"] is not None for call in async_calls)
+    for async_call, threaded_call in zip(async_calls, threaded_calls, strict=True):
+        assert async_call == threaded_call
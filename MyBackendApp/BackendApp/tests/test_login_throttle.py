@@ -0,0 +1,23 @@
+"""
+The login throttle (see app/utils/login_throttle.py) holds under parallel
+guessing: attempts are counted before their passwords are checked.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from .conftest import login
+
+MAX_ATTEMPTS = 3
+GUESSES = 20
+
+
+def test_parallel_guesses_cannot_exceed_the_limit(start_server):
+    server = start_server(LOGIN_MAX_ATTEMPTS_PER_USER=str(MAX_ATTEMPTS))
+    with httpx.Client(base_url=server.base_url, timeout=60) as client:
+        login(client, "throttled")
+
+        def guess(_) -> int:
+            return client.post("/users/login", json={"username_or_email": "throttled", "password": "guess"}).status_code
+
+        with ThreadPoolExecutor(GUESSES) as pool:
+            statuses = sorted(pool.map(guess, range(GUESSES)))
+        assert statuses == [401] * MAX_ATTEMPTS + [429] * (GUESSES - MAX_ATTEMPTS)
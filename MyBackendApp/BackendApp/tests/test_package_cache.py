@@ -0,0 +1,45 @@
+"""
+The package cache (see app/utils/package_cache.py) never keeps a catalog
+loaded before a change that happened while the load was running.
+"""
+import asyncio
+from types import SimpleNamespace
+from app.utils.package_cache import PackageCache
+
+
+class SlowSession:
+    """
+    Stands in for a database session: every load waits until released and
+    returns the package catalog as it was when the load started.
+    """
+
+    def __init__(self, subscribers: int):
+        self.subscribers = subscribers
+        self.loads = 0
+        self.release = asyncio.Event()
+
+    async def execute(self, statement):
+        self.loads += 1
+        row = SimpleNamespace(id="basic", _mapping={"id": "basic", "subscriber_count": self.subscribers})
+        await self.release.wait()
+        return SimpleNamespace(all=lambda: [row])
+
+
+def test_loads_overlapping_a_change_are_not_cached():
+    async def scenario(change):
+        cache = PackageCache()
+        db = SlowSession(subscribers=1)
+        load = asyncio.create_task(cache.all(db))
+        await asyncio.sleep(0)
+        # The change commits while the load still holds the old catalog
+        db.subscribers = 2
+        change(cache)
+        db.release.set()
+        assert (await load)[0]["subscriber_count"] == 1
+
+        assert (await cache.all(db))[0]["subscriber_count"] == 2
+        assert db.loads == 2
+        return cache.stats()
+
+    for change in (PackageCache.invalidate, lambda cache: cache.adjust_subscribers("basic", 1)):
+        assert asyncio.run(scenario(change))["stale_loads"] == 1
@@ -0,0 +1,18 @@
+"""
+Every budgeted endpoint stays within its query budget (see
+benchmarks/query_counts.py) on both database layers. Counts come from the
+desc="N queries" entry of the X-Server-Timing header, i.e. from the
+statements the request's cursor hook saw.
+"""
+import asyncio
+import pytest
+from benchmarks.query_counts import BUDGETS, run
+
+
+@pytest.mark.parametrize("db_async", [True, False], ids=["async", "sync"])
+def test_endpoints_stay_within_their_query_budgets(start_server, db_async):
+    server = start_server(db_async=db_async)
+    counts = {label: queries for label, queries, _, _ in asyncio.run(run(base_url=server.base_url, timeout=60))}
+    assert counts.keys() == BUDGETS.keys()
+    over = {label: (queries, BUDGETS[label][0]) for label, queries in counts.items() if queries > BUDGETS[label][0]}
+    assert not over, f"(queries, budget) of endpoints over budget: {over}"
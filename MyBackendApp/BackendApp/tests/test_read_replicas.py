@@ -0,0 +1,191 @@
+"""
+Read/write splitting (see app/utils/replica_router.py). The servers run
+against two SQLite files standing in for the primary and its read replica;
+replication is simulated by copying the primary into the replica, so the
+replica lags until then.
+"""
+import os
+import sqlite3
+import time
+from types import SimpleNamespace
+import httpx
+import orjson
+import pytest
+from app.models.keys import new_id
+from app.utils.replica_router import ReplicaRouter
+from .conftest import key, login
+
+STICKY_SECONDS = 1.0
+RETRY_INTERVAL = 1.0
+
+
+def replicate(primary: str, replica: str):
+    """
+    Bring the replica up to date with the primary.
+    """
+    source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+    with target:
+        source.backup(target)
+    source.close()
+    target.close()
+
+
+def execute(path: str, sql: str, *params):
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            return connection.execute(sql, params).fetchone()
+    finally:
+        connection.close()
+
+
+def add_marker(path: str, user_id: str, action: str) -> str:
+    """
+    Insert an audit log row straight into one database file.
+    """
+    marker = new_id()
+    execute(path, "INSERT INTO audit_logs (id, user_id, action, timestamp) VALUES (?, ?, ?, '2020-01-01 00:00:00')",
+            key(marker), key(user_id), action)
+    return marker
+
+
+def replica_settings(replica: str) -> dict:
+    return {
+        "DATABASE_REPLICA_URLS": f"sqlite:///{replica}",
+        "DB_REPLICA_STICKY_SECONDS": str(STICKY_SECONDS),
+        "DB_REPLICA_RETRY_INTERVAL": str(RETRY_INTERVAL),
+    }
+
+
+def customer_ids(client: httpx.Client, user_id: str, auth: dict) -> set:
+    response = client.request("GET", "/customers/", json={"user_id": user_id}, headers=auth)
+    response.raise_for_status()
+    return {customer["id"] for customer in response.json()}
+
+
+def exported_ids(client: httpx.Client, auth: dict) -> set:
+    response = client.get("/customers/export", headers=auth)
+    response.raise_for_status()
+    return {orjson.loads(line)["id"] for line in response.content.splitlines()}
+
+
+def customer_found(client: httpx.Client, user_id: str, auth: dict, customer_id: str) -> bool:
+    """
+    Whether both the customer lookup and the customer search see the customer.
+    """
+    response = client.request("GET", f"/customers/{customer_id}", json={"user_id": user_id}, headers=auth)
+    search = client.get("/customers/search", params={"q": "replica"}, headers=auth).json()
+    return response.status_code == 200 and customer_id in {customer["id"] for customer in search["items"]}
+
+
+@pytest.mark.parametrize("db_async", [True, False], ids=["async", "threadpool"])
+def test_reads_go_to_the_replica_except_right_after_own_writes(start_server, tmp_path, db_async):
+    replica = str(tmp_path / "replica.db")
+    server = start_server(db_async=db_async, **replica_settings(replica))
+    primary = server.database_path
+    with httpx.Client(base_url=server.base_url, timeout=60) as writer_client, \
+            httpx.Client(base_url=server.base_url, timeout=60) as reader_client:
+        writer_id, writer = login(writer_client, "replica-writer")
+        reader_id, reader = login(reader_client, "replica-reader")
+        replicate(primary, replica)
+        # Registering and logging in were writes by this client's address,
+        # which anonymous reads are keyed on
+        time.sleep(STICKY_SECONDS + 0.2)
+
+        # A row only the replica has is found through a read-only endpoint
+        marker = add_marker(replica, reader_id, "Replica marker")
+        assert reader_client.get(f"/audit-logs/{marker}", headers=reader).status_code == 200
+
+        package_id = writer_client.request("GET", "/packages/", json={"user_id": writer_id}, headers=writer).json()[0]["id"]
+        created = writer_client.post("/customers/", headers=writer, json={
+            "user_id": writer_id, "first_name": "Replica", "last_name": "Check", "phone_number": "050-0000000",
+            "email_address": "replica@example.com", "address": "1 Main Street", "package_id": package_id,
+        }).json()["id"]
+        # Writes go to the primary
+        assert execute(primary, "SELECT count(*) FROM customers WHERE id = ?", key(created)) == (1,)
+        assert execute(replica, "SELECT count(*) FROM customers WHERE id = ?", key(created)) == (0,)
+
+        # The writer reads its own write right after it; other callers read the lagging replica
+        assert created in customer_ids(writer_client, writer_id, writer)
+        assert created in exported_ids(writer_client, writer)
+        assert created not in customer_ids(reader_client, reader_id, reader)
+        assert created not in exported_ids(reader_client, reader)
+        assert not customer_found(reader_client, reader_id, reader, created)
+
+        # Audit rows of read requests are written to the primary
+        fetched = "SELECT count(*) FROM audit_logs WHERE action = 'Fetched all customers'"
+        assert execute(primary, fetched) == (2,)
+        assert execute(replica, fetched) == (0,)
+
+        time.sleep(STICKY_SECONDS + 0.2)
+        assert created not in customer_ids(writer_client, writer_id, writer)
+        replicate(primary, replica)
+        assert created in customer_ids(reader_client, reader_id, reader)
+        assert customer_found(reader_client, reader_id, reader, created)
+
+
+def test_reads_fall_back_to_the_primary_while_the_replica_is_down(start_server, tmp_path):
+    # The replica's directory does not exist yet, so it cannot be opened
+    replica = str(tmp_path / "replica" / "replica.db")
+    server = start_server(**replica_settings(replica))
+    with httpx.Client(base_url=server.base_url, timeout=60) as client:
+        user_id, auth = login(client, "replica-failover")
+        time.sleep(STICKY_SECONDS + 0.2)
+        marker = add_marker(server.database_path, user_id, "Primary marker")
+
+        assert client.get(f"/audit-logs/{marker}", headers=auth).status_code == 200
+        assert not client.get("/metrics/replicas").json()["replicas"][0]["up"]
+        assert client.get(f"/audit-logs/{marker}", headers=auth).status_code == 200
+
+        # The replica comes back without the marker
+        os.makedirs(os.path.dirname(replica))
+        replicate(server.database_path, replica)
+        execute(replica, "DELETE FROM audit_logs WHERE id = ?", key(marker))
+        time.sleep(RETRY_INTERVAL + 0.2)
+        assert client.get(f"/audit-logs/{marker}", headers=auth).status_code == 404
+        assert client.get("/metrics/replicas").json()["replicas"][0]["up"]
+
+
+def engines(*checked_out):
+    return [SimpleNamespace(pool=SimpleNamespace(checkedout=lambda n=n: n)) for n in checked_out]
+
+
+def test_round_robin_alternates_replicas():
+    router = ReplicaRouter(["a", "b"], selection="round_robin")
+    assert [router.choose(engines(0, 0)) for _ in range(4)] == [0, 1, 0, 1]
+
+
+def test_least_connections_skips_down_replicas():
+    router = ReplicaRouter(["a", "b"], selection="least_connections")
+    assert [router.choose(engines(5, 2)) for _ in range(3)] == [1, 1, 1]
+    router.mark_down(1, RuntimeError("down"))
+    assert router.choose(engines(5, 2)) == 0
+    router.mark_down(0, RuntimeError("down"))
+    assert router.choose(engines(5, 2)) is None
+
+
+def test_reads_after_a_write_stay_on_the_primary_on_every_worker(start_server, tmp_path):
+    replica = str(tmp_path / "replica.db")
+    first = start_server(**replica_settings(replica))
+    second = start_server(database=first.database_path, **replica_settings(replica))
+    with httpx.Client(timeout=60) as writer_client, httpx.Client(timeout=60) as reader_client:
+        writer_client.base_url = reader_client.base_url = first.base_url
+        writer_id, writer = login(writer_client, "replica-writer")
+        reader_id, reader = login(reader_client, "replica-reader")
+        replicate(first.database_path, replica)
+        time.sleep(STICKY_SECONDS + 0.2)
+
+        package_id = writer_client.request("GET", "/packages/", json={"user_id": writer_id}, headers=writer).json()[0]["id"]
+        created = writer_client.post("/customers/", headers=writer, json={
+            "user_id": writer_id, "first_name": "Replica", "last_name": "Workers", "phone_number": "050-0000000",
+            "email_address": "workers@example.com", "address": "1 Main Street", "package_id": package_id,
+        }).json()["id"]
+
+        # The next reads land on the other worker, which did not serve the write
+        writer_client.base_url = reader_client.base_url = second.base_url
+        assert created in customer_ids(writer_client, writer_id, writer)
+        assert created in exported_ids(writer_client, writer)
+        assert created not in customer_ids(reader_client, reader_id, reader)
+        # Stickiness comes from the cookie: without it the other worker reads the replica
+        writer_client.cookies.clear()
+        assert created not in customer_ids(writer_client, writer_id, writer)
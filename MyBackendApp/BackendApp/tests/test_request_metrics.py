@@ -0,0 +1,24 @@
+"""
+Query timing (see app/utils/request_metrics.py) is attributed to the request
+and cleaned up on the connection whether or not the statement succeeds.
+"""
+import pytest
+from sqlalchemy import create_engine, exc, text
+from app.utils.request_metrics import RequestStats, current_request_stats, instrument_queries
+
+
+def test_failed_statements_are_counted_and_leave_no_timing_behind():
+    engine = create_engine("sqlite://")
+    instrument_queries(engine)
+    stats = RequestStats()
+    token = current_request_stats.set(stats)
+    try:
+        with engine.connect() as connection:
+            with pytest.raises(exc.OperationalError):
+                connection.execute(text("SELECT * FROM missing_table"))
+            assert connection.info["query_started_at"] == []
+            connection.execute(text("SELECT 1"))
+            assert connection.info["query_started_at"] == []
+    finally:
+        current_request_stats.reset(token)
+    assert stats.queries == 2
@@ -0,0 +1,14 @@
+"""
+The supervisor (see app/server.py) keeps the worker count it started with,
+since every worker's pool sizes are split from DB_MAX_CONNECTIONS for it.
+"""
+from types import SimpleNamespace
+from app.server import Supervisor
+
+
+def test_worker_count_signals_are_ignored():
+    supervisor = SimpleNamespace(processes_num=2, processes=["first", "second"])
+    Supervisor.handle_ttin(supervisor)
+    Supervisor.handle_ttou(supervisor)
+    assert supervisor.processes_num == 2
+    assert supervisor.processes == ["first", "second"]
@@ -0,0 +1,109 @@
+"""
+Package.subscriber_count stays exact when many clients create, delete and
+switch customers of the same packages at once (see app/utils/subscriber_counts.py).
+"""
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import pytest
+from .conftest import key, login
+
+THREADS = 16
+CREATES = 60
+DELETES = 20
+SWITCHES = 20
+
+
+def stored_counts(path: str, package_id: str) -> tuple[int, int]:
+    connection = sqlite3.connect(path)
+    try:
+        stored = connection.execute(
+            "SELECT subscriber_count FROM packages WHERE id = ?", (key(package_id),)
+        ).fetchone()[0]
+        actual = connection.execute(
+            "SELECT count(*) FROM customers WHERE package_id = ?", (key(package_id),)
+        ).fetchone()[0]
+        return stored, actual
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("db_async", [True, False], ids=["async", "threadpool"])
+def test_concurrent_creates_and_deletes_keep_the_count_exact(start_server, db_async):
+    server = start_server(db_async=db_async)
+    with httpx.Client(base_url=server.base_url, timeout=60) as client:
+        user_id, auth = login(client, "subscriber-counts")
+        package_id = client.request("GET", "/packages/", json={"user_id": user_id}, headers=auth).json()[0]["id"]
+        before, _ = stored_counts(server.database_path, package_id)
+
+        def create(index: int) -> int:
+            return client.post("/customers/", headers=auth, json={
+                "user_id": user_id, "first_name": "Count", "last_name": f"Check{index}",
+                "phone_number": "050-0000000", "email_address": f"count{index}@example.com",
+                "address": "1 Main Street", "package_id": package_id,
+            }).status_code
+
+        def delete(customer_id: str) -> int:
+            return client.request("DELETE", f"/customers/{customer_id}", headers=auth,
+                                  json={"user_id": user_id}).status_code
+
+        doomed = [
+            client.post("/customers/", headers=auth, json={
+                "user_id": user_id, "first_name": "Doomed", "last_name": f"Customer{index}",
+                "phone_number": "050-0000000", "email_address": f"doomed{index}@example.com",
+                "address": "1 Main Street", "package_id": package_id,
+            }).json()["id"]
+            for index in range(DELETES)
+        ]
+
+        with ThreadPoolExecutor(THREADS) as pool:
+            creates = [pool.submit(create, index) for index in range(CREATES)]
+            # Every customer is deleted twice at once: only one of them may decrement
+            deletes = [pool.submit(delete, customer_id) for customer_id in doomed + doomed]
+            created = [future.result() for future in creates]
+            deleted = [future.result() for future in deletes]
+
+    assert created == [200] * CREATES
+    assert sorted(deleted) == [200] * DELETES + [404] * DELETES
+    stored, actual = stored_counts(server.database_path, package_id)
+    assert stored == before + CREATES
+    assert stored == actual
+
+
+@pytest.mark.parametrize("db_async", [True, False], ids=["async", "threadpool"])
+def test_concurrent_package_switches_keep_the_counts_exact(start_server, db_async):
+    server = start_server(db_async=db_async)
+    with httpx.Client(base_url=server.base_url, timeout=60) as client:
+        user_id, auth = login(client, "subscriber-switches")
+        source, first, second = [
+            client.post("/packages/", headers=auth, json={
+                "user_id": user_id, "package_name": name, "description": "Switch check", "monthly_price": 10,
+            }).json()["id"]
+            for name in ("Source", "First", "Second")
+        ]
+        customers = [
+            client.post("/customers/", headers=auth, json={
+                "user_id": user_id, "first_name": "Switching", "last_name": f"Customer{index}",
+                "phone_number": "050-0000000", "email_address": f"switch{index}@example.com",
+                "address": "1 Main Street", "package_id": source,
+            }).json()["id"]
+            for index in range(SWITCHES)
+        ]
+
+        def switch(customer_id: str, package_id: str) -> int:
+            return client.put(f"/customers/{customer_id}", headers=auth,
+                              json={"user_id": user_id, "package_id": package_id}).status_code
+
+        # Every customer is moved to both packages at once: a switch that lost
+        # the race may only count if it starts from where the winner left it
+        with ThreadPoolExecutor(THREADS) as pool:
+            switches = [pool.submit(switch, customer_id, target)
+                        for customer_id in customers for target in (first, second)]
+            statuses = [future.result() for future in switches]
+
+    assert set(statuses) <= {200, 409}
+    counts = {package_id: stored_counts(server.database_path, package_id) for package_id in (source, first, second)}
+    assert counts[source] == (0, 0)
+    assert counts[first][0] == counts[first][1]
+    assert counts[second][0] == counts[second][1]
+    assert counts[first][0] + counts[second][0] == SWITCHES